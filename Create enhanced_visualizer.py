@@ -3,44 +3,46 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
-import streamlit as st
+
+from chart_engine import ChartEngine, aggregate_categories
+from data_profiler import profile_result
 
 class EnhancedVisualizer:
     def __init__(self):
         self.color_palette = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#FFB347']
+        self.charts = ChartEngine()
     
-    def create_dashboard_style_viz(self, df, query_type="general"):
+    def create_dashboard_style_viz(self, df, query_type="general", profile=None):
         """Create professional dashboard-style visualizations"""
         
         if df.empty:
             return None
         
-        # Detect data types
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
-        date_cols = df.select_dtypes(include=['datetime']).columns.tolist()
+        # Column roles come from the result's shared profile
+        profile = profile or profile_result(df)
+        numeric_cols = profile.measures
+        categorical_cols = profile.dimensions
         
         # Create appropriate visualization based on data structure
-        if self._is_revenue_data(df):
-            return self._create_revenue_dashboard(df)
-        elif self._is_time_series(df):
-            return self._create_time_series_chart(df)
+        if self._is_revenue_data(profile):
+            return self._create_revenue_dashboard(df, profile)
+        elif self._is_time_series(profile):
+            return self._create_time_series_chart(df, profile)
         elif len(numeric_cols) >= 1 and len(categorical_cols) >= 1:
             return self._create_category_analysis(df, categorical_cols[0], numeric_cols[0])
         else:
-            return self._create_generic_chart(df)
+            return self._create_generic_chart(df, profile)
     
-    def _is_revenue_data(self, df):
+    def _is_revenue_data(self, profile):
         """Detect if this is revenue-related data"""
         revenue_keywords = ['revenue', 'sales', 'income', 'profit', 'earnings']
-        return any(keyword in col.lower() for col in df.columns for keyword in revenue_keywords)
+        return bool(profile.find(*revenue_keywords))
     
-    def _is_time_series(self, df):
+    def _is_time_series(self, profile):
         """Detect if this is time series data"""
-        date_keywords = ['date', 'time', 'month', 'year', 'day']
-        return any(keyword in col.lower() for col in df.columns for keyword in date_keywords)
+        return bool(profile.time_named)
     
-    def _create_revenue_dashboard(self, df):
+    def _create_revenue_dashboard(self, df, profile):
         """Create a revenue-focused dashboard"""
         fig = make_subplots(
             rows=2, cols=2,
@@ -50,9 +52,13 @@ class EnhancedVisualizer:
         )
         
         # Main bar chart
-        if 'revenue' in df.columns.str.lower():
-            revenue_col = [col for col in df.columns if 'revenue' in col.lower()][0]
-            category_col = df.select_dtypes(include=['object']).columns[0] if len(df.select_dtypes(include=['object']).columns) > 0 else df.columns[0]
+        if 'revenue' in [col.lower() for col in profile.columns]:
+            revenue_col = profile.find('revenue')[0]
+            text_cols = profile.dimensions
+            category_col = text_cols[0] if text_cols else df.columns[0]
+            # One bar / slice per category, long tail folded into 'Other'
+            if len(df) > self.charts.max_categories:
+                df = aggregate_categories(df, category_col, revenue_col, self.charts.max_categories)
             
             fig.add_trace(
                 go.Bar(x=df[category_col], y=df[revenue_col], 
@@ -75,17 +81,18 @@ class EnhancedVisualizer:
         
         return fig
     
-    def _create_time_series_chart(self, df):
+    def _create_time_series_chart(self, df, profile):
         """Create time series visualization"""
-        date_col = df.select_dtypes(include=['datetime']).columns[0] if len(df.select_dtypes(include=['datetime']).columns) > 0 else None
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        date_cols = profile.times
+        date_col = date_cols[0] if date_cols else None
+        numeric_cols = profile.measures
         
         if date_col and numeric_cols:
-            fig = px.line(df, x=date_col, y=numeric_cols[0], 
+            fig = self.charts.line(df, x=date_col, y=numeric_cols[0],
                          title=f"📈 {numeric_cols[0]} Over Time",
                          color_discrete_sequence=self.color_palette)
         else:
-            fig = px.line(df, y=numeric_cols[0] if numeric_cols else df.columns[0],
+            fig = self.charts.line(df, x=None, y=numeric_cols[0] if numeric_cols else df.columns[0],
                          title="📈 Trend Analysis",
                          color_discrete_sequence=self.color_palette)
         
@@ -94,10 +101,12 @@ class EnhancedVisualizer:
     
     def _create_category_analysis(self, df, cat_col, num_col):
         """Create category-based analysis"""
-        # Sort by values for better visualization
+        # Sum per category (folding the long tail), then sort by values for better visualization
+        if len(df) > self.charts.max_categories:
+            df = aggregate_categories(df, cat_col, num_col, self.charts.max_categories)
         df_sorted = df.sort_values(num_col, ascending=False)
         
-        fig = px.bar(df_sorted, x=cat_col, y=num_col,
+        fig = self.charts.bar(df_sorted, x=cat_col, y=num_col,
                     title=f"📊 {num_col} by {cat_col}",
                     color=num_col,
                     color_continuous_scale='Viridis')
@@ -109,22 +118,26 @@ class EnhancedVisualizer:
         
         return fig
     
-    def _create_generic_chart(self, df):
+    def _create_generic_chart(self, df, profile):
         """Create a generic chart for any data"""
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        numeric_cols = profile.measures
         
         if len(numeric_cols) >= 2:
-            fig = px.scatter(df, x=numeric_cols[0], y=numeric_cols[1],
+            fig = self.charts.scatter(df, x=numeric_cols[0], y=numeric_cols[1],
                            title=f"📊 {numeric_cols[1]} vs {numeric_cols[0]}",
                            color_discrete_sequence=self.color_palette)
         elif len(numeric_cols) == 1:
-            fig = px.histogram(df, x=numeric_cols[0],
+            fig = self.charts.histogram(df, x=numeric_cols[0],
                              title=f"📊 Distribution of {numeric_cols[0]}",
                              color_discrete_sequence=self.color_palette)
         else:
             # For non-numeric data, create a count plot
             first_col = df.columns[0]
             counts = df[first_col].value_counts()
+            if len(counts) > self.charts.max_categories:
+                head = counts.iloc[:self.charts.max_categories - 1]
+                other = pd.Series([counts.iloc[self.charts.max_categories - 1:].sum()], index=['Other'])
+                counts = pd.concat([head, other])
             fig = px.bar(x=counts.index, y=counts.values,
                         title=f"📊 Count of {first_col}",
                         color_discrete_sequence=self.color_palette)
@@ -132,10 +145,10 @@ class EnhancedVisualizer:
         fig.update_layout(height=500)
         return fig
     
-    def create_summary_metrics(self, df):
+    def create_summary_metrics(self, df, profile=None):
         """Create summary metrics cards"""
         metrics = []
-        numeric_cols = df.select_dtypes(include=['number']).columns
+        numeric_cols = (profile or profile_result(df)).measures
         
         for col in numeric_cols[:4]:  # Show top 4 metrics
             total = df[col].sum()
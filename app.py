@@ -1,6 +1,8 @@
 import streamlit as st
-import plotly.express as px
 import pandas as pd
+import os
+import time
+import uuid
 import logging
 from datetime import datetime
 
@@ -8,8 +10,20 @@ from datetime import datetime
 try:
     from database import DatabaseManager
     from sql_agent import SQLAgent
+    from rollups import RollupManager
     from powerbi_manager import PowerBIManager
-    from insight_generator import InsightGenerator
+    # INSIGHT_MODEL=demo uses canned insights; anything else (e.g. gpt-4, fake) uses the LLM generator
+    if os.getenv('INSIGHT_MODEL', 'demo') == 'demo':
+        from insight_generator import InsightGenerator
+    else:
+        from insight_Generator import InsightGenerator
+    from exporter import ResultExporter, query_source
+    from data_profiler import profile_result
+    from jobs import JobScheduler, Job
+    from chart_engine import ChartEngine
+    from tracing import tracer, start_metrics_server
+    from warmup import WarmStart
+    from drilldown import DrillDown
 except ImportError as e:
     st.error(f"Import Error: {e}")
     st.stop()
@@ -24,17 +38,27 @@ st.set_page_config(
 # Initialize session state
 if 'query_history' not in st.session_state:
     st.session_state.query_history = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '0.25'))
+chart_engine = ChartEngine()
 
 @st.cache_resource
 def init_components():
     try:
         db = DatabaseManager()
-        schema_info = db.get_schema_info()
+        # Build-time artifact (python warmup.py build); everything below falls back to the database without it
+        warm = WarmStart()
+        warm.load(db)
+        schema_info = warm.schema_info(db)
         if not schema_info:
             st.error("Failed to retrieve database schema.")
             return None, None, None, None
         
-        sql_agent = SQLAgent(schema_info)
+        sql_agent = SQLAgent(schema_info, foreign_keys=warm.foreign_keys(db), intent_tables=warm.intent_tables,
+                             rollups=RollupManager(db))
+        warm.apply(db)
         powerbi = PowerBIManager()
         insight_gen = InsightGenerator()
         
@@ -44,16 +68,36 @@ def init_components():
         st.error(f"Failed to initialize components: {str(e)}")
         return None, None, None, None
 
-def create_visualization(df):
+@st.cache_resource
+def get_scheduler():
+    # One worker pool for the whole server; jobs are registered per session
+    return JobScheduler()
+
+@st.cache_resource
+def get_exporter():
+    return ResultExporter()
+
+@st.cache_resource
+def get_drilldown():
+    # Recent results of every session, for follow-up questions; off with DRILLDOWN=false
+    return DrillDown() if os.getenv('DRILLDOWN', 'true').lower() == 'true' else None
+
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus endpoint for the whole server process; off unless METRICS_PORT is set
+    return start_metrics_server()
+
+def create_visualization(df, profile=None):
     if df is None or df.empty:
         return None
     
     try:
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+        profile = profile or profile_result(df)
+        numeric_cols = profile.measures
+        categorical_cols = profile.dimensions
         
         if len(categorical_cols) >= 1 and len(numeric_cols) >= 1:
-            fig = px.bar(
+            fig = chart_engine.bar(
                 df,
                 x=categorical_cols[0],
                 y=numeric_cols[0],
@@ -61,7 +105,7 @@ def create_visualization(df):
             )
             return fig
         elif len(numeric_cols) >= 2:
-            fig = px.scatter(
+            fig = chart_engine.scatter(
                 df,
                 x=numeric_cols[0],
                 y=numeric_cols[1],
@@ -72,9 +116,285 @@ def create_visualization(df):
             return None
             
     except Exception as e:
-        st.error(f"Error creating visualization: {str(e)}")
+        # Runs on a worker thread, so report through the log rather than the page
+        logging.error(f"Error creating visualization: {str(e)}")
+        return None
+
+def answer_from_aggregates(db, sql_agent, user_query):
+    """Result from the in-process incremental aggregates, or None to run the SQL"""
+    # Only the intent router's questions are known to match what the partials hold
+    if db.aggregates is None or sql_agent.translator is not None:
+        return None
+    try:
+        return db.aggregates.answer(sql_agent.match_intent(user_query))
+    except Exception as e:
+        logging.warning(f"Incremental aggregates unavailable, running the query instead: {e}")
         return None
 
+def run_query_job(job, sql_agent, db, user_query, drilldown=None):
+    """Translate, validate and execute the question, loading result chunks as they arrive"""
+    with tracer.span('app.query', session=job.session_id) as span:
+        question = user_query
+        drill = drilldown.answer(job.session_id, user_query, sql_agent.router.regions.values()) if drilldown else None
+        if drill is not None and drill.df is not None:
+            # A refinement of an earlier result of this session, computed from that frame
+            df = drill.df
+            span.set(rows=len(df), drilldown=True)
+            with tracer.span('app.profile', rows=len(df)):
+                profile = profile_result(df)
+            drilldown.remember(job.session_id, drill.question, drill.source.sql, df,
+                               complete=drill.source.complete, limited=drill.limited, steps=drill.steps)
+            return {'sql': drill.source.sql, 'df': df, 'profile': profile, 'truncated': not drill.source.complete,
+                    'guard_note': None, 'limited': False, 'export_sql': None, 'from_aggregates': False,
+                    'drilldown': drill.steps or ['back to the previous result']}
+        if drill is not None:
+            # The follow-up needs rows or columns the earlier result lacks; ask it with its context
+            question = drill.question
+        
+        sql_query = sql_agent.natural_language_to_sql(question)
+        job.progress['sql'] = sql_query
+        
+        is_safe, safety_msg = sql_agent.validate_sql_safety(sql_query)
+        if not is_safe:
+            raise ValueError(f"Query Safety Check Failed: {safety_msg}")
+        
+        df = answer_from_aggregates(db, sql_agent, question)
+        if df is not None:
+            span.set(rows=len(df), aggregates=True)
+            with tracer.span('app.profile', rows=len(df)):
+                profile = profile_result(df)
+            if drilldown:
+                drilldown.remember(job.session_id, question, sql_query, df)
+            return {'sql': sql_query, 'df': df, 'profile': profile, 'truncated': False, 'guard_note': None,
+                    'limited': False, 'export_sql': None, 'from_aggregates': True, 'drilldown': None}
+        
+        checked_sql = sql_query
+        decision = db.guard.check(sql_query)
+        if decision.action == decision.REJECT:
+            raise ValueError(f"Query Rejected: {decision.reason}")
+        sql_query = decision.sql
+        job.progress['sql'] = sql_query
+        
+        result, error = db.stream_query(sql_query)
+        if error:
+            raise RuntimeError(f"Database Error: {error}")
+        
+        def on_chunk(chunk):
+            job.check_cancelled()
+            job.progress.setdefault('preview', chunk)
+            job.progress['rows'] = result.row_count
+        
+        df = result.to_frame(on_chunk=on_chunk)
+        span.set(rows=result.row_count, bytes=result.byte_count, truncated=result.truncated)
+        # Profiled once here; chart and insight jobs reuse it instead of rescanning the frame
+        with tracer.span('app.profile', rows=len(df)):
+            profile = profile_result(df)
+    # The guard's LIMIT only matters to the reader when the result actually reached it
+    limited = decision.action == decision.REWRITE and result.row_count >= db.guard.row_budget
+    if drilldown:
+        drilldown.remember(job.session_id, question, sql_query, df, complete=not (result.truncated or limited))
+    # An incomplete result is exported from the query as asked, without the guard's LIMIT
+    export_sql = checked_sql if result.truncated or limited else None
+    return {'sql': sql_query, 'df': df, 'profile': profile, 'truncated': result.truncated,
+            'guard_note': decision.reason if decision.action == decision.REWRITE else None, 'limited': limited,
+            'export_sql': export_sql, 'from_aggregates': False, 'drilldown': None}
+
+def run_chart_job(job, df, profile):
+    with tracer.span('app.chart', session=job.session_id, rows=len(df)) as span:
+        fig = create_visualization(df, profile)
+        if fig is not None:
+            span.set(points=sum(len(trace.x) for trace in fig.data if trace.x is not None))
+        return fig
+
+def run_insights_job(job, insight_gen, df, user_query):
+    with tracer.span('app.insights', session=job.session_id, rows=len(df)):
+        if not hasattr(insight_gen, 'stream_insights'):
+            return insight_gen.generate_insights(df, user_query)
+        
+        stream = insight_gen.stream_insights(df, user_query)
+        for text in stream:
+            job.check_cancelled()
+            job.progress['text'] = text
+        return stream.insights
+
+def run_powerbi_job(job, powerbi, df, user_query):
+    with tracer.span('app.powerbi', session=job.session_id, rows=len(df)):
+        dataset_id = powerbi.create_dataset_from_dataframe(
+            df,
+            f"Analytics_{user_query[:20]}",
+            "QueryResults"
+        )
+        if not dataset_id:
+            raise RuntimeError("Failed to create dashboard")
+        return powerbi.get_embed_url(dataset_id)
+
+def run_export_job(job, exporter, result_key, fmt, source):
+    with tracer.span('app.export', session=job.session_id, format=fmt) as span:
+        data = exporter.export(result_key, fmt, source)
+        span.set(bytes=len(data))
+        return data
+
+def render_query_progress(job):
+    if job.finished:
+        return
+    if 'preview' in job.progress:
+        st.dataframe(job.progress['preview'], use_container_width=True)
+        st.caption(f"Loading results... {job.progress['rows']:,} rows")
+    else:
+        st.caption(f"Processing your query... {job.elapsed():.1f}s")
+
+def render_chart(job):
+    if not job.finished:
+        st.caption("Building chart...")
+    elif job.status == Job.DONE and job.result is not None:
+        st.plotly_chart(job.result, use_container_width=True)
+
+def render_insights(job):
+    if job.status == Job.DONE:
+        for i, insight in enumerate(job.result, 1):
+            st.write(f"**{i}.** {insight}")
+    elif job.status == Job.FAILED:
+        st.error(f"Could not generate insights: {job.error}")
+    elif job.status == Job.CANCELLED:
+        st.info("Insight generation cancelled.")
+    elif job.progress.get('text'):
+        # Partial model response, streamed in as tokens arrive
+        st.markdown(job.progress['text'])
+    else:
+        st.caption("Generating insights...")
+
+def render_powerbi(job):
+    if job.status == Job.DONE:
+        st.success("✅ Dashboard created!")
+        st.markdown(f"🔗 [View Dashboard]({job.result})")
+    elif job.status == Job.FAILED:
+        st.error("❌ Failed to create dashboard")
+    elif not job.finished:
+        st.caption("Creating dashboard...")
+
+def render_export(job, exporter, fmt):
+    if job.status == Job.DONE:
+        st.download_button(
+            label=f"📥 Download as {exporter.label(fmt)}",
+            data=job.result,
+            file_name=exporter.file_name(fmt, f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}"),
+            mime=exporter.mime(fmt)
+        )
+    elif job.status == Job.FAILED:
+        st.error(f"Export failed: {job.error}")
+    elif not job.finished:
+        st.caption(f"Preparing {exporter.label(fmt)} file...")
+
+def poll_jobs(views):
+    """Redraw each (slot, job, render) view until all jobs have finished, then draw their final state"""
+    pending = list(views)
+    while pending:
+        running = []
+        for slot, job, render in pending:
+            finished = job.finished
+            with slot.container():
+                render(job)
+            if not finished:
+                running.append((slot, job, render))
+        pending = running
+        if pending:
+            time.sleep(JOB_POLL_INTERVAL)
+
+def render_analysis(scheduler, session_id, user_query, db, sql_agent, powerbi, insight_gen):
+    """Attach to (or start) the background jobs for the question and render their results"""
+    query_job = scheduler.submit(session_id, ('query', user_query), run_query_job, sql_agent, db, user_query,
+                                 get_drilldown())
+    
+    if any(not job.finished for job in scheduler.jobs(session_id)):
+        if st.button("⏹ Cancel", key="cancel_jobs"):
+            scheduler.cancel(session_id)
+    
+    poll_jobs([(st.empty(), query_job, render_query_progress)])
+    
+    if query_job.status == Job.CANCELLED:
+        st.info("Query cancelled.")
+        return
+    if query_job.status == Job.FAILED:
+        st.error(query_job.error)
+        return
+    
+    # Display generated SQL
+    with st.expander("🔧 Generated SQL Query"):
+        st.code(query_job.result['sql'], language='sql')
+    
+    df = query_job.result['df']
+    if df is None or df.empty:
+        st.warning("No data found for your query.")
+        return
+    
+    st.success(f"✅ Query executed successfully! Found {len(df)} records.")
+    if query_job.result['drilldown']:
+        st.caption(f"Answered from your earlier result without a new query: {', '.join(query_job.result['drilldown'])}.")
+    if query_job.result['from_aggregates']:
+        aggregates = db.aggregates
+        st.caption(f"Answered from the incremental aggregates kept in memory. New sales rows are merged every "
+                   f"{aggregates.refresh_interval:g}s; updated, deleted or late-committed rows can take up to "
+                   f"{aggregates.staleness_bound() / 60:.0f} min to show.")
+    if query_job.result['limited']:
+        st.info(f"Query rewritten by the cost guard: {query_job.result['guard_note']}.")
+    elif query_job.result['guard_note']:
+        st.caption(f"The cost guard added a LIMIT ({query_job.result['guard_note']}); this result stayed below it.")
+    if query_job.result['truncated']:
+        st.warning(f"Result truncated to the first {len(df):,} rows by the configured row/size limit.")
+    
+    # Chart and insights only need the DataFrame, so both start right away and run in parallel
+    chart_job = scheduler.submit(session_id, ('chart', user_query), run_chart_job, df, query_job.result['profile'])
+    insights_job = scheduler.submit(session_id, ('insights', user_query), run_insights_job, insight_gen, df, user_query)
+    
+    # Create layout for results
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.subheader("📊 Results")
+        chart_slot = st.empty()
+        
+        # Show data table
+        st.subheader("📋 Data Table")
+        st.dataframe(df, use_container_width=True)
+        
+        # Data download: files are only encoded when requested, then memoized per result and format
+        exporter = get_exporter()
+        fmt = st.selectbox("Export format", exporter.formats(), format_func=exporter.label, key="export_format")
+        if st.button("📦 Prepare download"):
+            source = df
+            if query_job.result['export_sql']:
+                # Re-read without the guard's LIMIT or the result caps so the file holds every row
+                # (up to EXPORT_MAX_ROWS); the query still goes through the guard's other checks
+                export = db.guard.check(query_job.result['export_sql'], limit_rows=False)
+                if export.action == export.REJECT:
+                    st.warning(f"Exporting the rows shown; the full query was rejected: {export.reason}.")
+                else:
+                    source = query_source(db, export.sql)
+            scheduler.submit(session_id, ('export', user_query, fmt), run_export_job, exporter, query_job.id, fmt, source)
+        export_slot = st.empty()
+    
+    with col2:
+        st.subheader("🧠 AI Insights")
+        insights_slot = st.empty()
+        
+        st.divider()
+        
+        # Power BI integration
+        st.subheader("📈 Dashboard")
+        
+        if st.button("Create Dashboard"):
+            scheduler.submit(session_id, ('powerbi', user_query), run_powerbi_job, powerbi, df, user_query)
+        powerbi_slot = st.empty()
+    
+    views = [(chart_slot, chart_job, render_chart), (insights_slot, insights_job, render_insights)]
+    powerbi_job = scheduler.get(session_id, ('powerbi', user_query))
+    if powerbi_job is not None:
+        views.append((powerbi_slot, powerbi_job, render_powerbi))
+    export_job = scheduler.get(session_id, ('export', user_query, fmt))
+    if export_job is not None:
+        views.append((export_slot, export_job, lambda job: render_export(job, exporter, fmt)))
+    poll_jobs(views)
+
 def main():
     st.title("🤖 AI-Powered Analytics Chatbot")
     st.markdown("Ask questions about your data in plain English!")
@@ -82,6 +402,7 @@ def main():
     # Initialize components
     with st.spinner("Initializing system components..."):
         db, sql_agent, powerbi, insight_gen = init_components()
+    get_metrics_server()
     
     if not all([db, sql_agent, powerbi, insight_gen]):
         st.error("Failed to initialize required components.")
@@ -109,96 +430,33 @@ def main():
         placeholder="e.g., Show me revenue by region"
     )
     
+    scheduler = get_scheduler()
+    session_id = st.session_state.session_id
+    
     if st.button("🔍 Analyze", type="primary"):
         if user_query:
             # Add to history
             if user_query not in st.session_state.query_history:
                 st.session_state.query_history.append(user_query)
             
-            with st.spinner("Processing your query..."):
-                try:
-                    # Convert natural language to SQL
-                    sql_query = sql_agent.natural_language_to_sql(user_query)
-                    
-                    # Validate SQL for safety
-                    is_safe, safety_msg = sql_agent.validate_sql_safety(sql_query)
-                    
-                    if not is_safe:
-                        st.error(f"Query Safety Check Failed: {safety_msg}")
-                        st.stop()
-                    
-                    # Display generated SQL
-                    with st.expander("🔧 Generated SQL Query"):
-                        st.code(sql_query, language='sql')
-                    
-                    # Execute query
-                    df, error = db.execute_query(sql_query)
-                    
-                    if error:
-                        st.error(f"Database Error: {error}")
-                        
-                    elif df is not None and not df.empty:
-                        st.success(f"✅ Query executed successfully! Found {len(df)} records.")
-                        
-                        # Create layout for results
-                        col1, col2 = st.columns([2, 1])
-                        
-                        with col1:
-                            st.subheader("📊 Results")
-                            
-                            # Create and display visualization
-                            fig = create_visualization(df)
-                            if fig:
-                                st.plotly_chart(fig, use_container_width=True)
-                            
-                            # Show data table
-                            st.subheader("📋 Data Table")
-                            st.dataframe(df, use_container_width=True)
-                            
-                            # Data download
-                            csv = df.to_csv(index=False)
-                            st.download_button(
-                                label="📥 Download as CSV",
-                                data=csv,
-                                file_name=f"results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                                mime="text/csv"
-                            )
-                        
-                        with col2:
-                            st.subheader("🧠 AI Insights")
-                            
-                            # Generate AI insights
-                            with st.spinner("Generating insights..."):
-                                insights = insight_gen.generate_insights(df, user_query)
-                            
-                            for i, insight in enumerate(insights, 1):
-                                st.write(f"**{i}.** {insight}")
-                            
-                            st.divider()
-                            
-                            # Power BI integration
-                            st.subheader("📈 Dashboard")
-                            
-                            if st.button("Create Dashboard"):
-                                with st.spinner("Creating dashboard..."):
-                                    dataset_id = powerbi.create_dataset_from_dataframe(
-                                        df,
-                                        f"Analytics_{user_query[:20]}",
-                                        "QueryResults"
-                                    )
-                                    
-                                    if dataset_id:
-                                        st.success("✅ Dashboard created!")
-                                        embed_url = powerbi.get_embed_url(dataset_id)
-                                        st.markdown(f"🔗 [View Dashboard]({embed_url})")
-                                    else:
-                                        st.error("❌ Failed to create dashboard")
-                    
-                    else:
-                        st.warning("No data found for your query.")
-                        
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
+            if user_query != st.session_state.get('active_query'):
+                # A new question supersedes whatever the previous one still had running
+                scheduler.cancel(session_id)
+                scheduler.forget(session_id)
+            else:
+                # Re-running the same question refreshes finished stages but keeps in-flight ones
+                scheduler.forget(session_id, finished_only=True)
+            st.session_state.active_query = user_query
+    
+    # Reruns (widget clicks, downloads) re-attach to the session's jobs instead of starting over
+    active_query = st.session_state.get('active_query')
+    if active_query:
+        try:
+            # Time the user spends on this script run, waiting on jobs included
+            with tracer.span('app.render', session=session_id):
+                render_analysis(scheduler, session_id, active_query, db, sql_agent, powerbi, insight_gen)
+        except Exception as e:
+            st.error(f"An error occurred: {str(e)}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,52 @@
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_object_dtype, is_string_dtype
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+def is_arrow_backed(df):
+    """True when every column of the frame is stored in Arrow memory"""
+    return len(df.columns) > 0 and all(
+        isinstance(dtype, pd.ArrowDtype) or getattr(dtype, 'storage', None) == 'pyarrow'
+        for dtype in df.dtypes
+    )
+
+
+def numeric_columns(df):
+    """Numeric columns, for both NumPy and Arrow backed frames"""
+    return df.select_dtypes(include=['number']).columns.tolist()
+
+
+def categorical_columns(df):
+    """Text columns; Arrow strings are not object dtype so select_dtypes misses them"""
+    return [col for col, dtype in df.dtypes.items() if is_object_dtype(dtype) or is_string_dtype(dtype)]
+
+
+def datetime_columns(df):
+    """Date/time columns, including Arrow timestamp and date types"""
+    return [col for col, dtype in df.dtypes.items() if is_datetime64_any_dtype(dtype) or _is_arrow_temporal(dtype)]
+
+
+def _is_arrow_temporal(dtype):
+    if not (PYARROW_AVAILABLE and isinstance(dtype, pd.ArrowDtype)):
+        return False
+    return pa.types.is_temporal(dtype.pyarrow_dtype) and not pa.types.is_duration(dtype.pyarrow_dtype)
+
+
+def to_arrow_table(df):
+    """Convert a frame to a pyarrow.Table; zero-copy when the columns are Arrow backed"""
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def to_csv_bytes(df, header=True):
+    """Encode a frame as CSV bytes, writing Arrow-backed frames without a pandas round trip"""
+    if PYARROW_AVAILABLE and is_arrow_backed(df):
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(to_arrow_table(df), sink, write_options=pa_csv.WriteOptions(include_header=header))
+        return sink.getvalue().to_pybytes()
+    return df.to_csv(index=False, header=header).encode('utf-8')
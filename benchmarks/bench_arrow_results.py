@@ -0,0 +1,123 @@
+"""Memory/latency benchmark for NumPy vs Arrow-backed query results.
+
+Builds a synthetic sales result (1M rows by default) in a local SQLite file,
+or reads from DATABASE_URL when --use-database-url is given, then times the
+path a result takes through the app:
+
+    read      pd.read_sql_query into a DataFrame
+    display   conversion to a pyarrow.Table, as st.dataframe does
+    export    CSV encoding for the download button
+
+Each backend runs in its own process so peak RSS is measured independently.
+
+    python benchmarks/bench_arrow_results.py --rows 1000000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from arrow_frames import to_arrow_table, to_csv_bytes
+
+RESULT_QUERY = "SELECT region_name, product_name, sale_date, revenue, forecast, units_sold FROM bench_results"
+
+
+def build_sqlite(path, rows):
+    rng = np.random.default_rng(42)
+    regions = np.array(['North America', 'Europe', 'Asia Pacific', 'Latin America'])
+    products = np.array(['Laptop Pro', 'Smartphone X', 'Tablet Plus', 'Wireless Headphones', 'Smart Watch'])
+    df = pd.DataFrame({
+        'region_name': regions[rng.integers(0, len(regions), rows)],
+        'product_name': products[rng.integers(0, len(products), rows)],
+        'sale_date': (np.datetime64('2024-01-01') + rng.integers(0, 365, rows).astype('timedelta64[D]')).astype(str),
+        'revenue': rng.uniform(10000, 60000, rows).round(2),
+        'forecast': rng.uniform(12000, 57000, rows).round(2),
+        'units_sold': rng.integers(10, 110, rows)
+    })
+    engine = create_engine(f"sqlite:///{path}")
+    df.to_sql('bench_results', engine, if_exists='replace', index=False, chunksize=100000)
+    engine.dispose()
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(url, backend):
+    engine = create_engine(url)
+    baseline = peak_rss_mb()
+    timings = {}
+
+    t0 = time.perf_counter()
+    options = {} if backend == 'numpy' else {'dtype_backend': backend}
+    df = pd.read_sql_query(RESULT_QUERY, engine, **options)
+    timings['read_s'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    to_arrow_table(df)
+    timings['display_s'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    payload = to_csv_bytes(df)
+    timings['export_s'] = time.perf_counter() - t0
+
+    timings.update({
+        'backend': backend,
+        'rows': len(df),
+        'frame_mb': df.memory_usage(deep=True).sum() / 1024 / 1024,
+        'csv_mb': len(payload) / 1024 / 1024,
+        'peak_rss_delta_mb': peak_rss_mb() - baseline
+    })
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--path', default='/tmp/bench_arrow_results.db')
+    parser.add_argument('--use-database-url', action='store_true',
+                        help="read bench_results from DATABASE_URL instead of a local SQLite file")
+    parser.add_argument('--build', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--child', choices=['numpy', 'pyarrow'], help=argparse.SUPPRESS)
+    parser.add_argument('--url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build:
+        build_sqlite(args.path, args.rows)
+        return
+    if args.child:
+        run_child(args.url, args.child)
+        return
+
+    if args.use_database_url:
+        url = os.environ['DATABASE_URL']
+    else:
+        url = f"sqlite:///{args.path}"
+        print(f"Building {args.rows:,} row SQLite table at {args.path}...")
+        # Build in a separate process: ru_maxrss is inherited across fork/exec,
+        # so a large parent would hide the children's own peaks
+        subprocess.run([sys.executable, __file__, '--build', '--rows', str(args.rows), '--path', args.path], check=True)
+
+    print(f"{'backend':<8} {'rows':>10} {'read':>8} {'display':>8} {'export':>8} {'frame MB':>9} {'peak RSS MB':>12}")
+    for backend in ('numpy', 'pyarrow'):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', backend, '--url', url],
+            check=True, capture_output=True, text=True
+        ).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{r['backend']:<8} {r['rows']:>10,} {r['read_s']:>7.2f}s {r['display_s']:>7.2f}s "
+              f"{r['export_s']:>7.2f}s {r['frame_mb']:>9.1f} {r['peak_rss_delta_mb']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
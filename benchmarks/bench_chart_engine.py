@@ -0,0 +1,73 @@
+"""Payload-size and build-time benchmark for ChartEngine against raw Plotly Express.
+
+    python benchmarks/bench_chart_engine.py --rows 1000000
+
+For each chart type the script builds the figure from a synthetic frame
+twice, once straight through Plotly Express and once through ChartEngine,
+and reports the time to build and serialize the figure plus the JSON payload
+size that Streamlit ships to the browser. Serialization time is the
+server-side part of render time; browser draw time grows with the payload
+and is not measured here. No database is needed.
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_engine import ChartEngine
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'sale_date': pd.date_range('2020-01-01', periods=rows, freq='min'),
+        'revenue': np.cumsum(rng.normal(size=rows)),
+        'units': rng.normal(size=rows),
+        'product_name': rng.choice([f"product_{i}" for i in range(5000)], rows)
+    })
+
+
+def measure(build):
+    t0 = time.perf_counter()
+    fig = build()
+    built = time.perf_counter() - t0
+    payload = fig.to_json()
+    total = time.perf_counter() - t0
+    return built, total, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    engine = ChartEngine()
+    cases = [
+        ('line', lambda: px.line(df, x='sale_date', y='revenue'),
+         lambda: engine.line(df, 'sale_date', 'revenue')),
+        ('scatter', lambda: px.scatter(df, x='revenue', y='units'),
+         lambda: engine.scatter(df, 'revenue', 'units')),
+        ('histogram', lambda: px.histogram(df, x='units'),
+         lambda: engine.histogram(df, 'units')),
+        ('bar', lambda: px.bar(df, x='product_name', y='revenue'),
+         lambda: engine.bar(df, 'product_name', 'revenue')),
+    ]
+
+    print(f"rows={args.rows:,} max_points={engine.max_points} max_categories={engine.max_categories} "
+          f"webgl_threshold={engine.webgl_threshold}")
+    for name, raw, reduced in cases:
+        for label, build in (('plotly', raw), ('engine', reduced)):
+            built, total, size = measure(build)
+            print(f"{name:<10} {label:<7} build={built * 1000:9.1f}ms  build+json={total * 1000:9.1f}ms  "
+                  f"payload={size / 1024 / 1024:9.2f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Follow-up questions: drill-down on the previous result vs a new query.
+
+    python benchmarks/bench_drilldown.py --rows 1000000
+
+Asks a dashboard question against the SQLite benchmark database (created
+with bench_pipeline's generator if missing), then times each follow-up
+two ways: DrillDown answering it from the remembered frame, and the
+follow-up appended to the question going through the SQL agent and an
+uncached query, which is what the app did before.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import statistics
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseManager
+from sql_agent import SQLAgent
+from drilldown import DrillDown
+from embedded_engine import attach_sqlite_dialect
+from bench_pipeline import ROOT, load_sqlite
+
+QUESTION = "Show me revenue by region"
+FOLLOW_UPS = ["only Europe", "excluding Asia Pacific", "sort ascending", "top 3 of those", "above 1m"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    path = os.path.join(ROOT, 'benchmarks', f"bench_{args.rows}.sqlite")
+    if not os.path.exists(path):
+        load_sqlite(path, args.rows, args.seed)
+
+    db = DatabaseManager(engine=attach_sqlite_dialect(create_engine(f"sqlite:///{path}")))
+    agent = SQLAgent(db.get_schema_info(force_refresh=True), use_rollups=False, translation_cache=None)
+    regions = list(agent.router.regions.values())
+    sql = agent.natural_language_to_sql(QUESTION)
+    df, error = db.execute_query(sql, use_cache=False)
+    if error:
+        sys.exit(error)
+
+    drilldown = DrillDown()
+    print(f"{args.rows:,} sales rows, follow-ups to {QUESTION!r} (median of {args.repeat}):")
+    for follow_up in FOLLOW_UPS:
+        in_memory, requery = [], []
+        for _ in range(args.repeat):
+            drilldown.forget('bench')
+            drilldown.remember('bench', QUESTION, sql, df)
+            t0 = time.perf_counter()
+            result = drilldown.answer('bench', follow_up, regions)
+            in_memory.append(time.perf_counter() - t0)
+            if result is None or result.df is None:
+                sys.exit(f"{follow_up!r} was not answered from the previous result")
+
+            t0 = time.perf_counter()
+            _, error = db.execute_query(agent.natural_language_to_sql(f"{QUESTION} {follow_up}"), use_cache=False)
+            requery.append(time.perf_counter() - t0)
+            if error:
+                sys.exit(error)
+        print(f"  {follow_up!r:<26} drill-down {statistics.median(in_memory) * 1000:8.2f} ms   "
+              f"new query {statistics.median(requery) * 1000:8.1f} ms   ({', '.join(result.steps)})")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
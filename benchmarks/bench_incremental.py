@@ -0,0 +1,92 @@
+"""Monthly trends: full SQL recompute vs incremental aggregates after appends.
+
+    python benchmarks/bench_incremental.py --rows 1000000 --new-rows 1000
+
+Works on a scratch copy of the SQLite benchmark database (created with
+bench_pipeline's generator if missing). Each round appends ``--new-rows``
+sales rows, then times the monthly_trends SQL (uncached) against
+IncrementalAggregates.refresh() + answer() and checks both agree.
+"""
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import logging
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseManager
+from sql_agent import SQLAgent
+from embedded_engine import attach_sqlite_dialect
+from incremental_aggregates import IncrementalAggregates
+from bench_pipeline import ROOT, load_sqlite, sales_batch
+
+QUESTION = "Show monthly sales trends"
+
+
+def append_rows(path, rows, rng):
+    conn = sqlite3.connect(path)
+    start = conn.execute("SELECT COALESCE(MAX(sale_id), 0) + 1 FROM sales_data").fetchone()[0]
+    batch = sales_batch(start, rows, rng)
+    conn.executemany("INSERT INTO sales_data VALUES (?, ?, ?, ?, ?, ?, ?)", zip(*(batch[col].tolist() for col in batch)))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--new-rows', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    source = os.path.join(ROOT, 'benchmarks', f"bench_{args.rows}.sqlite")
+    if not os.path.exists(source):
+        load_sqlite(source, args.rows, args.seed)
+    scratch = os.path.join(tempfile.mkdtemp(prefix='bench_incremental_'), 'sales.sqlite')
+    shutil.copy(source, scratch)
+
+    db = DatabaseManager(engine=attach_sqlite_dialect(create_engine(f"sqlite:///{scratch}")))
+    agent = SQLAgent(db.get_schema_info(force_refresh=True), use_rollups=False, translation_cache=None)
+    match = agent.match_intent(QUESTION)
+    sql = agent.natural_language_to_sql(QUESTION)
+    aggregates = IncrementalAggregates(db, refresh_interval=0)
+
+    t0 = time.perf_counter()
+    aggregates.refresh()
+    print(f"initial build over {args.rows:,} rows: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(args.seed + 1)
+    full, incremental = [], []
+    for _ in range(args.rounds):
+        append_rows(scratch, args.new_rows, rng)
+        t0 = time.perf_counter()
+        expected, error = db.execute_query(sql, use_cache=False)
+        full.append(time.perf_counter() - t0)
+        if error:
+            sys.exit(error)
+        t0 = time.perf_counter()
+        df = aggregates.answer(match)
+        incremental.append(time.perf_counter() - t0)
+        if not np.allclose(df['monthly_revenue'], expected['monthly_revenue'].astype(float)):
+            sys.exit("incremental aggregates disagree with the SQL result")
+
+    print(f"per round, {args.new_rows:,} new rows (median of {args.rounds}):")
+    print(f"  full SQL recompute:          {statistics.median(full) * 1000:9.1f} ms")
+    print(f"  incremental refresh + answer:{statistics.median(incremental) * 1000:9.1f} ms")
+    db.close()
+    shutil.rmtree(os.path.dirname(scratch), ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Latency benchmark for the async insight pipeline against the local fake chat model.
+
+    python benchmarks/bench_insight_pipeline.py --sessions 20 --latency 1.0 --concurrency 4
+
+Simulates many sessions asking for insights at once. Half of them share a
+prompt, so the run shows both the concurrency limit (distinct prompts queue
+for a model slot) and coalescing (identical prompts share one call). Reports
+time to first token and time to full response per session. No API key or
+network access is needed.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insight_pipeline import InsightPipeline, FakeChatModel
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_session(pipeline, prompt):
+    t0 = time.perf_counter()
+    first_token = None
+    stream = pipeline.stream(InsightPipeline.prompt_key(prompt), [prompt])
+    for _ in stream:
+        if first_token is None:
+            first_token = time.perf_counter() - t0
+    if stream.error:
+        raise RuntimeError(stream.error)
+    return first_token, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=1.0, help='fake model time to first token (s)')
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    model = FakeChatModel(latency=args.latency, token_delay=args.token_delay)
+    pipeline = InsightPipeline(model, max_concurrency=args.concurrency, timeout=60)
+    # Even sessions share one prompt, odd sessions each ask something different
+    prompts = ['shared question' if i % 2 == 0 else f'question {i}' for i in range(args.sessions)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        results = list(pool.map(lambda prompt: run_session(pipeline, prompt), prompts))
+    elapsed = time.perf_counter() - start
+
+    first_tokens = [first for first, _ in results]
+    totals = [total for _, total in results]
+    print(f"sessions={args.sessions} concurrency={args.concurrency} model_latency={args.latency}s total={elapsed:.2f}s")
+    print(f"first token  p50={statistics.median(first_tokens) * 1000:8.1f}ms  p95={percentile(first_tokens, 95) * 1000:8.1f}ms")
+    print(f"full answer  p50={statistics.median(totals) * 1000:8.1f}ms  p95={percentile(totals, 95) * 1000:8.1f}ms")
+    print(f"model calls={model.calls} pipeline={pipeline.stats()}")
+    pipeline.close()
+
+
+if __name__ == '__main__':
+    main()
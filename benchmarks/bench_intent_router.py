@@ -0,0 +1,79 @@
+"""Throughput benchmark for IntentRouter.
+
+Registers the SQLAgent intents plus thousands of synthetic intents built
+from a random business vocabulary, then measures per-question latency and
+questions/second for matching (including parameter extraction).
+
+    python benchmarks/bench_intent_router.py --intents 5000 --questions 20000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import IntentRouter
+from sql_agent import INTENTS, DEFAULT_REGIONS
+
+VOCABULARY = [
+    'revenue', 'sales', 'units', 'margin', 'profit', 'forecast', 'customer', 'order', 'return', 'discount',
+    'region', 'product', 'category', 'store', 'channel', 'segment', 'supplier', 'warehouse', 'inventory',
+    'growth', 'trend', 'share', 'average', 'median', 'total', 'count', 'churn', 'retention', 'conversion',
+    'weekly', 'monthly', 'quarterly', 'yearly', 'daily', 'top', 'bottom', 'compare', 'breakdown', 'ranking'
+]
+
+QUESTIONS = [
+    "Show me revenue by region",
+    "What are the top 5 products by sales?",
+    "Compare actual vs forecast revenue for last quarter",
+    "Show monthly sales trends in Europe",
+    "revenue by category between 2024-01-01 and 2024-03-31",
+    "Which region has the best performance this year?",
+    "weekly churn by customer segment",
+    "top 10 suppliers by margin in 2024"
+]
+
+
+def build_router(synthetic_intents, rng):
+    router = IntentRouter(regions=DEFAULT_REGIONS)
+    for name, (phrases, defaults, _, _) in INTENTS.items():
+        router.register(name, phrases, defaults)
+    for i in range(synthetic_intents):
+        phrases = [' '.join(rng.sample(VOCABULARY, rng.randint(2, 4))) for _ in range(3)]
+        router.register(f"synthetic_{i}", phrases)
+    t0 = time.perf_counter()
+    router.build()
+    return router, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--intents', type=int, default=5000)
+    parser.add_argument('--questions', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    router, build_s = build_router(args.intents, rng)
+    phrase_count = sum(len(intent.phrases) for intent in router.intents())
+    print(f"{len(router.intents()):,} intents / {phrase_count:,} phrases indexed in {build_s * 1000:.1f}ms")
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(args.questions):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        t0 = time.perf_counter()
+        router.match(question)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{args.questions:,} questions in {elapsed:.2f}s -> {args.questions / elapsed:,.0f} questions/s")
+    print(f"mean={statistics.mean(latencies) * 1e6:.0f}us  p50={latencies[len(latencies) // 2] * 1e6:.0f}us  "
+          f"p99={latencies[int(len(latencies) * 0.99)] * 1e6:.0f}us  max={latencies[-1] * 1e6:.0f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Push-throughput benchmark for PowerBIManager against the local API stand-in.
+
+    python benchmarks/bench_powerbi_push.py --rows 1000000 --append 100000 --fail-rate 0.02
+
+Creates a dataset from a synthetic frame, pushes it in batches through the
+rate-limited, retrying PushClient, then appends more rows and checks that
+only the new rows are sent. The stand-in server is started in-process, with
+a high request budget by default so the run measures encoding and HTTP
+overhead rather than the real API's 120 requests/minute.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dataset_store import DatasetStore
+from powerbi_push import PushClient
+from powerbi_manager import PowerBIManager
+from powerbi_stub_server import start_stub
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'sale_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        'region_name': rng.choice(['North America', 'Europe', 'Asia Pacific', 'Latin America'], rows),
+        'units_sold': rng.integers(1, 100, rows),
+        'revenue': rng.uniform(10, 5000, rows).round(2)
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--append', type=int, default=100000)
+    parser.add_argument('--requests-per-minute', type=int, default=100000)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, state, url = start_stub(requests_per_minute=args.requests_per_minute, fail_rate=args.fail_rate)
+    client = PushClient(base_url=url, token='bench', requests_per_minute=args.requests_per_minute, backoff=0.05)
+
+    with tempfile.TemporaryDirectory() as root:
+        manager = PowerBIManager(store=DatasetStore(root), client=client)
+
+        df = make_frame(args.rows)
+        t0 = time.perf_counter()
+        dataset_id = manager.create_dataset_from_dataframe(df, 'bench', 'QueryResults')
+        elapsed = time.perf_counter() - t0
+        if dataset_id is None:
+            sys.exit("dataset creation failed")
+        print(f"create+push {args.rows:,} rows: {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+        t0 = time.perf_counter()
+        pushed = manager.append_rows(dataset_id, make_frame(args.append, seed=1))
+        elapsed = time.perf_counter() - t0
+        print(f"append {args.append:,} rows: pushed {pushed:,} in {elapsed:.2f}s")
+
+        info = manager.get_dataset_info(dataset_id)
+        remote_rows = state.datasets[info['remote_id']]['tables']['QueryResults']
+        print(f"stored={info['row_count']:,} acknowledged={info['pushed_rows']:,} received={remote_rows:,}")
+        print(f"requests={state.requests} throttled={state.throttled} failed={state.failed} client_retries={client.retries}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
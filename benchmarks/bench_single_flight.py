@@ -0,0 +1,89 @@
+"""Concurrent identical questions with and without single-flight query sharing.
+
+    python benchmarks/bench_single_flight.py --sessions 50 --rows 1000000
+
+Simulates ``--sessions`` users asking the same dashboard question at the
+same moment against the SQLite benchmark database (created with
+bench_pipeline's generator if missing). Each session streams the query
+the way the app's query job does, with the result cache empty. Reports wall
+time, median session latency and how many queries reached the database.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import DatabaseManager
+from sql_agent import SQLAgent
+from embedded_engine import attach_sqlite_dialect
+from bench_pipeline import ROOT, load_sqlite
+
+QUESTION = "Show me revenue by region"
+
+
+def run(path, sessions, single_flight):
+    os.environ['SINGLE_FLIGHT'] = 'true' if single_flight else 'false'
+    db = DatabaseManager(engine=attach_sqlite_dialect(create_engine(f"sqlite:///{path}")))
+    agent = SQLAgent(db.get_schema_info(force_refresh=True), use_rollups=False, translation_cache=None)
+    sql = agent.natural_language_to_sql(QUESTION)
+
+    executed = 0
+    lock = threading.Lock()
+    original = db._stream_sql
+
+    def counting_stream(*args, **kwargs):
+        nonlocal executed
+        with lock:
+            executed += 1
+        return original(*args, **kwargs)
+
+    db._stream_sql = counting_stream
+    barrier = threading.Barrier(sessions)
+
+    def session(_):
+        barrier.wait()
+        t0 = time.perf_counter()
+        result, error = db.stream_query(sql)
+        if error:
+            raise RuntimeError(error)
+        result.to_frame()
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        latencies = list(pool.map(session, range(sessions)))
+    wall = time.perf_counter() - t0
+    db.close()
+    return wall, statistics.median(latencies), executed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    path = os.path.join(ROOT, 'benchmarks', f"bench_{args.rows}.sqlite")
+    if not os.path.exists(path):
+        load_sqlite(path, args.rows, args.seed)
+
+    print(f"{args.sessions} concurrent sessions, {args.rows:,} sales rows: {QUESTION!r}")
+    for label, single_flight in (('without single-flight', False), ('with single-flight', True)):
+        wall, median, executed = run(path, args.sessions, single_flight)
+        print(f"  {label:<22} wall={wall * 1000:8.1f} ms  median session={median * 1000:8.1f} ms  "
+              f"database queries={executed}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Start-up time: import to first answer, cold vs with the warm-up artifact.
+
+    python benchmarks/bench_startup.py --rows 200000 --runs 5
+
+Each run is a fresh Python process that does what the app does on its first
+request: import the app's modules, set up the database, schema and SQL
+agent (init_components), then answer a sample question through the guard
+and the streaming query path and profile the result. Runs against the
+embedded engine over the benchmark extracts (created with bench_pipeline's
+generator if missing), or DATABASE_URL with --use-database-url. The warm
+runs use an artifact built by ``warmup.py build`` beforehand. Also reports
+whether plotly, requests and langchain stayed unloaded until first use.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import tempfile
+import statistics
+import subprocess
+
+T_START = time.perf_counter()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+QUESTION = "Show me total revenue by region"
+DEFERRED_MODULES = ['plotly.express', 'requests', 'langchain_openai']
+STAGES = ['imports', 'database', 'schema_agent', 'warm_start', 'first_answer']
+
+
+def run_child():
+    stages = {}
+    t0 = T_START
+    import pandas  # noqa: F401
+    from database import DatabaseManager
+    from sql_agent import SQLAgent
+    from powerbi_manager import PowerBIManager
+    from insight_generator import InsightGenerator
+    from exporter import ResultExporter  # noqa: F401
+    from data_profiler import profile_result
+    from jobs import JobScheduler  # noqa: F401
+    from chart_engine import ChartEngine  # noqa: F401
+    from warmup import WarmStart
+    stages['imports'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    db = DatabaseManager()
+    stages['database'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    warm = WarmStart()
+    warm.load(db)
+    agent = SQLAgent(warm.schema_info(db), foreign_keys=warm.foreign_keys(db), intent_tables=warm.intent_tables)
+    PowerBIManager()
+    InsightGenerator()
+    stages['schema_agent'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    preloaded = warm.apply(db)
+    stages['warm_start'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    decision = db.guard.check(agent.natural_language_to_sql(QUESTION))
+    result, error = db.stream_query(decision.sql)
+    if error:
+        sys.exit(error)
+    profile_result(result.to_frame())
+    stages['first_answer'] = time.perf_counter() - t0
+
+    stages['total'] = time.perf_counter() - T_START
+    stages['preloaded'] = preloaded
+    stages['loaded_modules'] = [name for name in DEFERRED_MODULES if name in sys.modules]
+
+    # What importing them eagerly would have added to start-up
+    t0 = time.perf_counter()
+    for name in DEFERRED_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    stages['deferred_imports'] = time.perf_counter() - t0
+    db.close()
+    print(json.dumps(stages))
+
+
+def run(env, runs):
+    results = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        output = subprocess.run([sys.executable, __file__, '--child'], env=env, cwd=ROOT,
+                                check=True, capture_output=True, text=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        r['process'] = time.perf_counter() - t0
+        results.append(r)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--use-database-url', action='store_true',
+                        help="start against DATABASE_URL instead of the embedded engine")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    env = dict(os.environ, INSIGHT_MODEL='demo', TRACING='false')
+    if not args.use_database_url:
+        from bench_pipeline import load_extracts
+        extracts = os.path.join(ROOT, 'benchmarks', f"extracts_{args.rows}")
+        if not os.path.exists(os.path.join(extracts, 'sales_data.parquet')):
+            load_extracts(extracts, args.rows, args.seed)
+        env.pop('DATABASE_URL', None)
+        env.update(DATABASE_BACKEND='embedded', EMBEDDED_DATA_PATH=extracts)
+
+    artifact = tempfile.mkdtemp(prefix='bench_startup_')
+    subprocess.run([sys.executable, 'warmup.py', 'build', artifact], env=env, cwd=ROOT,
+                   check=True, capture_output=True)
+
+    print(f"import to first answer, median of {args.runs} fresh processes: {QUESTION!r}")
+    print(f"  {'':<6}" + ''.join(f"{stage:>14}" for stage in STAGES + ['total', 'process']))
+    for label, overrides in (('cold', {'WARMUP': 'false'}), ('warm', {'WARMUP_PATH': artifact})):
+        results = run(dict(env, **overrides), args.runs)
+        medians = [statistics.median(r[stage] for r in results) * 1000 for stage in STAGES + ['total', 'process']]
+        print(f"  {label:<6}" + ''.join(f"{ms:>11.1f} ms" for ms in medians))
+        last = results[-1]
+        print(f"         preloaded results: {last['preloaded']}, "
+              f"deferred modules loaded: {', '.join(last['loaded_modules']) or 'none'} "
+              f"(importing them up front: +{statistics.median(r['deferred_imports'] for r in results) * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
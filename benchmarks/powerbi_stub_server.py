@@ -0,0 +1,168 @@
+"""Local stand-in for the Power BI push-datasets REST API.
+
+    python benchmarks/powerbi_stub_server.py --port 8765 --fail-rate 0.05
+    POWERBI_API_URL=http://localhost:8765/v1.0/myorg POWERBI_TOKEN=dev streamlit run app.py
+
+Implements the endpoints PushClient uses (list and create datasets, post
+rows, delete rows), keeps row counts in memory, rejects posts over 10,000 rows, answers
+429 with Retry-After (in seconds, or as an HTTP-date) when a dataset
+exceeds its per-minute request budget, and fails a configurable share of
+requests with 503 so retries get exercised. ``lose_creates`` answers that
+many dataset creates with 503 after creating them, like a response lost on
+the way back. tests/test_powerbi_push.py runs
+PushClient and PowerBIManager against it.
+"""
+import re
+import json
+import uuid
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROWS_PATH = re.compile(r"^/v1\.0/myorg/datasets/([^/]+)/tables/([^/]+)/rows$")
+
+
+class StubState:
+    def __init__(self, requests_per_minute=120, fail_rate=0.0, max_rows=10000, window=60.0, retry_after_date=False,
+                 lose_creates=0):
+        self.requests_per_minute = requests_per_minute
+        self.fail_rate = fail_rate
+        self.max_rows = max_rows
+        # Seconds the request budget applies to; shorter than a minute in tests
+        self.window = window
+        self.retry_after_date = retry_after_date
+        self.lose_creates = lose_creates
+        self.datasets = {}
+        self.requests = 0
+        self.throttled = 0
+        self.failed = 0
+        self._calls = {}
+        self.lock = threading.Lock()
+
+    def throttle_wait(self, dataset_id):
+        """Seconds the caller must wait, or 0 when the request fits in the window"""
+        with self.lock:
+            now = time.monotonic()
+            calls = [t for t in self._calls.get(dataset_id, []) if now - t < self.window]
+            if len(calls) >= self.requests_per_minute:
+                self._calls[dataset_id] = calls
+                return self.window - (now - calls[0])
+            calls.append(now)
+            self._calls[dataset_id] = calls
+            return 0
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body=None, headers=None):
+            payload = json.dumps(body or {}).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length', 0))
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def _flaky(self):
+            with state.lock:
+                state.requests += 1
+                if random.random() < state.fail_rate:
+                    state.failed += 1
+                    return True
+            return False
+
+        def do_POST(self):
+            if self._flaky():
+                return self._reply(503, {'error': 'transient failure'})
+            if self.path == '/v1.0/myorg/datasets':
+                body = self._read_json()
+                dataset_id = uuid.uuid4().hex
+                with state.lock:
+                    state.datasets[dataset_id] = {'name': body.get('name'), 'tables': {t['name']: 0 for t in body['tables']}}
+                    lost = state.lose_creates > 0
+                    if lost:
+                        state.lose_creates -= 1
+                        state.failed += 1
+                if lost:
+                    return self._reply(503, {'error': 'transient failure'})
+                return self._reply(201, {'id': dataset_id, 'name': body.get('name')})
+
+            match = ROWS_PATH.match(self.path)
+            if not match or match.group(1) not in state.datasets:
+                return self._reply(404, {'error': 'not found'})
+            wait = state.throttle_wait(match.group(1))
+            if wait:
+                with state.lock:
+                    state.throttled += 1
+                if state.retry_after_date:
+                    # HTTP-dates have whole-second resolution, so round the wait up
+                    retry_after = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=wait + 1), usegmt=True)
+                else:
+                    retry_after = f"{wait:.2f}"
+                return self._reply(429, {'error': 'too many requests'}, {'Retry-After': retry_after})
+            rows = self._read_json().get('rows', [])
+            if len(rows) > state.max_rows:
+                return self._reply(400, {'error': f"more than {state.max_rows} rows"})
+            with state.lock:
+                tables = state.datasets[match.group(1)]['tables']
+                tables[match.group(2)] = tables.get(match.group(2), 0) + len(rows)
+            return self._reply(200)
+
+        def do_GET(self):
+            if self._flaky():
+                return self._reply(503, {'error': 'transient failure'})
+            if self.path != '/v1.0/myorg/datasets':
+                return self._reply(404, {'error': 'not found'})
+            with state.lock:
+                value = [{'id': dataset_id, 'name': dataset['name']} for dataset_id, dataset in state.datasets.items()]
+            return self._reply(200, {'value': value})
+
+        def do_DELETE(self):
+            match = ROWS_PATH.match(self.path)
+            if not match or match.group(1) not in state.datasets:
+                return self._reply(404, {'error': 'not found'})
+            with state.lock:
+                state.datasets[match.group(1)]['tables'][match.group(2)] = 0
+            return self._reply(200)
+
+    return Handler
+
+
+def start_stub(port=0, **kwargs):
+    """Start the stub on a daemon thread; returns (server, state, base_url)"""
+    state = StubState(**kwargs)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/v1.0/myorg"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--requests-per-minute', type=int, default=120)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, state, url = start_stub(args.port, requests_per_minute=args.requests_per_minute, fail_rate=args.fail_rate)
+    print(f"Power BI stub listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
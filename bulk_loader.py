@@ -0,0 +1,302 @@
+import os
+import sys
+import time
+import logging
+from datetime import date
+
+from sqlalchemy import text
+
+from arrow_frames import PYARROW_AVAILABLE
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+SALES_COLUMNS = ['sale_id', 'region_id', 'product_id', 'sale_date', 'revenue', 'forecast', 'units_sold']
+
+# sales_data range-partitioned by month. The primary key has to include the
+# partition key; sale_id stays unique because it comes from one sequence.
+PARTITIONED_DDL = [
+    "CREATE SEQUENCE IF NOT EXISTS sales_data_sale_id_seq AS BIGINT",
+    """
+    CREATE TABLE IF NOT EXISTS sales_data (
+        sale_id BIGINT NOT NULL DEFAULT nextval('sales_data_sale_id_seq'),
+        region_id INTEGER REFERENCES regions(region_id),
+        product_id INTEGER REFERENCES products(product_id),
+        sale_date DATE NOT NULL,
+        revenue DECIMAL(10,2) NOT NULL,
+        forecast DECIMAL(10,2) NOT NULL,
+        units_sold INTEGER NOT NULL,
+        PRIMARY KEY (sale_id, sale_date)
+    ) PARTITION BY RANGE (sale_date)
+    """,
+    "ALTER SEQUENCE sales_data_sale_id_seq OWNED BY sales_data.sale_id",
+    "CREATE TABLE IF NOT EXISTS sales_data_default PARTITION OF sales_data DEFAULT"
+]
+
+# Secondary indexes shaped after the SQLAgent templates. Date ranges are
+# pruned to month partitions and narrowed further by the BRIN index, which
+# costs a few pages per partition because rows arrive in date order. The
+# covering indexes let the region and product aggregates (optionally with
+# a date range) run as index-only scans.
+INDEXES = {
+    'sales_data_sale_date_brin':
+        "CREATE INDEX IF NOT EXISTS sales_data_sale_date_brin ON sales_data USING BRIN (sale_date) "
+        "WITH (pages_per_range = 32)",
+    'sales_data_region_date_idx':
+        "CREATE INDEX IF NOT EXISTS sales_data_region_date_idx ON sales_data (region_id, sale_date) "
+        "INCLUDE (revenue, forecast, units_sold)",
+    'sales_data_product_date_idx':
+        "CREATE INDEX IF NOT EXISTS sales_data_product_date_idx ON sales_data (product_id, sale_date) "
+        "INCLUDE (revenue)"
+}
+
+IS_PARTITIONED_QUERY = "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'sales_data'::regclass)"
+
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+
+def next_month(d):
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"sales_data_y{month.year}m{month.month:02d}"
+
+
+def months_between(first, last):
+    """Month starts from the month of ``first`` through the month of ``last``"""
+    month, months = month_start(first), []
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def read_batches(path, batch_rows):
+    """Stream a CSV or Parquet file as Arrow record batches"""
+    if path.endswith('.parquet'):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_rows)
+        return
+    reader = pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=64 * 1024 * 1024),
+        convert_options=pa_csv.ConvertOptions(column_types={'sale_date': pa.date32()})
+    )
+    for batch in reader:
+        yield batch
+
+
+class BulkLoader:
+    """Loads sales_data in bulk with COPY into monthly partitions.
+
+    Files are streamed batch by batch (CSV or Parquet via Arrow). Before a
+    batch is copied, partitions for the months it covers are created on
+    the same connection, so the whole load is one transaction. Input
+    ``sale_id`` values are ignored unless ``keep_ids`` is set: ids from the
+    sequence keep growing, which the incremental aggregates' high-water mark
+    relies on. After the load the touched partitions are vacuumed and
+    analyzed.
+    """
+
+    def __init__(self, db, batch_rows=None):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("BulkLoader requires pyarrow")
+        self.db = db
+        self.batch_rows = batch_rows or int(os.getenv('LOAD_BATCH_ROWS', '500000'))
+
+    def is_partitioned(self):
+        with self.db.engine.connect() as conn:
+            return bool(conn.execute(text(IS_PARTITIONED_QUERY)).scalar())
+
+    def create_table(self):
+        """Create the partitioned sales_data (when missing) and its indexes"""
+        with self.db.engine.begin() as conn:
+            for ddl in PARTITIONED_DDL:
+                conn.execute(text(ddl))
+        self.create_indexes()
+
+    def create_indexes(self):
+        with self.db.engine.begin() as conn:
+            conn.execute(text("SET LOCAL maintenance_work_mem = '1GB'"))
+            for ddl in INDEXES.values():
+                conn.execute(text(ddl))
+
+    def drop_indexes(self):
+        with self.db.engine.begin() as conn:
+            for name in INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    def partition(self):
+        """Convert an existing plain sales_data into the partitioned layout, keeping rows and ids"""
+        if self.is_partitioned():
+            logging.info("sales_data is already partitioned")
+            return
+        t0 = time.perf_counter()
+        with self.db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE sales_data RENAME TO sales_data_unpartitioned"))
+            conn.execute(text("ALTER TABLE sales_data_unpartitioned RENAME CONSTRAINT sales_data_pkey TO sales_data_unpartitioned_pkey"))
+            # Keep the serial sequence when dropping the old table
+            conn.execute(text("ALTER SEQUENCE sales_data_sale_id_seq AS BIGINT OWNED BY NONE"))
+            for ddl in PARTITIONED_DDL:
+                conn.execute(text(ddl))
+            first, last = conn.execute(text("SELECT MIN(sale_date), MAX(sale_date) FROM sales_data_unpartitioned")).one()
+            if first is not None:
+                for month in months_between(first, last):
+                    conn.execute(text(self._partition_ddl(month)))
+            conn.execute(text(
+                f"INSERT INTO sales_data ({', '.join(SALES_COLUMNS)}) "
+                f"SELECT {', '.join(SALES_COLUMNS)} FROM sales_data_unpartitioned"
+            ))
+            conn.execute(text("DROP TABLE sales_data_unpartitioned"))
+        self.create_indexes()
+        self.analyze()
+        logging.info(f"sales_data partitioned in {time.perf_counter() - t0:.1f}s")
+
+    def ensure_partitions(self, cursor, months, known):
+        for month in months:
+            if month not in known:
+                self._create_partition(cursor, month)
+                known.add(month)
+
+    def _create_partition(self, cursor, month):
+        """Create ``month``'s partition, first moving any of its rows out of the DEFAULT partition.
+
+        PostgreSQL refuses to create a partition while the default one holds
+        rows in its range, so the default is detached, the new partition is
+        created, those rows are re-inserted through the parent and the
+        default is attached again. This all happens in the load's
+        transaction, which holds an exclusive lock on sales_data until it
+        commits.
+        """
+        start, end = month.isoformat(), next_month(month).isoformat()
+        cursor.execute("SELECT to_regclass('sales_data_default') IS NOT NULL")
+        has_default = cursor.fetchone()[0]
+        if has_default:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM sales_data_default WHERE sale_date >= %s AND sale_date < %s)",
+                (start, end)
+            )
+        if not has_default or not cursor.fetchone()[0]:
+            cursor.execute(self._partition_ddl(month))
+            return
+        columns = ', '.join(SALES_COLUMNS)
+        cursor.execute("ALTER TABLE sales_data DETACH PARTITION sales_data_default")
+        cursor.execute(self._partition_ddl(month))
+        # A move is not a change to the data, so the rollup change capture must not see it
+        cursor.execute("ALTER TABLE sales_data DISABLE TRIGGER USER")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM sales_data_default WHERE sale_date >= %s AND sale_date < %s "
+            f"RETURNING {columns}) INSERT INTO sales_data ({columns}) SELECT {columns} FROM moved",
+            (start, end)
+        )
+        logging.info(f"Moved {cursor.rowcount:,} rows from sales_data_default into {partition_name(month)}")
+        cursor.execute("ALTER TABLE sales_data ENABLE TRIGGER USER")
+        cursor.execute("ALTER TABLE sales_data ATTACH PARTITION sales_data_default DEFAULT")
+
+    def load(self, path, defer_indexes=False, keep_ids=False):
+        """COPY a CSV or Parquet file into sales_data; returns the number of rows loaded.
+
+        ``defer_indexes`` drops the secondary indexes for the load and
+        rebuilds them afterwards, which is much faster for initial loads
+        but leaves queries unindexed meanwhile.
+        """
+        if not self.is_partitioned():
+            raise RuntimeError("sales_data is not partitioned; run 'python bulk_loader.py partition' first")
+        if defer_indexes:
+            self.drop_indexes()
+
+        t0 = time.perf_counter()
+        rows, months_loaded = 0, set()
+        raw = self.db.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute("SELECT relname FROM pg_class WHERE relname ~ '^sales_data_y[0-9]{4}m[0-9]{2}$'")
+            known = {date(int(name[12:16]), int(name[17:19]), 1) for name, in cursor.fetchall()}
+            for batch in read_batches(path, self.batch_rows):
+                columns = [col for col in SALES_COLUMNS if col in batch.schema.names and (keep_ids or col != 'sale_id')]
+                batch = batch.select(columns)
+                bounds = pc.min_max(batch.column('sale_date'))
+                if bounds['min'].is_valid:
+                    months = months_between(bounds['min'].as_py(), bounds['max'].as_py())
+                    self.ensure_partitions(cursor, months, known)
+                    months_loaded.update(months)
+                sink = pa.BufferOutputStream()
+                pa_csv.write_csv(batch, sink, write_options=pa_csv.WriteOptions(include_header=False))
+                cursor.copy_expert(
+                    f"COPY sales_data ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                    pa.BufferReader(sink.getvalue())
+                )
+                rows += batch.num_rows
+                logging.info(f"Copied {rows:,} rows ({rows / (time.perf_counter() - t0):,.0f} rows/s)")
+            if keep_ids:
+                cursor.execute("SELECT setval('sales_data_sale_id_seq', GREATEST((SELECT MAX(sale_id) FROM sales_data), 1))")
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+        copy_seconds = time.perf_counter() - t0
+
+        if defer_indexes:
+            self.create_indexes()
+        self.analyze(sorted(months_loaded))
+        self.db.invalidate_table('sales_data')
+        logging.info(
+            f"Loaded {rows:,} rows from {path}: copy {copy_seconds:.1f}s, "
+            f"total {time.perf_counter() - t0:.1f}s"
+        )
+        return rows
+
+    def analyze(self, months=None):
+        """VACUUM ANALYZE the given month partitions (all when None), then ANALYZE the parent.
+
+        Vacuuming sets the visibility map that index-only scans need.
+        Autovacuum never analyzes a partitioned parent, so its statistics
+        are refreshed here explicitly.
+        """
+        targets = [partition_name(month) for month in months] if months is not None else ['sales_data']
+        with self.db.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+            for target in targets:
+                conn.execute(text(f"VACUUM (ANALYZE) {target}"))
+            if months is not None:
+                conn.execute(text("ANALYZE sales_data"))
+
+    def _partition_ddl(self, month):
+        return (
+            f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF sales_data "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+        )
+
+
+def main(argv):
+    from database import DatabaseManager
+
+    command = argv[1] if len(argv) > 1 else None
+    db = DatabaseManager(backend='postgres')
+    if db.mock_mode:
+        sys.exit("DATABASE_URL is required to load data")
+
+    loader = BulkLoader(db)
+    if command == 'create':
+        loader.create_table()
+    elif command == 'partition':
+        loader.partition()
+    elif command == 'load' and len(argv) > 2:
+        loader.load(argv[2], defer_indexes='--defer-indexes' in argv, keep_ids='--keep-ids' in argv)
+    elif command == 'analyze':
+        loader.analyze()
+    else:
+        sys.exit("Usage: python bulk_loader.py create | partition | load <file.csv|file.parquet> "
+                 "[--defer-indexes] [--keep-ids] | analyze")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv)
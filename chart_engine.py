@@ -0,0 +1,175 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+from lazy_imports import lazy_import
+
+# plotly.express alone takes longer to import than the rest of the app's
+# modules after pandas; load it with the first chart instead of at start-up
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of ``threshold`` points that keep the line's shape"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(area.argmax())
+        indices[i + 1] = selected
+    return indices
+
+
+def minmax_indices(y, buckets):
+    """Indices of the minimum and maximum point in each of ``buckets`` equal-width buckets"""
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+    bucket_id = np.repeat(np.arange(buckets), np.diff(np.linspace(0, n, buckets + 1).astype(np.int64)))
+    order = np.lexsort((y, bucket_id))
+    starts = np.searchsorted(bucket_id[order], np.arange(buckets), side='left')
+    ends = np.searchsorted(bucket_id[order], np.arange(buckets), side='right') - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def axis_values(series):
+    """Float view of an axis for downsampling math: epoch ns for datetimes, positions for text"""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        index = pd.DatetimeIndex(series)
+        values = index.asi8.astype('float64')
+        values[index.isna()] = np.nan
+        return values
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(dtype='float64', na_value=np.nan)
+    return np.arange(len(series), dtype='float64')
+
+
+def aggregate_categories(df, category_col, value_col, max_categories, other_label='Other'):
+    """Sum ``value_col`` per category, keep the largest ``max_categories - 1`` and fold the rest into one bar"""
+    totals = df.groupby(category_col, sort=False, observed=True, dropna=False)[value_col].sum()
+    if len(totals) <= max_categories:
+        return totals.reset_index()
+    totals = totals.sort_values(ascending=False)
+    head = totals.iloc[:max_categories - 1]
+    tail = totals.iloc[max_categories - 1:]
+    other = pd.Series([tail.sum()], index=[f"{other_label} ({len(tail):,})"])
+    combined = pd.concat([head.rename(index=str), other])
+    return combined.rename_axis(category_col).rename(value_col).reset_index()
+
+
+class ChartEngine:
+    """Builds Plotly figures whose payload stays bounded regardless of result size.
+
+    Small frames go straight to Plotly Express. Above the limits, line
+    charts are downsampled (LTTB or min/max per bucket), histograms and
+    dense scatters are binned in NumPy before anything is serialized, bar
+    charts fold long-tail categories into an 'Other' bar, and remaining
+    large point traces switch to WebGL.
+    """
+
+    def __init__(self, max_points=None, webgl_threshold=None, max_categories=None,
+                 max_scatter_points=None, bins=None, method=None):
+        self.max_points = max_points or int(os.getenv('CHART_MAX_POINTS', '5000'))
+        self.webgl_threshold = webgl_threshold or int(os.getenv('CHART_WEBGL_THRESHOLD', '10000'))
+        self.max_categories = max_categories or int(os.getenv('CHART_MAX_CATEGORIES', '50'))
+        self.max_scatter_points = max_scatter_points or int(os.getenv('CHART_MAX_SCATTER_POINTS', '200000'))
+        self.bins = bins or int(os.getenv('CHART_BINS', '50'))
+        self.method = method or os.getenv('CHART_DOWNSAMPLE', 'lttb')
+
+    def bar(self, df, x, y, **kwargs):
+        """Bar chart; frames with many bars are summed per category with the long tail folded"""
+        if len(df) > self.max_categories:
+            rows = len(df)
+            df = aggregate_categories(df, x, y, self.max_categories)
+            self._log('bar', rows, len(df))
+        return px.bar(df, x=x, y=y, **kwargs)
+
+    def line(self, df, x, y, **kwargs):
+        """Line chart; long series are reduced to ``max_points`` shape-preserving points"""
+        if len(df) > self.max_points:
+            rows = len(df)
+            df = self.downsample(df, x, y)
+            self._log('line', rows, len(df))
+        # 'auto' lets Plotly pick; past our threshold always use WebGL
+        render_mode = 'webgl' if len(df) > self.webgl_threshold else 'auto'
+        return px.line(df, x=x, y=y, render_mode=render_mode, **kwargs)
+
+    def scatter(self, df, x, y, **kwargs):
+        """Scatter plot; WebGL above ``webgl_threshold`` points, a binned density heatmap above ``max_scatter_points``"""
+        if len(df) > self.max_scatter_points:
+            self._log('scatter', len(df), self.bins * self.bins)
+            return self.heatmap(df, x, y, title=kwargs.get('title'))
+        render_mode = 'webgl' if len(df) > self.webgl_threshold else 'auto'
+        return px.scatter(df, x=x, y=y, render_mode=render_mode, **kwargs)
+
+    def histogram(self, df, x, **kwargs):
+        """Histogram; large columns are binned server-side and sent as bar heights"""
+        if len(df) <= self.max_points:
+            return px.histogram(df, x=x, **kwargs)
+
+        values = df[x].to_numpy(dtype='float64', na_value=np.nan)
+        counts, edges = np.histogram(values[~np.isnan(values)], bins=self.bins)
+        self._log('histogram', len(df), len(counts))
+        fig = go.Figure(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            marker_color=(kwargs.get('color_discrete_sequence') or [None])[0]
+        ))
+        fig.update_layout(title=kwargs.get('title'), xaxis_title=x, yaxis_title='count', bargap=0)
+        return fig
+
+    def heatmap(self, df, x, y, title=None):
+        """2-D density of two numeric columns, binned with NumPy"""
+        xs = axis_values(df[x])
+        ys = axis_values(df[y])
+        valid = ~(np.isnan(xs) | np.isnan(ys))
+        counts, x_edges, y_edges = np.histogram2d(xs[valid], ys[valid], bins=self.bins)
+        fig = go.Figure(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            # histogram2d is indexed [x, y]; Heatmap expects rows of y
+            z=counts.T,
+            colorscale='Viridis',
+            colorbar={'title': 'count'}
+        ))
+        fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+        return fig
+
+    def downsample(self, df, x, y):
+        """Return at most ``max_points`` rows of ``df`` ordered by ``x`` (None means the row order)"""
+        if x is not None:
+            df = df.sort_values(x, kind='stable')
+            xs = axis_values(df[x])
+        else:
+            xs = np.arange(len(df), dtype='float64')
+        ys = axis_values(df[y])
+        valid = ~(np.isnan(xs) | np.isnan(ys))
+        if not valid.all():
+            df, xs, ys = df[valid], xs[valid], ys[valid]
+
+        if self.method == 'minmax':
+            indices = minmax_indices(ys, self.max_points // 2)
+        else:
+            indices = lttb_indices(xs, ys, self.max_points)
+        return df.iloc[indices]
+
+    def _log(self, kind, rows, points=None):
+        points = rows if points is None else points
+        logging.info(f"Chart engine reduced {kind} from {rows:,} rows to {points:,} points")
@@ -0,0 +1,217 @@
+import os
+import weakref
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from arrow_frames import numeric_columns, categorical_columns, datetime_columns
+
+# z-score for the 95% confidence interval reported on sampled means
+Z_95 = 1.96
+
+# Column names that suggest a time axis even when the values are not datetimes
+TIME_KEYWORDS = ('date', 'time', 'month', 'year', 'day')
+
+
+def frame_fingerprint(df, probe_rows=64):
+    """Cheap identity for a frame: shape, schema and a hash of a few spread-out rows"""
+    n = len(df)
+    if n > probe_rows:
+        positions = np.unique(np.linspace(0, n - 1, probe_rows).astype(int))
+        probe = df.iloc[positions]
+    else:
+        probe = df
+    try:
+        row_hash = int(pd.util.hash_pandas_object(probe, index=False).sum())
+    except TypeError:
+        # Unhashable cells (lists, dicts): fall back to their string form
+        row_hash = hash(probe.to_string())
+    return (df.shape, tuple(map(str, df.columns)), tuple(map(str, df.dtypes)), row_hash)
+
+
+class DataProfiler:
+    """Computes numeric and categorical column statistics for a whole frame at once.
+
+    Numeric columns are reduced together as a single float block (count,
+    mean, std, min, max) instead of one ``describe()`` per column, which
+    also skips the percentile sorts nobody reads. Frames larger than
+    ``sample_rows`` can be profiled from a uniform or stratified sample;
+    sampled means then carry a 95% error bound. Profiles are memoized by
+    frame fingerprint.
+    """
+
+    def __init__(self, sample_rows=None, cache_size=64, seed=0):
+        self.sample_rows = sample_rows if sample_rows is not None else int(os.getenv('PROFILE_SAMPLE_ROWS', '0'))
+        self.cache_size = cache_size
+        self.seed = seed
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def profile(self, df, strata=None):
+        key = (frame_fingerprint(df), self.sample_rows, strata)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        result = self._compute(df, strata)
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _compute(self, df, strata):
+        population = len(df)
+        sampled = bool(self.sample_rows) and population > self.sample_rows
+        frame = self._sample(df, strata) if sampled else df
+
+        profile = {
+            'rows': population,
+            'columns': df.shape[1],
+            'sampled': sampled,
+            'sample_rows': len(frame),
+            'numeric': self._numeric_stats(frame, population if sampled else None),
+            'categorical': self._categorical_stats(frame)
+        }
+        return profile
+
+    def _sample(self, df, strata):
+        rng = np.random.default_rng(self.seed)
+        if strata is not None and strata in df.columns:
+            # Proportional allocation keeps every stratum represented
+            fraction = self.sample_rows / len(df)
+            return df.groupby(strata, group_keys=False, observed=True, dropna=False).sample(
+                frac=fraction, random_state=self.seed
+            )
+        positions = np.sort(rng.choice(len(df), size=self.sample_rows, replace=False))
+        return df.iloc[positions]
+
+    def _numeric_stats(self, frame, population):
+        cols = numeric_columns(frame)
+        if not cols:
+            return {}
+
+        block = frame[cols].to_numpy(dtype='float64', na_value=np.nan)
+        valid = ~np.isnan(block)
+        count = valid.sum(axis=0)
+        filled = np.where(valid, block, 0.0)
+        total = filled.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            variance = ((np.where(valid, block - mean, 0.0)) ** 2).sum(axis=0) / (count - 1)
+            minimum = np.where(valid, block, np.inf).min(axis=0, initial=np.inf)
+            maximum = np.where(valid, block, -np.inf).max(axis=0, initial=-np.inf)
+
+        stats = {}
+        for i, col in enumerate(cols):
+            has_values = count[i] > 0
+            entry = {
+                'count': int(count[i]),
+                'mean': float(mean[i]) if has_values else float('nan'),
+                'std': float(np.sqrt(variance[i])) if count[i] > 1 else float('nan'),
+                'min': float(minimum[i]) if has_values else float('nan'),
+                'max': float(maximum[i]) if has_values else float('nan')
+            }
+            if population is not None and count[i] > 1:
+                # Standard error with finite population correction
+                fpc = np.sqrt(max(0.0, 1 - count[i] / population))
+                entry['mean_error'] = float(Z_95 * entry['std'] / np.sqrt(count[i]) * fpc)
+            stats[col] = entry
+        return stats
+
+    def _categorical_stats(self, frame):
+        cols = categorical_columns(frame)
+        if not cols:
+            return {}
+        unique_counts = frame[cols].nunique()
+        null_counts = frame[cols].isna().sum()
+        return {
+            col: {'unique': int(unique_counts[col]), 'nulls': int(null_counts[col])}
+            for col in cols
+        }
+
+
+class ResultProfile:
+    """Column roles and statistics for one result set, shared by every consumer.
+
+    Columns get a role: ``measures`` (numeric), ``dimensions`` (text or
+    categorical) and ``times`` (datetime). ``time_named`` lists columns
+    whose names look temporal. Cardinalities, numeric stats and value
+    ranges come from a single DataProfiler pass.
+    """
+
+    def __init__(self, df, stats):
+        self.rows = stats['rows']
+        self.sampled = stats['sampled']
+        self.sample_rows = stats['sample_rows']
+        self.columns = [str(col) for col in df.columns]
+        self.dtypes = {str(col): str(dtype) for col, dtype in df.dtypes.items()}
+        self.measures = numeric_columns(df)
+        self.dimensions = categorical_columns(df)
+        self.times = datetime_columns(df)
+        self.time_named = self.find(*TIME_KEYWORDS)
+        self.numeric = stats['numeric']
+        self.categorical = stats['categorical']
+        self.cardinality = {col: entry['unique'] for col, entry in self.categorical.items()}
+
+        self.ranges = {col: (entry['min'], entry['max']) for col, entry in self.numeric.items()}
+        for col in self.times:
+            values = df[col]
+            self.ranges[col] = (values.min(), values.max())
+
+    @property
+    def empty(self):
+        return self.rows == 0
+
+    def find(self, *keywords):
+        """Columns whose lowercased name contains any of the keywords"""
+        return [col for col in self.columns if any(keyword in col.lower() for keyword in keywords)]
+
+    def role(self, col):
+        if col in self.times:
+            return 'time'
+        if col in self.measures:
+            return 'measure'
+        if col in self.dimensions:
+            return 'dimension'
+        return 'other'
+
+
+_default_profiler = None
+_profiles = {}
+# Re-entrant: the weakref callback can fire from garbage collection while the lock is held
+_profiles_lock = threading.RLock()
+
+
+def profile_result(df, profiler=None):
+    """Return the ResultProfile for this frame, building it only the first time it is asked for.
+
+    Profiles are keyed by frame identity and dropped when the frame is
+    garbage collected, so a result shared through the query cache is
+    profiled once no matter how many consumers look at it.
+    """
+    global _default_profiler
+    key = id(df)
+    with _profiles_lock:
+        entry = _profiles.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+
+    if profiler is None:
+        if _default_profiler is None:
+            _default_profiler = DataProfiler()
+        profiler = _default_profiler
+    profile = ResultProfile(df, profiler.profile(df))
+
+    with _profiles_lock:
+        _profiles[key] = (weakref.ref(df, lambda _, key=key: _forget_profile(key)), profile)
+    return profile
+
+
+def _forget_profile(key):
+    with _profiles_lock:
+        _profiles.pop(key, None)
@@ -1,8 +1,23 @@
 import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from dotenv import load_dotenv
 
+from query_cache import QueryResultCache, normalize_sql
+from result_stream import StreamedResult
+from arrow_frames import PYARROW_AVAILABLE
+from schema_snapshot import SchemaSnapshot
+from embedded_engine import EmbeddedEngine
+from slow_query_log import SlowQueryLog
+from query_guard import QueryGuard
+from incremental_aggregates import IncrementalAggregates
+from single_flight import SingleFlight
+from tracing import tracer, frame_bytes
+
 load_dotenv()
 
 try:
@@ -12,82 +27,348 @@ except ImportError:
     PSYCOPG2_AVAILABLE = False
 
 class DatabaseManager:
-    def __init__(self):
-        if not PSYCOPG2_AVAILABLE:
+    def __init__(self, dtype_backend=None, engine=None, backend=None):
+        self.cache = QueryResultCache(
+            max_bytes=int(float(os.getenv('QUERY_CACHE_MAX_MB', '256')) * 1024 * 1024),
+            ttl=float(os.getenv('QUERY_CACHE_TTL', '300'))
+        )
+        self.pool_size = int(os.getenv('DB_POOL_SIZE', '5'))
+        self.max_overflow = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+        self.statement_timeout = float(os.getenv('DB_STATEMENT_TIMEOUT', '30'))
+        self.chunk_rows = int(os.getenv('QUERY_CHUNK_ROWS', '10000'))
+        self.max_result_rows = int(os.getenv('QUERY_MAX_ROWS', '1000000'))
+        self.max_result_bytes = int(float(os.getenv('QUERY_MAX_MB', '512')) * 1024 * 1024)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.slow_log = None
+        self.aggregates = None
+        # Concurrent identical cacheable queries from different sessions share one execution
+        self.flights = SingleFlight('db.query') if os.getenv('SINGLE_FLIGHT', 'true').lower() == 'true' else None
+        # Cost/row budget check for generated SQL, run by callers before execution
+        self.guard = QueryGuard(self)
+
+        # 'pyarrow' keeps results in Arrow memory from the driver through
+        # display and export; 'numpy' keeps the classic pandas dtypes
+        self.dtype_backend = dtype_backend or os.getenv('QUERY_DTYPE_BACKEND', 'numpy')
+        if self.dtype_backend == 'pyarrow' and not PYARROW_AVAILABLE:
+            logging.warning("pyarrow is not installed, falling back to NumPy-backed results")
+            self.dtype_backend = 'numpy'
+
+        # 'postgres' uses DATABASE_URL, 'embedded' the in-process engine over
+        # Parquet extracts, 'auto' the first of the two that is configured
+        self.backend = backend or os.getenv('DATABASE_BACKEND', 'auto')
+        self.embedded = None
+
+        # A pre-built engine (e.g. a benchmark database) takes precedence over DATABASE_URL
+        self.connection_string = str(engine.url) if engine is not None else os.getenv('DATABASE_URL')
+        if engine is None and self.backend != 'embedded' and self.connection_string and PSYCOPG2_AVAILABLE:
+            engine = create_engine(
+                self.connection_string,
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+                pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+                pool_pre_ping=True
+            )
+
+        extracts_path = os.getenv('EMBEDDED_DATA_PATH', 'extracts')
+        if engine is None and self.backend != 'postgres' and os.path.isdir(extracts_path) and PYARROW_AVAILABLE:
+            try:
+                self.embedded = EmbeddedEngine(extracts_path)
+                engine = self.embedded.engine
+                self.connection_string = str(engine.url)
+            except (OSError, RuntimeError, ValueError) as e:
+                logging.error(f"Could not start the embedded engine from {extracts_path}: {e}")
+        
+        if engine is None:
             self.mock_mode = True
             return
         
-        self.connection_string = os.getenv('DATABASE_URL')
-        if self.connection_string:
-            self.engine = create_engine(self.connection_string)
-            self.mock_mode = False
-        else:
-            self.mock_mode = True
+        self.engine = engine
+        self.mock_mode = False
+        self.slow_log = SlowQueryLog(self)
+        if os.getenv('INCREMENTAL_AGGREGATES', 'true').lower() == 'true':
+            # Day x region partials of sales_data for monthly trend questions, built on first use
+            self.aggregates = IncrementalAggregates(self)
+        self.schema_snapshot = None
+        if engine.dialect.name == 'postgresql':
+            # The snapshot fingerprints tables through pg_catalog
+            self.schema_snapshot = SchemaSnapshot(
+                self,
+                os.getenv('SCHEMA_SNAPSHOT_PATH', 'schema_snapshot.json'),
+                max_age=float(os.getenv('SCHEMA_SNAPSHOT_MAX_AGE', '300'))
+            )
+
+    def _get_executor(self):
+        """Lazily create the worker pool used by submit() and execute_many()"""
+        with self._executor_lock:
+            if self._executor is None:
+                # One worker per pooled connection so submitted queries never
+                # wait on the pool while holding a thread
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.pool_size + self.max_overflow,
+                    thread_name_prefix='db-query'
+                )
+            return self._executor
+
+    def submit(self, query, use_cache=True, timeout=None):
+        """Run a query on the worker pool and return a Future of (df, error)"""
+        return self._get_executor().submit(self.execute_query, query, use_cache, timeout)
+
+    def execute_many(self, queries, use_cache=True, timeout=None):
+        """Run independent queries in parallel, returning (df, error) pairs in order"""
+        futures = [self.submit(query, use_cache, timeout) for query in queries]
+        return [future.result() for future in futures]
 
-    def execute_query(self, query):
+    def close(self):
+        """Shut down the worker pool and release pooled connections"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        if self.embedded is not None:
+            self.embedded.close()
+        elif not self.mock_mode:
+            self.engine.dispose()
+        if self.slow_log is not None:
+            self.slow_log.close()
+
+    def execute_query(self, query, use_cache=True, timeout=None):
         """Execute SQL query and return results as DataFrame"""
+        with tracer.span('db.execute_query') as span:
+            if self.mock_mode:
+                # Return sample data for demo
+                sample_data = pd.DataFrame({
+                    'region_name': ['North America', 'Europe', 'Asia Pacific', 'Latin America'],
+                    'total_revenue': [150000, 120000, 98000, 75000],
+                    'units_sold': [1500, 1200, 980, 750]
+                })
+                if self.dtype_backend != 'numpy':
+                    sample_data = sample_data.convert_dtypes(dtype_backend=self.dtype_backend)
+                span.set(mock=True, rows=len(sample_data))
+                return sample_data, None
+            
+            cacheable = use_cache and self._is_cacheable(query)
+            if cacheable:
+                cached = self.cache.get(query)
+                if cached is not None:
+                    span.set(cache_hit=True, rows=len(cached))
+                    return cached, None
+
+            t0 = time.perf_counter()
+            try:
+                if cacheable and self.flights is not None:
+                    df, shared = self.flights.do(normalize_sql(query), self._read_and_cache, query, timeout,
+                                                 wait_timeout=self.statement_timeout if timeout is None else timeout)
+                elif cacheable:
+                    df, shared = self._read_and_cache(query, timeout), False
+                else:
+                    df, shared = self._read_sql(query, timeout), False
+            except Exception as e:
+                span.error = str(e)
+                return None, str(e)
+            elapsed = time.perf_counter() - t0
+            span.set(cache_hit=False, shared=shared, rows=len(df), bytes=frame_bytes(df))
+            if not shared:
+                self.slow_log.record(query, elapsed, len(df))
+            return df, None
+
+    def _read_and_cache(self, query, timeout):
+        # Cached before the flight lands so callers arriving later hit the cache
+        df = self._read_sql(query, timeout)
+        self.cache.put(query, df)
+        return df
+
+    def stream_query(self, query, chunk_size=None, max_rows=None, max_bytes=None, use_cache=True, timeout=None):
+        """Execute SQL query and return a StreamedResult of DataFrame chunks"""
+        chunk_size = chunk_size or self.chunk_rows
+        max_rows = self.max_result_rows if max_rows is None else max_rows
+        max_bytes = self.max_result_bytes if max_bytes is None else max_bytes
+
         if self.mock_mode:
-            # Return sample data for demo
-            sample_data = pd.DataFrame({
-                'region_name': ['North America', 'Europe', 'Asia Pacific', 'Latin America'],
-                'total_revenue': [150000, 120000, 98000, 75000],
-                'units_sold': [1500, 1200, 980, 750]
-            })
-            return sample_data, None
+            df, error = self.execute_query(query)
+            return StreamedResult([df], max_rows, max_bytes), error
+
+        cacheable = use_cache and self._is_cacheable(query)
+        flight = None
+        if cacheable:
+            cached = self.cache.get(query)
+            if cached is not None:
+                return StreamedResult([cached], max_rows, max_bytes), None
+
+        if cacheable and self.flights is not None:
+            key = normalize_sql(query)
+            flight, leader = self.flights.join(key)
+            if not leader:
+                # Wait for the identical query already running and share its complete frame
+                with tracer.span('db.stream_query', shared=True) as span:
+                    df, error = self.flights.wait(key, flight, self.statement_timeout if timeout is None else timeout)
+                    if error is not None:
+                        span.error = str(error)
+                        return None, str(error)
+                    if df is not None:
+                        span.set(rows=len(df))
+                        return StreamedResult([df], max_rows, max_bytes), None
+                # The leader's result was truncated or abandoned, so run the query here
+                flight = None
+
+        # Spans the time to the first chunk; callers time the full read
+        with tracer.span('db.stream_query') as span:
+            t0 = time.perf_counter()
+            chunks = self._stream_sql(query, chunk_size, timeout)
+            try:
+                # Fetch the first chunk eagerly so SQL errors surface here
+                first_chunk = next(chunks, None)
+            except Exception as e:
+                span.error = str(e)
+                if flight is not None:
+                    self.flights.finish(key, flight, error=e)
+                return None, str(e)
+            span.set(first_chunk_rows=0 if first_chunk is None else len(first_chunk))
+            self.slow_log.record(query, time.perf_counter() - t0)
+
+        on_complete = (lambda df: self.cache.put(query, df)) if cacheable else None
+        on_close = (lambda df: self.flights.finish(key, flight, result=df)) if flight is not None else None
+        return StreamedResult(_prepend(first_chunk, chunks), max_rows, max_bytes, on_complete, on_close), None
+
+    def _read_options(self):
+        if self.dtype_backend == 'numpy':
+            return {}
+        return {'dtype_backend': self.dtype_backend}
+
+    def _statement_timeout_ms(self, timeout):
+        if self.engine.dialect.name != 'postgresql':
+            # statement_timeout is a PostgreSQL setting
+            return 0
+        return int((timeout if timeout is not None else self.statement_timeout) * 1000)
+
+    def _read_sql(self, query, timeout=None):
+        """Read a query into a DataFrame on a pooled connection with a statement timeout"""
+        timeout_ms = self._statement_timeout_ms(timeout)
+        with self.engine.connect() as conn:
+            if timeout_ms > 0:
+                # SET LOCAL only lasts until the implicit transaction is rolled
+                # back on close, so the pooled connection is left untouched
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+            return pd.read_sql_query(query, conn, **self._read_options())
+
+    def _stream_sql(self, query, chunk_size, timeout=None):
+        """Yield DataFrame chunks read through a server-side cursor"""
+        timeout_ms = self._statement_timeout_ms(timeout)
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+            if timeout_ms > 0:
+                conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+            for chunk in pd.read_sql_query(query, conn, chunksize=chunk_size, **self._read_options()):
+                yield chunk
+
+    def _is_cacheable(self, query):
+        """Only read-only statements are safe to serve from the cache"""
+        first_word = query.lstrip().split(None, 1)[0].upper() if query.strip() else ''
+        return first_word in ('SELECT', 'WITH')
+
+    def invalidate_table(self, table_name):
+        """Expire cached results that read from the given table"""
+        dropped = self.cache.invalidate_table(table_name)
+        logging.info(f"Invalidated {dropped} cached results for table {table_name}")
+        return dropped
+
+    def cache_stats(self):
+        """Return hit/miss/eviction counters for the query result cache"""
+        return self.cache.stats()
+
+    def get_schema_info(self, force_refresh=False):
+        """Get database schema information for LangChain"""
+        if self.mock_mode:
+            # Return mock schema for demo
+            return self._get_mock_schema()
+        if self.embedded is not None:
+            return self.embedded.schema_info()
+        if self.schema_snapshot is None:
+            return self._inspect_schema()
         
         try:
-            df = pd.read_sql_query(query, self.engine)
-            return df, None
+            if force_refresh:
+                return self.schema_snapshot.refresh()
+            return self.schema_snapshot.get()
         except Exception as e:
-            return None, str(e)
+            logging.error(f"Failed to read database schema, using demo schema: {str(e)}")
+            return self._get_mock_schema()
 
-    def get_schema_info(self):
-        """Get database schema information for LangChain"""
+    def _inspect_schema(self):
+        """Schema mapping through the SQLAlchemy inspector, for non-PostgreSQL engines"""
+        inspector = inspect(self.engine)
+        return {
+            table: [{'column': col['name'], 'type': str(col['type']).lower()} for col in inspector.get_columns(table)]
+            for table in inspector.get_table_names() + inspector.get_view_names()
+        }
+
+    def _get_mock_schema(self):
+        return {
+            'regions': [
+                {'column': 'region_id', 'type': 'integer'},
+                {'column': 'region_name', 'type': 'varchar'}
+            ],
+            'products': [
+                {'column': 'product_id', 'type': 'integer'},
+                {'column': 'product_name', 'type': 'varchar'},
+                {'column': 'category', 'type': 'varchar'}
+            ],
+            'sales_data': [
+                {'column': 'sale_id', 'type': 'integer'},
+                {'column': 'region_id', 'type': 'integer'},
+                {'column': 'product_id', 'type': 'integer'},
+                {'column': 'sale_date', 'type': 'date'},
+                {'column': 'revenue', 'type': 'numeric'},
+                {'column': 'forecast', 'type': 'numeric'},
+                {'column': 'units_sold', 'type': 'integer'}
+            ]
+        }
+
+    def get_foreign_keys(self):
+        """Get foreign key relationships between tables in the public schema"""
         if self.mock_mode:
-            # Return mock schema for demo
-            return {
-                'regions': [
-                    {'column': 'region_id', 'type': 'integer'},
-                    {'column': 'region_name', 'type': 'varchar'}
-                ],
-                'products': [
-                    {'column': 'product_id', 'type': 'integer'},
-                    {'column': 'product_name', 'type': 'varchar'},
-                    {'column': 'category', 'type': 'varchar'}
-                ],
-                'sales_data': [
-                    {'column': 'sale_id', 'type': 'integer'},
-                    {'column': 'region_id', 'type': 'integer'},
-                    {'column': 'product_id', 'type': 'integer'},
-                    {'column': 'sale_date', 'type': 'date'},
-                    {'column': 'revenue', 'type': 'numeric'},
-                    {'column': 'forecast', 'type': 'numeric'},
-                    {'column': 'units_sold', 'type': 'integer'}
-                ]
-            }
+            return [
+                {'table': 'sales_data', 'column': 'region_id', 'ref_table': 'regions', 'ref_column': 'region_id'},
+                {'table': 'sales_data', 'column': 'product_id', 'ref_table': 'products', 'ref_column': 'product_id'}
+            ]
+        if self.embedded is not None:
+            return self.embedded.foreign_keys()
+        if self.schema_snapshot is None:
+            inspector = inspect(self.engine)
+            return [
+                {'table': table, 'column': col, 'ref_table': fk['referred_table'], 'ref_column': ref_col}
+                for table in inspector.get_table_names()
+                for fk in inspector.get_foreign_keys(table)
+                for col, ref_col in zip(fk['constrained_columns'], fk['referred_columns'])
+            ]
         
-        schema_query = """
+        fk_query = """
         SELECT
-            table_name,
-            column_name,
-            data_type,
-            is_nullable
-        FROM information_schema.columns
-        WHERE table_schema = 'public'
-        ORDER BY table_name, ordinal_position;
+            kcu.table_name AS "table",
+            kcu.column_name AS "column",
+            ccu.table_name AS ref_table,
+            ccu.column_name AS ref_column
+        FROM information_schema.table_constraints tc
+        JOIN information_schema.key_column_usage kcu
+            ON tc.constraint_name = kcu.constraint_name AND tc.table_schema = kcu.table_schema
+        JOIN information_schema.constraint_column_usage ccu
+            ON tc.constraint_name = ccu.constraint_name AND tc.table_schema = ccu.table_schema
+        WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_schema = 'public'
+            AND kcu.table_name NOT IN (SELECT relname FROM pg_class WHERE relispartition);
         """
         
-        df, error = self.execute_query(schema_query)
+        df, error = self.execute_query(fk_query)
         if error:
-            return self.get_schema_info()  # Fallback to mock schema
-
-        schema_info = {}
-        for _, row in df.iterrows():
-            table = row['table_name']
-            if table not in schema_info:
-                schema_info[table] = []
-            schema_info[table].append({
-                'column': row['column_name'],
-                'type': row['data_type']
-            })
-        return schema_info
+            logging.warning(f"Could not read foreign keys: {error}")
+            return []
+        return df.to_dict('records')
+
+def _prepend(first_chunk, chunks):
+    """Re-attach an eagerly fetched chunk and close the cursor when iteration stops"""
+    try:
+        if first_chunk is not None:
+            yield first_chunk
+        yield from chunks
+    finally:
+        chunks.close()
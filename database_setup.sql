@@ -16,15 +16,40 @@ CREATE TABLE products (
     category VARCHAR(50) NOT NULL
 );
 
+-- Partitioned by month; same layout bulk_loader.py creates and loads into
+CREATE SEQUENCE sales_data_sale_id_seq AS BIGINT;
+
 CREATE TABLE sales_data (
-    sale_id SERIAL PRIMARY KEY,
+    sale_id BIGINT NOT NULL DEFAULT nextval('sales_data_sale_id_seq'),
     region_id INTEGER REFERENCES regions(region_id),
     product_id INTEGER REFERENCES products(product_id),
     sale_date DATE NOT NULL,
     revenue DECIMAL(10,2) NOT NULL,
     forecast DECIMAL(10,2) NOT NULL,
-    units_sold INTEGER NOT NULL
-);
+    units_sold INTEGER NOT NULL,
+    PRIMARY KEY (sale_id, sale_date)
+) PARTITION BY RANGE (sale_date);
+
+ALTER SEQUENCE sales_data_sale_id_seq OWNED BY sales_data.sale_id;
+
+CREATE TABLE sales_data_default PARTITION OF sales_data DEFAULT;
+
+DO $$
+DECLARE
+    month DATE;
+BEGIN
+    FOR month IN SELECT generate_series(DATE '2024-01-01', DATE '2025-01-01', INTERVAL '1 month')::DATE LOOP
+        EXECUTE format(
+            'CREATE TABLE sales_data_y%sm%s PARTITION OF sales_data FOR VALUES FROM (%L) TO (%L)',
+            to_char(month, 'YYYY'), to_char(month, 'MM'), month, (month + INTERVAL '1 month')::DATE
+        );
+    END LOOP;
+END $$;
+
+-- Indexes matching the dashboard queries (see bulk_loader.INDEXES)
+CREATE INDEX sales_data_sale_date_brin ON sales_data USING BRIN (sale_date) WITH (pages_per_range = 32);
+CREATE INDEX sales_data_region_date_idx ON sales_data (region_id, sale_date) INCLUDE (revenue, forecast, units_sold);
+CREATE INDEX sales_data_product_date_idx ON sales_data (product_id, sale_date) INCLUDE (revenue);
 
 -- Insert sample data
 INSERT INTO regions (region_name) VALUES
@@ -46,4 +71,7 @@ SELECT
     (RANDOM() * 50000 + 10000)::DECIMAL(10,2),
     (RANDOM() * 45000 + 12000)::DECIMAL(10,2),
     (RANDOM() * 100 + 10)::INTEGER
-FROM generate_series(1, 1000);
\ No newline at end of file
+FROM generate_series(1, 1000);
+
+-- Fresh statistics for every partition and for the parent, which autovacuum never analyzes
+VACUUM (ANALYZE) sales_data;
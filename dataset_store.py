@@ -0,0 +1,154 @@
+import os
+import json
+import uuid
+import shutil
+import logging
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from arrow_frames import PYARROW_AVAILABLE
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+
+class DatasetStore:
+    """Local columnar store for dashboard datasets, indexed by dataset id.
+
+    Each dataset is a directory of Parquet part files plus a ``meta.json``
+    holding name, columns, row count and ``pushed_rows`` (how many rows the
+    remote service has acknowledged). Appends add a new part file, so
+    growing a dataset never rewrites existing rows, and readers can stream
+    any row range batch by batch.
+    """
+
+    def __init__(self, root=None):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("DatasetStore requires pyarrow")
+        self.root = root or os.getenv('POWERBI_STORE_PATH', 'powerbi_store')
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = {}
+        for entry in sorted(os.listdir(self.root)):
+            meta_path = os.path.join(self.root, entry, 'meta.json')
+            if os.path.exists(meta_path):
+                try:
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                    self._index[meta['id']] = meta
+                except (OSError, ValueError, KeyError) as e:
+                    logging.warning(f"Skipping unreadable dataset {entry}: {e}")
+        logging.info(f"Dataset store at {self.root} holds {len(self._index)} datasets")
+
+    def create(self, df, name, table_name="QueryResults"):
+        dataset_id = f"ds_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._path(dataset_id))
+        meta = {
+            'id': dataset_id,
+            'name': name,
+            'table_name': table_name,
+            'created_at': datetime.now().isoformat(),
+            'row_count': 0,
+            'columns': [str(col) for col in df.columns],
+            'parts': [],
+            'pushed_rows': 0,
+            'remote_id': None
+        }
+        with self._lock:
+            self._index[dataset_id] = meta
+        try:
+            self.append(dataset_id, df)
+        except Exception:
+            # Leave no empty dataset behind when the first part cannot be written
+            self.delete(dataset_id)
+            raise
+        return dataset_id
+
+    def append(self, dataset_id, df):
+        """Write ``df`` as a new part file; returns the dataset's new row count"""
+        with self._lock:
+            meta = self._require(dataset_id)
+            if [str(col) for col in df.columns] != meta['columns']:
+                raise ValueError(f"Columns {list(df.columns)} do not match dataset {dataset_id}")
+            if meta['parts']:
+                # Keep every part on the schema of the first so readers can concatenate them
+                schema = pq.read_schema(os.path.join(self._path(dataset_id), meta['parts'][0]))
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+            else:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+            part = f"part-{len(meta['parts']):05d}.parquet"
+            pq.write_table(table, os.path.join(self._path(dataset_id), part))
+            meta['parts'].append(part)
+            meta['row_count'] += len(df)
+            self._save(meta)
+            return meta['row_count']
+
+    def get(self, dataset_id):
+        with self._lock:
+            meta = self._index.get(dataset_id)
+            return dict(meta) if meta else None
+
+    def list(self):
+        with self._lock:
+            return [dict(meta) for meta in self._index.values()]
+
+    def update(self, dataset_id, **fields):
+        with self._lock:
+            meta = self._require(dataset_id)
+            meta.update(fields)
+            self._save(meta)
+
+    def read(self, dataset_id):
+        """Load the whole dataset as one DataFrame"""
+        meta = self.get(dataset_id)
+        if meta is None:
+            return None
+        tables = [pq.read_table(os.path.join(self._path(dataset_id), part)) for part in meta['parts']]
+        return pa.concat_tables(tables).to_pandas() if tables else pd.DataFrame(columns=meta['columns'])
+
+    def iter_batches(self, dataset_id, start_row=0, batch_rows=10000):
+        """Yield DataFrames of at most ``batch_rows`` rows, starting at row ``start_row``"""
+        meta = self.get(dataset_id)
+        if meta is None:
+            raise KeyError(dataset_id)
+        offset = 0
+        for part in meta['parts']:
+            parquet_file = pq.ParquetFile(os.path.join(self._path(dataset_id), part))
+            part_rows = parquet_file.metadata.num_rows
+            if offset + part_rows <= start_row:
+                offset += part_rows
+                continue
+            skip = max(0, start_row - offset)
+            for batch in parquet_file.iter_batches(batch_size=batch_rows):
+                if skip >= batch.num_rows:
+                    skip -= batch.num_rows
+                    continue
+                if skip:
+                    batch = batch.slice(skip)
+                    skip = 0
+                yield batch.to_pandas()
+            offset += part_rows
+
+    def delete(self, dataset_id):
+        with self._lock:
+            self._index.pop(dataset_id, None)
+        shutil.rmtree(self._path(dataset_id), ignore_errors=True)
+
+    def _path(self, dataset_id):
+        return os.path.join(self.root, dataset_id)
+
+    def _require(self, dataset_id):
+        meta = self._index.get(dataset_id)
+        if meta is None:
+            raise KeyError(f"Unknown dataset {dataset_id}")
+        return meta
+
+    def _save(self, meta):
+        meta_path = os.path.join(self._path(meta['id']), 'meta.json')
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
@@ -0,0 +1,363 @@
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict, deque
+
+from arrow_frames import numeric_columns, categorical_columns, datetime_columns
+from intent_router import STOPWORDS, NUMBER_WORDS, _NUMBER, _to_int
+from query_guard import QueryAnalysis
+from tracing import tracer
+
+# Words a follow-up may contain besides the refinements themselves
+FILLER = STOPWORDS | {
+    'now', 'only', 'just', 'those', 'these', 'them', 'that', 'it', 'then', 'but', 'same', 'instead',
+    'result', 'results', 'row', 'rows', 'one', 'ones', 'filter', 'keep', 'limit', 'narrow', 'down',
+    'sorted', 'sort', 'order', 'ordered', 'rank', 'ranked', 'first', 'group', 'grouped', 'so', 'again'
+}
+
+# Column words the SQL agent knows about; a follow-up naming one the previous
+# result lacks needs the database rather than being treated as a new question
+KNOWN_COLUMN_WORDS = {
+    'region', 'product', 'category', 'month', 'year', 'quarter', 'week', 'day', 'date',
+    'revenue', 'forecast', 'units', 'variance', 'price'
+}
+
+# Per-group averages and ratios cannot be re-aggregated from the rows
+NON_ADDITIVE = ('avg', 'average', 'mean', 'rate', 'ratio', 'pct', 'percent', 'margin', 'share')
+
+_DESCENDING = {'top', 'highest', 'best', 'largest', 'biggest', 'most'}
+_ASCENDING = {'bottom', 'lowest', 'worst', 'smallest', 'least'}
+_TOP = re.compile(r"\b(" + "|".join(sorted(_DESCENDING | _ASCENDING)) + r")\s+" + _NUMBER + r"\b")
+_HEAD = re.compile(r"\bfirst\s+" + _NUMBER + r"\b")
+_DIRECTION = [
+    (re.compile(r"\b(?:ascending|asc|increasing|(?:lowest|smallest|least)\s+first|low\s+to\s+high)\b"), True),
+    (re.compile(r"\b(?:descending|desc|decreasing|(?:highest|largest|biggest|most)\s+first|high\s+to\s+low)\b"), False)
+]
+_SORT = re.compile(r"\b(?:sort|sorted|order|ordered|rank|ranked)\b")
+_COMPARATORS = {
+    'above': 'gt', 'over': 'gt', 'more than': 'gt', 'greater than': 'gt', 'at least': 'ge',
+    'below': 'lt', 'under': 'lt', 'less than': 'lt', 'fewer than': 'lt', 'at most': 'le'
+}
+_AMOUNT = r"\$?(\d[\d,]*(?:\.\d+)?)\s*(k|m|thousand|million)?\b"
+_SCALE = {None: 1, 'k': 1e3, 'thousand': 1e3, 'm': 1e6, 'million': 1e6}
+_NEGATION = r"(?:(excluding|exclude|except|without|not|drop|remove|minus)\s+)?"
+_BACK = re.compile(r"^\s*(?:undo|go\s+back|back|previous(?:\s+result)?)\s*[.!]?\s*$")
+_LIST_JOIN = re.compile(r"\s*(?:,|&|and|or|nor)?\s*(?:,|&|and|or|nor)?\s*")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _is_non_additive(column):
+    return any(word in column.lower() for word in NON_ADDITIVE)
+
+
+def _alternation(names):
+    # Longest first so 'north america' wins over a shorter overlapping value
+    return "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+
+
+class SessionResult:
+    """One answered question of a session: the frame and the SQL that produced it.
+
+    ``complete`` is False when the frame was cut by a row/size cap or the
+    cost guard, so it is not all the rows the SQL returns. ``limited`` is
+    True when the frame is a top-N subset (the SQL's own LIMIT was reached,
+    or it was derived with a top-N step), so filters on it would not see
+    every matching row.
+    """
+
+    def __init__(self, question, sql, df, complete=True, limited=None, steps=None):
+        self.question = question
+        self.sql = sql
+        self.df = df
+        self.complete = complete
+        if limited is None:
+            limit = QueryAnalysis(sql).limit if sql else None
+            limited = limit is not None and len(df) >= limit
+        self.limited = limited
+        self.steps = list(steps or [])
+
+
+class Refinement:
+    """Parsed follow-up: the operations to apply, or why the database is needed"""
+
+    def __init__(self):
+        self.filters = {}
+        self.thresholds = []
+        self.group_by = None
+        self.top = None
+        self.head = None
+        self.sort = None
+        self.back = False
+        self.missing = None
+
+    @property
+    def empty(self):
+        return not (self.filters or self.thresholds or self.group_by or self.top or self.head
+                    or self.sort or self.back)
+
+
+class DrillDownResult:
+    """Answer to a follow-up; ``df`` is None when ``question`` must go to the SQL agent instead"""
+
+    def __init__(self, source, question, df=None, steps=None, limited=False, reason=None):
+        self.source = source
+        self.question = question
+        self.df = df
+        self.steps = steps or []
+        self.limited = limited
+        self.reason = reason
+
+
+class DrillDown:
+    """Answers follow-up questions from a session's recent results.
+
+    The last ``max_results`` results of each session are kept with their
+    SQL. A follow-up made only of refinements of the latest result
+    ("only Europe", "excluding Asia Pacific", "sort ascending", "top 3 of
+    those", "by category", "above 100k", "undo") is answered with
+    vectorized filter/sort/group operations on that frame. When it needs
+    a column the frame lacks, or rows the frame may be missing (it was
+    truncated, or is a top-N subset and the follow-up filters or groups),
+    the follow-up is appended to the previous question and sent through
+    the SQL agent, which keeps the context. Anything else is a new
+    question and is left alone.
+    """
+
+    def __init__(self, max_results=None, max_sessions=None):
+        self.max_results = max_results if max_results is not None else int(os.getenv('DRILLDOWN_HISTORY', '5'))
+        self.max_sessions = max_sessions if max_sessions is not None else int(os.getenv('DRILLDOWN_MAX_SESSIONS', '500'))
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.answered = 0
+        self.requeried = 0
+
+    def remember(self, session_id, question, sql, df, complete=True, limited=None, steps=None):
+        """Record a session's latest result; returns its SessionResult"""
+        entry = SessionResult(question, sql, df, complete, limited, steps)
+        with self._lock:
+            history = self._sessions.pop(session_id, None) or deque(maxlen=self.max_results)
+            history.appendleft(entry)
+            self._sessions[session_id] = history
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return entry
+
+    def history(self, session_id):
+        """The session's results, newest first"""
+        with self._lock:
+            return list(self._sessions.get(session_id, ()))
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def answer(self, session_id, question, regions=()):
+        """DrillDownResult for a follow-up of the session's latest result, or None for a new question"""
+        history = self.history(session_id)
+        if not history:
+            return None
+        latest = history[0]
+        with tracer.span('drilldown.answer', session=session_id) as span:
+            refinement = self.parse(question, latest.df, regions)
+            if refinement is None:
+                span.set(refinement=False)
+                return None
+            followup = f"{latest.question} {question.strip()}"
+
+            if refinement.back:
+                if len(history) < 2:
+                    return None
+                previous = history[1]
+                span.set(refinement=True, back=True)
+                self.answered += 1
+                return DrillDownResult(previous, previous.question, previous.df, previous.steps, limited=previous.limited)
+
+            reason = refinement.missing or self._missing_rows(refinement, latest)
+            if reason:
+                span.set(refinement=True, requery=True)
+                self.requeried += 1
+                logging.info(f"Follow-up {question!r} needs the database: {reason}")
+                return DrillDownResult(latest, followup, reason=reason)
+
+            df, steps = self.apply(refinement, latest.df)
+            span.set(refinement=True, requery=False, rows=len(df))
+            self.answered += 1
+            limited = latest.limited or refinement.top is not None or refinement.head is not None
+            return DrillDownResult(latest, followup, df, latest.steps + steps, limited=limited)
+
+    def _missing_rows(self, refinement, entry):
+        if not entry.complete:
+            return "the previous result was cut short"
+        if entry.limited and (refinement.filters or refinement.thresholds or refinement.group_by):
+            return "the previous result holds only the top rows"
+        count = (refinement.top or (None, None))[1] or refinement.head
+        if entry.limited and count is not None and count > len(entry.df):
+            return f"the previous result has only {len(entry.df)} rows"
+        return None
+
+    def parse(self, question, df, regions=()):
+        """Refinement for ``question`` against the columns and values of ``df``, or None if it is not one"""
+        text = question.lower()
+        refinement = Refinement()
+        if _BACK.match(text):
+            refinement.back = True
+            return refinement
+
+        measures = [col for col in numeric_columns(df) if not str(col).lower().endswith('_id')]
+        dimensions = categorical_columns(df) + datetime_columns(df)
+        aliases = self._column_aliases(df.columns)
+
+        def take(match, group=0):
+            nonlocal text
+            text = text[:match.start(group)] + ' ' + text[match.end(group):]
+
+        # Column values, e.g. 'europe' -> ('region_name', 'Europe')
+        values = {}
+        for col in categorical_columns(df):
+            unique = df[col].dropna().unique()
+            if len(unique) <= 10000:
+                for value in unique:
+                    values.setdefault(str(value).lower(), (col, value))
+        outside = {region.lower(): region for region in regions if region.lower() not in values}
+        if values or outside:
+            value_pattern = re.compile(r"\b" + _NEGATION + r"(" + _alternation(list(values) + list(outside)) + r")\b")
+            matches = list(value_pattern.finditer(text))
+            negated, previous_end = False, None
+            for match in matches:
+                # 'excluding Europe and Asia Pacific' negates both values
+                joined = previous_end is not None and _LIST_JOIN.fullmatch(text[previous_end:match.start()])
+                negated = bool(match.group(1)) or (negated and bool(joined))
+                previous_end = match.end()
+                name = match.group(2)
+                if name in outside:
+                    refinement.missing = f"'{outside[name]}' is not in the previous result"
+                else:
+                    col, value = values[name]
+                    include, exclude = refinement.filters.setdefault(col, ([], []))
+                    (exclude if negated else include).append(value)
+            for match in matches[::-1]:
+                take(match)
+
+        if aliases:
+            alias_pattern = _alternation(aliases)
+            comparator = re.compile(r"\b(?:(" + alias_pattern + r")s?\s+(?:is\s+|are\s+)?)?(" + _alternation(_COMPARATORS)
+                                    + r")\s+" + _AMOUNT)
+        else:
+            comparator = re.compile(r"\b()(" + _alternation(_COMPARATORS) + r")\s+" + _AMOUNT)
+        for match in list(comparator.finditer(text))[::-1]:
+            col = aliases.get(match.group(1)) if match.group(1) else (measures[0] if measures else None)
+            if col not in measures:
+                return None
+            amount = float(match.group(3).replace(',', '')) * _SCALE[match.group(4)]
+            refinement.thresholds.append((col, _COMPARATORS[match.group(2)], amount))
+            take(match)
+
+        match = _TOP.search(text)
+        if match:
+            refinement.top = (match.group(1) in _ASCENDING, _to_int(match.group(2)))
+            take(match)
+        match = _HEAD.search(text)
+        if match and refinement.top is None:
+            refinement.head = _to_int(match.group(1))
+            take(match)
+
+        ascending = None
+        for pattern, direction in _DIRECTION:
+            match = pattern.search(text)
+            if match:
+                ascending = direction
+                take(match)
+                break
+
+        # 'by <column>': the key of a sort/top-N for a measure, a regrouping for a dimension
+        key = None
+        by_pattern = re.compile(r"\b(?:by|per|on)\s+(" + _alternation(set(aliases) | KNOWN_COLUMN_WORDS) + r")s?\b")
+        match = by_pattern.search(text)
+        if match:
+            col = aliases.get(match.group(1))
+            if col is None:
+                refinement.missing = f"'{match.group(1)}' is not a column of the previous result"
+            elif col in measures:
+                key = col
+            elif col in dimensions:
+                refinement.group_by = col
+                if any(_is_non_additive(str(measure)) for measure in measures):
+                    refinement.missing = "averages or ratios cannot be regrouped from the previous result"
+            take(match)
+
+        if refinement.top is not None:
+            refinement.top = refinement.top + (key,)
+            if ascending is not None:
+                refinement.sort = (key, ascending)
+        elif _SORT.search(text) or ascending is not None or key is not None:
+            refinement.sort = (key, False if ascending is None else ascending)
+
+        if refinement.missing is None and refinement.empty:
+            return None
+        # Whatever is left must be filler, or this is a new question
+        if any(word not in FILLER and word not in NUMBER_WORDS for word in _WORD.findall(text)):
+            return None
+        if refinement.missing is None and not measures and (refinement.top or refinement.sort or refinement.group_by):
+            return None
+        return refinement
+
+    def _column_aliases(self, columns):
+        """Phrases naming each column: its full name and each word of it no other column shares"""
+        aliases = {}
+        word_owners = {}
+        for col in columns:
+            name = str(col).lower()
+            aliases[name] = col
+            aliases[name.replace('_', ' ')] = col
+            for word in name.split('_'):
+                if word and word not in ('id', 'name'):
+                    word_owners.setdefault(word, set()).add(col)
+        for word, owners in word_owners.items():
+            if len(owners) == 1 and word not in aliases:
+                aliases[word] = next(iter(owners))
+        return aliases
+
+    def apply(self, refinement, df):
+        """Run the refinement on ``df``; returns (frame, step descriptions)"""
+        steps = []
+        measures = [col for col in numeric_columns(df) if not str(col).lower().endswith('_id')]
+        default_measure = measures[0] if measures else None
+
+        mask = None
+        for col, (include, exclude) in refinement.filters.items():
+            if include:
+                keep = df[col].isin(include)
+                steps.append(f"{col} in ({', '.join(map(str, include))})" if len(include) > 1 else f"{col} = {include[0]}")
+                mask = keep if mask is None else mask & keep
+            if exclude:
+                keep = ~df[col].isin(exclude)
+                steps.append(f"{col} not in ({', '.join(map(str, exclude))})")
+                mask = keep if mask is None else mask & keep
+        for col, op, amount in refinement.thresholds:
+            keep = getattr(df[col], op)(amount)
+            steps.append(f"{col} {dict(gt='>', ge='>=', lt='<', le='<=')[op]} {amount:,.10g}")
+            mask = keep if mask is None else mask & keep
+        if mask is not None:
+            df = df[mask.fillna(False).astype(bool)]
+
+        if refinement.group_by is not None:
+            df = df.groupby(refinement.group_by, sort=False, dropna=False)[measures].sum().reset_index()
+            steps.append(f"totals by {refinement.group_by}")
+
+        if refinement.top is not None:
+            ascending, count, key = refinement.top
+            key = key or default_measure
+            df = df.sort_values(key, ascending=ascending, kind='stable').head(count)
+            steps.append(f"{'bottom' if ascending else 'top'} {count} by {key}")
+
+        if refinement.sort is not None:
+            key, ascending = refinement.sort
+            key = key or default_measure
+            df = df.sort_values(key, ascending=ascending, kind='stable')
+            steps.append(f"sorted by {key} {'ascending' if ascending else 'descending'}")
+
+        if refinement.head is not None:
+            df = df.head(refinement.head)
+            steps.append(f"first {refinement.head} rows")
+        return df.reset_index(drop=True), steps
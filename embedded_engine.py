@@ -0,0 +1,287 @@
+import os
+import re
+import sys
+import json
+import sqlite3
+import logging
+from decimal import Decimal
+from datetime import date, datetime
+
+import pandas as pd
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from arrow_frames import PYARROW_AVAILABLE
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+try:
+    import duckdb
+    import duckdb_engine  # SQLAlchemy dialect for duckdb:// URLs
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+MANIFEST_FILE = 'manifest.json'
+
+# PostgreSQL casts the query templates and typical generated SQL use, as
+# SQLite expressions. CAST(x AS date) in SQLite yields a number, so dates
+# go through its date functions instead.
+SQLITE_CASTS = {
+    'date': 'DATE({expr})',
+    'timestamp': 'DATETIME({expr})',
+    'int': 'CAST({expr} AS INTEGER)',
+    'integer': 'CAST({expr} AS INTEGER)',
+    'bigint': 'CAST({expr} AS INTEGER)',
+    'numeric': 'CAST({expr} AS REAL)',
+    'decimal': 'CAST({expr} AS REAL)',
+    'float': 'CAST({expr} AS REAL)',
+    'real': 'CAST({expr} AS REAL)',
+    'text': 'CAST({expr} AS TEXT)',
+    'varchar': 'CAST({expr} AS TEXT)'
+}
+CAST_PATTERN = re.compile(r"(\b[\w.]+(?:\([^()]*\))?|\([^()]*\)|'[^']*')::(\w+)(?:\([\d,\s]*\))?")
+# Truncations SQLite can do natively; other units use the registered DATE_TRUNC
+NATIVE_TRUNC = {'year': "STRFTIME('%Y-01-01', ", 'month': "STRFTIME('%Y-%m-01', ", 'day': "DATE("}
+TRUNC_PATTERN = re.compile(r"\bDATE_TRUNC\s*\(\s*'(year|month|day)'\s*,\s*", re.IGNORECASE)
+EXTRACT_PATTERN = re.compile(r"\bEXTRACT\s*\(\s*(YEAR|MONTH|DAY|QUARTER)\s+FROM\s+", re.IGNORECASE)
+SQLITE_REWRITES = [
+    (re.compile(r"\bILIKE\b", re.IGNORECASE), 'LIKE'),
+    (re.compile(r"\bNOW\(\)", re.IGNORECASE), 'CURRENT_TIMESTAMP')
+]
+
+
+def date_trunc(unit, value):
+    """DATE_TRUNC for the ISO date/timestamp strings SQLite stores"""
+    if value is None:
+        return None
+    text = str(value)
+    unit = unit.lower()
+    if unit in ('hour', 'minute'):
+        ts = datetime.fromisoformat(text)
+        ts = ts.replace(minute=0 if unit == 'hour' else ts.minute, second=0, microsecond=0)
+        return ts.isoformat(sep=' ')
+    d = date.fromisoformat(text[:10])
+    if unit == 'year':
+        d = d.replace(month=1, day=1)
+    elif unit == 'quarter':
+        d = d.replace(month=3 * ((d.month - 1) // 3) + 1, day=1)
+    elif unit == 'month':
+        d = d.replace(day=1)
+    elif unit == 'week':
+        d = date.fromordinal(d.toordinal() - d.weekday())
+    return d.isoformat()
+
+
+def date_part(unit, value):
+    """EXTRACT(unit FROM value) for ISO date strings"""
+    if value is None:
+        return None
+    d = date.fromisoformat(str(value)[:10])
+    unit = unit.lower()
+    if unit == 'quarter':
+        return (d.month - 1) // 3 + 1
+    return getattr(d, unit)
+
+
+def translate_sql(query, dialect):
+    """Rewrite PostgreSQL-only syntax for the embedded dialect.
+
+    DuckDB accepts the PostgreSQL features we generate as-is. For SQLite,
+    ``x::type`` casts, ``EXTRACT(... FROM x)``, ``ILIKE`` and ``NOW()`` are
+    rewritten, as is ``DATE_TRUNC`` to year, month or day (to native date
+    functions); other ``DATE_TRUNC`` units go to a registered function. The
+    rewrites are textual, so they assume the patterns do not appear inside
+    string literals.
+    """
+    if dialect != 'sqlite':
+        return query
+    query = CAST_PATTERN.sub(
+        lambda m: SQLITE_CASTS.get(m.group(2).lower(), 'CAST({expr} AS ' + m.group(2) + ')').format(expr=m.group(1)),
+        query
+    )
+    query = TRUNC_PATTERN.sub(lambda m: NATIVE_TRUNC[m.group(1).lower()], query)
+    query = EXTRACT_PATTERN.sub(lambda m: f"DATE_PART('{m.group(1).lower()}', ", query)
+    for pattern, replacement in SQLITE_REWRITES:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+def attach_sqlite_dialect(engine):
+    """Register PostgreSQL functions on every connection and translate statements before they run"""
+    @event.listens_for(engine, 'connect')
+    def register_functions(dbapi_connection, _):
+        dbapi_connection.create_function('DATE_TRUNC', 2, date_trunc, deterministic=True)
+        dbapi_connection.create_function('DATE_PART', 2, date_part, deterministic=True)
+
+    @event.listens_for(engine, 'before_cursor_execute', retval=True)
+    def rewrite(conn, cursor, statement, parameters, context, executemany):
+        return translate_sql(statement, 'sqlite'), parameters
+
+    return engine
+
+
+def sql_type(arrow_type):
+    """Schema type name, in information_schema's vocabulary, for an Arrow type"""
+    if pa.types.is_boolean(arrow_type):
+        return 'boolean'
+    if pa.types.is_integer(arrow_type):
+        return 'integer' if arrow_type.bit_width <= 32 else 'bigint'
+    if pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return 'numeric'
+    if pa.types.is_date(arrow_type):
+        return 'date'
+    if pa.types.is_timestamp(arrow_type):
+        return 'timestamp'
+    return 'varchar'
+
+
+def _plain_chunks(chunks):
+    """Turn Decimal columns (PostgreSQL NUMERIC) into floats so every chunk shares one Parquet schema"""
+    for chunk in chunks:
+        for col in chunk.columns:
+            if chunk[col].dtype == object:
+                first = chunk[col].dropna().head(1)
+                if len(first) and isinstance(first.iloc[0], Decimal):
+                    chunk[col] = chunk[col].astype('float64')
+        yield chunk
+
+
+def export_extracts(db, path=None, tables=None):
+    """Write each table of ``db`` to ``<path>/<table>.parquet`` plus a manifest; returns {table: rows}"""
+    from exporter import query_source, write_chunks
+
+    path = path or os.getenv('EMBEDDED_DATA_PATH', 'extracts')
+    os.makedirs(path, exist_ok=True)
+    tables = tables or list(db.get_schema_info(force_refresh=True))
+    counts = {}
+    for table in tables:
+        chunks = query_source(db, f'SELECT * FROM "{table}"', max_rows=sys.maxsize)()
+        tmp_path = os.path.join(path, f"{table}.parquet.tmp")
+        with open(tmp_path, 'wb') as f:
+            counts[table] = write_chunks(_plain_chunks(chunks), 'parquet', f)
+        os.replace(tmp_path, os.path.join(path, f"{table}.parquet"))
+        logging.info(f"Exported {counts[table]:,} rows of {table}")
+
+    with open(os.path.join(path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            'exported_at': datetime.now().isoformat(),
+            'tables': counts,
+            'foreign_keys': [fk for fk in db.get_foreign_keys() if fk['table'] in counts and fk['ref_table'] in counts]
+        }, f, indent=2)
+    return counts
+
+
+class EmbeddedEngine:
+    """In-process analytical copy of the schema, loaded from Parquet extracts.
+
+    Every ``<table>.parquet`` under ``path`` becomes a table. With DuckDB
+    (``duckdb`` and ``duckdb-engine`` installed) tables are views over the
+    Parquet files and queries run vectorized straight off them; otherwise
+    the extracts are loaded into a shared in-memory SQLite database and
+    PostgreSQL syntax is translated on the way in. ``engine`` is a regular
+    SQLAlchemy engine, so DatabaseManager runs on it unchanged.
+    """
+
+    def __init__(self, path=None, backend=None):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("The embedded engine requires pyarrow")
+        self.path = path or os.getenv('EMBEDDED_DATA_PATH', 'extracts')
+        self.backend = backend or os.getenv('EMBEDDED_BACKEND', 'duckdb' if DUCKDB_AVAILABLE else 'sqlite')
+        if self.backend == 'duckdb' and not DUCKDB_AVAILABLE:
+            logging.warning("duckdb/duckdb-engine are not installed, using the SQLite embedded backend")
+            self.backend = 'sqlite'
+
+        self.files = {
+            name[:-len('.parquet')]: os.path.join(self.path, name)
+            for name in sorted(os.listdir(self.path)) if name.endswith('.parquet')
+        }
+        if not self.files:
+            raise FileNotFoundError(f"No Parquet extracts in {self.path}")
+        self.manifest = {}
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+        self._keeper = None
+        if self.backend == 'duckdb':
+            self.engine = self._duckdb_engine()
+        else:
+            self.engine = self._sqlite_engine()
+        logging.info(f"Embedded {self.backend} engine serving {len(self.files)} tables from {self.path}")
+
+    def _duckdb_engine(self):
+        # A database file rather than :memory: so every pooled connection
+        # sees the same views; DuckDB shares one instance per file in-process
+        db_path = os.getenv('EMBEDDED_DUCKDB_PATH', os.path.join(self.path, 'embedded.duckdb'))
+        engine = create_engine(f"duckdb:///{db_path}")
+        with engine.begin() as conn:
+            for table, file_path in self.files.items():
+                source = os.path.abspath(file_path).replace("'", "''")
+                conn.exec_driver_sql(f'CREATE OR REPLACE VIEW "{table}" AS SELECT * FROM read_parquet(\'{source}\')')
+        return engine
+
+    def _sqlite_engine(self):
+        uri = f"file:embedded_{id(self)}?mode=memory&cache=shared"
+
+        def connect():
+            return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+        # The shared in-memory database lives as long as one connection to it is open
+        self._keeper = connect()
+        engine = attach_sqlite_dialect(create_engine(
+            'sqlite://',
+            creator=connect,
+            poolclass=QueuePool,
+            pool_size=int(os.getenv('DB_POOL_SIZE', '5')),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10'))
+        ))
+        with engine.begin() as conn:
+            for table, file_path in self.files.items():
+                parquet_file = pq.ParquetFile(file_path)
+                for batch in parquet_file.iter_batches(batch_size=100000):
+                    batch_table = pa.Table.from_batches([batch])
+                    # sqlite3 cannot bind Decimal values
+                    batch_table = batch_table.cast(pa.schema([
+                        pa.field(f.name, pa.float64()) if pa.types.is_decimal(f.type) else f
+                        for f in batch_table.schema
+                    ]))
+                    batch_table.to_pandas().to_sql(table, conn, if_exists='append', index=False)
+        return engine
+
+    def schema_info(self):
+        """{table: [{'column', 'type'}, ...]} read from the Parquet schemas"""
+        return {
+            table: [{'column': field.name, 'type': sql_type(field.type)} for field in pq.read_schema(file_path)]
+            for table, file_path in self.files.items()
+        }
+
+    def foreign_keys(self):
+        return self.manifest.get('foreign_keys', [])
+
+    def close(self):
+        self.engine.dispose()
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+
+
+def main(argv):
+    from database import DatabaseManager
+
+    command = argv[1] if len(argv) > 1 else 'export'
+    if command != 'export':
+        sys.exit(f"Unknown command: {command} (expected export)")
+    db = DatabaseManager(backend='postgres')
+    if db.mock_mode:
+        sys.exit("DATABASE_URL is required to export extracts")
+    counts = export_extracts(db, argv[2] if len(argv) > 2 else None)
+    print(', '.join(f"{table}: {rows:,} rows" for table, rows in counts.items()))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv)
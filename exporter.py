@@ -0,0 +1,165 @@
+import io
+import os
+import sys
+import gzip
+import logging
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+
+from arrow_frames import PYARROW_AVAILABLE, to_csv_bytes
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+# format -> (label, file extension, mime type, needs pyarrow)
+EXPORT_FORMATS = OrderedDict([
+    ('csv', ('CSV', 'csv', 'text/csv', False)),
+    ('csv.gz', ('CSV (gzip)', 'csv.gz', 'application/gzip', False)),
+    ('parquet', ('Parquet', 'parquet', 'application/vnd.apache.parquet', True)),
+    ('arrow', ('Arrow IPC', 'arrow', 'application/vnd.apache.arrow.file', True)),
+])
+
+
+def frame_chunks(df, chunk_rows):
+    """Slice a frame into row chunks without copying the data"""
+    if df.empty:
+        # Still write the header / schema
+        yield df
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def write_chunks(chunks, fmt, sink):
+    """Encode DataFrame chunks into ``sink`` one at a time; returns the number of rows written"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if EXPORT_FORMATS[fmt][3] and not PYARROW_AVAILABLE:
+        raise RuntimeError(f"Exporting {fmt} requires pyarrow")
+
+    rows = 0
+    if fmt in ('csv', 'csv.gz'):
+        out = gzip.GzipFile(fileobj=sink, mode='wb', compresslevel=6) if fmt == 'csv.gz' else sink
+        for chunk in chunks:
+            out.write(to_csv_bytes(chunk, header=rows == 0))
+            rows += len(chunk)
+        if out is not sink:
+            out.close()
+        return rows
+
+    writer = None
+    schema = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(sink, schema) if fmt == 'parquet' else pa.ipc.new_file(sink, schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def query_source(db, query, max_rows=None):
+    """Chunk source that re-reads a query through the DB cursor, past the interactive result caps"""
+    max_rows = max_rows or int(os.getenv('EXPORT_MAX_ROWS', '10000000'))
+
+    def chunks():
+        # Chunks are encoded and dropped one by one, so only the row cap applies
+        result, error = db.stream_query(query, max_rows=max_rows, max_bytes=sys.maxsize, use_cache=False)
+        if error:
+            raise RuntimeError(error)
+        return result
+    return chunks
+
+
+class _KeyLock:
+    """Serializes encodes of one artifact; ``users`` counts callers holding or waiting for it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class ResultExporter:
+    """Encodes query results into download artifacts on demand.
+
+    Nothing is encoded until a format is requested. The source is either
+    a result frame, which is sliced into chunks, or a callable returning
+    an iterable of chunks (e.g. a DB stream), so only one chunk is being
+    encoded at a time. Finished artifacts are memoized per (result key,
+    format) in a byte-bounded LRU; concurrent requests for the same
+    artifact wait for a single encode.
+    """
+
+    def __init__(self, chunk_rows=None, max_bytes=None):
+        self.chunk_rows = chunk_rows or int(os.getenv('EXPORT_CHUNK_ROWS', '50000'))
+        self.max_bytes = max_bytes or int(float(os.getenv('EXPORT_CACHE_MB', '256')) * 1024 * 1024)
+        self._artifacts = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def formats(self):
+        """Formats that can be produced in this environment"""
+        return [fmt for fmt, spec in EXPORT_FORMATS.items() if PYARROW_AVAILABLE or not spec[3]]
+
+    def label(self, fmt):
+        return EXPORT_FORMATS[fmt][0]
+
+    def mime(self, fmt):
+        return EXPORT_FORMATS[fmt][2]
+
+    def file_name(self, fmt, stem='results'):
+        return f"{stem}.{EXPORT_FORMATS[fmt][1]}"
+
+    def export(self, result_key, fmt, source):
+        """Return the encoded bytes for ``source`` in ``fmt``, encoding only on the first request"""
+        key = (result_key, fmt)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, _KeyLock())
+            key_lock.users += 1
+        try:
+            with key_lock.lock:
+                return self._export(key, fmt, source)
+        finally:
+            # The last caller out drops the lock, whether the encode succeeded or not
+            with self._lock:
+                key_lock.users -= 1
+                if key_lock.users == 0:
+                    del self._key_locks[key]
+
+    def _export(self, key, fmt, source):
+        with self._lock:
+            data = self._artifacts.get(key)
+            if data is not None:
+                self._artifacts.move_to_end(key)
+                return data
+
+        t0 = time.perf_counter()
+        chunks = frame_chunks(source, self.chunk_rows) if isinstance(source, pd.DataFrame) else source()
+        sink = io.BytesIO()
+        rows = write_chunks(chunks, fmt, sink)
+        data = sink.getvalue()
+        logging.info(f"Exported {rows:,} rows as {fmt} ({len(data) / 1024:.0f} KB) in {time.perf_counter() - t0:.2f}s")
+
+        with self._lock:
+            if len(data) <= self.max_bytes:
+                self._artifacts[key] = data
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._artifacts.popitem(last=False)
+                    self._bytes -= len(evicted)
+        return data
+
+    def forget(self, result_key):
+        """Drop every memoized artifact for one result"""
+        with self._lock:
+            for key in [k for k in self._artifacts if k[0] == result_key]:
+                self._bytes -= len(self._artifacts.pop(key))
@@ -0,0 +1,142 @@
+import os
+import time
+import logging
+import threading
+import pandas as pd
+
+from tracing import tracer
+
+BUCKET_KEYS = ['sale_date', 'region_id']
+MEASURES = ['revenue', 'forecast', 'units_sold', 'sale_count']
+
+DELTA_QUERY = """
+SELECT sale_date, region_id, SUM(revenue) AS revenue, SUM(forecast) AS forecast,
+       SUM(units_sold) AS units_sold, COUNT(*) AS sale_count
+FROM sales_data
+WHERE sale_id > {low} AND sale_id <= {high}
+GROUP BY sale_date, region_id
+"""
+
+
+class IncrementalAggregates:
+    """In-process partial aggregates of ``sales_data`` for time-series questions.
+
+    Sums and counts are kept per day and region, with a high-water mark on
+    ``sale_id``. A refresh aggregates only the rows above the mark and adds
+    them to the stored partials, so its cost scales with new data rather
+    than history; monthly trends (any date range, optionally one region)
+    are then rolled up from the day buckets without touching the database.
+    Updates and deletes of existing rows are not seen by the delta, so the
+    partials are rebuilt from scratch every ``rebuild_interval`` seconds,
+    and whenever the high-water mark moves backwards (table reloaded).
+    """
+
+    def __init__(self, db, refresh_interval=None, rebuild_interval=None):
+        self.db = db
+        self.refresh_interval = refresh_interval if refresh_interval is not None else float(os.getenv('AGG_REFRESH_INTERVAL', '5'))
+        self.rebuild_interval = rebuild_interval if rebuild_interval is not None else float(os.getenv('AGG_REBUILD_INTERVAL', '3600'))
+        self.partials = None
+        self.regions = {}
+        self.high_water_mark = 0
+        self.last_refresh = None
+        self.last_rebuild = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Merge sales rows added since the last refresh; returns the number of bucket rows merged"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.last_refresh is not None and now - self.last_refresh < self.refresh_interval:
+                return 0
+            with tracer.span('aggregates.refresh') as span:
+                df, error = self.db.execute_query("SELECT MAX(sale_id) AS high FROM sales_data", use_cache=False)
+                if error:
+                    raise RuntimeError(f"Could not read the sales high-water mark: {error}")
+                high = df['high'].iloc[0]
+                high = 0 if pd.isna(high) else int(high)
+
+                rebuild = (self.partials is None or high < self.high_water_mark
+                           or now - self.last_rebuild >= self.rebuild_interval)
+                low = 0 if rebuild else self.high_water_mark
+                delta = self._aggregate(low, high)
+                if rebuild:
+                    self.partials = delta
+                    self.regions = self._load_regions()
+                    self.last_rebuild = now
+                elif len(delta):
+                    self.partials = self.partials.add(delta, fill_value=0)
+                self.high_water_mark = high
+                self.last_refresh = now
+                span.set(rebuild=rebuild, low=low, high=high, rows=len(delta))
+            if len(delta):
+                logging.info(f"Incremental aggregates: sale_id ({low}, {high}], {len(delta)} buckets merged")
+            return len(delta)
+
+    def staleness_bound(self):
+        """Seconds an update, delete or out-of-order insert can go unseen: until the next full rebuild"""
+        return self.rebuild_interval + self.refresh_interval
+
+    def rebuild(self):
+        with self._lock:
+            self.partials = None
+        return self.refresh(force=True)
+
+    def restore(self, partials, high_water_mark, regions, age=0.0):
+        """Start from partials saved ``age`` seconds ago (see warmup.py); the next refresh merges rows above their mark"""
+        with self._lock:
+            self.partials = partials.astype({measure: float for measure in MEASURES}).sort_index()
+            self.high_water_mark = int(high_water_mark)
+            self.regions = dict(regions)
+            self.last_refresh = None
+            # The saved partials count toward the periodic full rebuild
+            self.last_rebuild = time.monotonic() - age
+
+    def _aggregate(self, low, high):
+        if high <= low:
+            # Typed levels, so an empty table still rolls up by month like a filled one
+            index = pd.MultiIndex.from_arrays([pd.DatetimeIndex([]), pd.Index([], dtype='int64')], names=BUCKET_KEYS)
+            return pd.DataFrame(columns=MEASURES, index=index, dtype=float)
+        delta, error = self.db.execute_query(DELTA_QUERY.format(low=int(low), high=int(high)), use_cache=False)
+        if error:
+            raise RuntimeError(f"Could not aggregate new sales rows: {error}")
+        delta['sale_date'] = pd.to_datetime(delta['sale_date'])
+        return delta.astype({measure: float for measure in MEASURES}).set_index(BUCKET_KEYS).sort_index()
+
+    def _load_regions(self):
+        df, error = self.db.execute_query("SELECT region_id, region_name FROM regions", use_cache=False)
+        if error:
+            logging.warning(f"Could not load regions for incremental aggregates: {error}")
+            return {}
+        return dict(zip(df['region_name'], df['region_id']))
+
+    def monthly_trends(self, region=None, start_date=None, end_date=None, limit=None):
+        """Monthly revenue from the partials, matching SQLAgent's monthly_trends query; None if the region is unknown"""
+        self.refresh()
+        partials = self.partials
+        if region is not None:
+            if region not in self.regions:
+                return None
+            # A known region with no sales yet has no buckets, and an empty result
+            region_id = self.regions[region]
+            if region_id not in partials.index.get_level_values('region_id'):
+                return pd.DataFrame({'month': pd.Series(dtype='datetime64[ns]'), 'monthly_revenue': pd.Series(dtype=float)})
+            partials = partials.xs(region_id, level='region_id', drop_level=False)
+        days = partials.index.get_level_values('sale_date')
+        if start_date is not None:
+            partials = partials[(days >= pd.Timestamp(start_date)) & (days < pd.Timestamp(end_date))]
+            days = partials.index.get_level_values('sale_date')
+        monthly = partials['revenue'].groupby(days.to_period('M').to_timestamp()).sum()
+        df = monthly.rename_axis('month').reset_index(name='monthly_revenue')
+        return df.head(limit) if limit is not None else df
+
+    def answer(self, match):
+        """Result frame for an IntentMatch the partials can answer, else None"""
+        if match.name != 'monthly_trends':
+            return None
+        params = match.params
+        return self.monthly_trends(
+            region=params.get('region'),
+            start_date=params.get('start_date'),
+            end_date=params.get('end_date'),
+            limit=params.get('limit')
+        )
@@ -1,31 +1,112 @@
 import os
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+import time
+import threading
 import pandas as pd
 from dotenv import load_dotenv
 import logging
 
+from data_profiler import DataProfiler, profile_result
+from insight_pipeline import InsightPipeline, FakeChatModel
+from tracing import tracer
+from lazy_imports import lazy_import
+
+# Imported on the first insight request, so a missing package only affects
+# the OpenAI model (INSIGHT_MODEL=fake works without LangChain)
+langchain_openai = lazy_import('langchain_openai', check=False)
+langchain_schema = lazy_import('langchain.schema', check=False)
+
 load_dotenv()
 
+class InsightStream:
+    """Yields the accumulated response text while insights stream in.
+
+    ``insights`` is filled once iteration ends: the parsed model output, or
+    the fallback insights when the call failed, timed out or returned nothing.
+    """
+
+    def __init__(self, tokens=None, insights=None, parse=None, fallback=None):
+        self._tokens = tokens
+        self._parse = parse
+        self._fallback = fallback
+        self.insights = insights
+
+    def __iter__(self):
+        if self._tokens is None:
+            return
+        t0 = time.perf_counter()
+        for _ in self._tokens:
+            yield self._tokens.text
+        tracer.record('insights.llm', time.perf_counter() - t0, error=self._tokens.error, chars=len(self._tokens.text))
+        
+        if self._tokens.error is None and self._tokens.text.strip():
+            try:
+                self.insights = self._parse(self._tokens.text)
+                logging.info(f"Generated {len(self.insights)} AI insights")
+                return
+            except Exception as e:
+                logging.error(f"Error parsing AI insights: {str(e)}")
+        else:
+            logging.error(f"Error generating AI insights: {self._tokens.error}")
+        self.insights = self._fallback()
+
+    def result(self):
+        for _ in self:
+            pass
+        return self.insights
+
 class InsightGenerator:
-    def __init__(self):
+    def __init__(self, llm=None):
+        self.model_name = os.getenv('INSIGHT_MODEL', 'gpt-4')
+        self.llm = llm
+        if llm is None and self.model_name == 'fake':
+            self.llm = FakeChatModel(latency=float(os.getenv('FAKE_LLM_LATENCY', '0.5')))
+            logging.info("AI Insight Generator using the local fake chat model")
+        
+        self.profiler = DataProfiler()
+        # The OpenAI client and the pipeline are created on the first insight
+        # request rather than at start-up; see the pipeline property
+        self._pipeline = None
+        self._pipeline_ready = False
+        self._pipeline_lock = threading.Lock()
+
+    @property
+    def pipeline(self):
+        # Shared by every session through st.cache_resource, so the concurrency limit is process-wide
+        with self._pipeline_lock:
+            if not self._pipeline_ready:
+                if self.llm is None:
+                    self.llm = self._create_llm()
+                self._pipeline = InsightPipeline(self.llm) if self.llm else None
+                self._pipeline_ready = True
+        return self._pipeline
+
+    def _create_llm(self):
         try:
-            self.llm = ChatOpenAI(
+            llm = langchain_openai.ChatOpenAI(
                 api_key=os.getenv('OPENAI_API_KEY'),
-                model="gpt-4",
-                temperature=0.3
+                model=self.model_name,
+                temperature=0.3,
+                streaming=True
             )
             logging.info("AI Insight Generator initialized successfully")
+            return llm
         except Exception as e:
             logging.error(f"Failed to initialize InsightGenerator: {str(e)}")
-            self.llm = None
+            return None
 
     def generate_insights(self, df, original_query):
+        with tracer.span('insights.generate', rows=0 if df is None else len(df)):
+            # Concurrent identical prompts share one model call in the pipeline (see InsightPipeline.stream)
+            return self.stream_insights(df, original_query).result()
+
+    def stream_insights(self, df, original_query):
+        """Start generating insights and return an InsightStream of the partial response"""
         if df is None or df.empty:
-            return ["No data available for analysis."]
+            return InsightStream(insights=["No data available for analysis."])
         
-        if not self.llm:
-            return self._get_fallback_insights(df, original_query)
+        pipeline = self.pipeline
+        if not pipeline:
+            return InsightStream(insights=self._get_fallback_insights(df, original_query))
         
         try:
             data_summary = self._prepare_data_summary(df)
@@ -54,37 +135,46 @@ class InsightGenerator:
             Generate 3 specific, actionable business insights based on this data.
             """
 
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt)
-            ]
+            try:
+                messages = [
+                    langchain_schema.SystemMessage(content=system_prompt),
+                    langchain_schema.HumanMessage(content=user_prompt)
+                ]
+            except ImportError:
+                # Only the fake model can be configured without LangChain, and it ignores the messages
+                messages = [('system', system_prompt), ('human', user_prompt)]
 
-            response = self.llm(messages)
-            insights = self._parse_insights(response.content)
-            
-            logging.info(f"Generated {len(insights)} AI insights")
-            return insights
+            tokens = pipeline.stream(InsightPipeline.prompt_key(system_prompt, user_prompt), messages)
+            return InsightStream(
+                tokens,
+                parse=self._parse_insights,
+                fallback=lambda: self._get_fallback_insights(df, original_query)
+            )
             
         except Exception as e:
             logging.error(f"Error generating AI insights: {str(e)}")
-            return self._get_fallback_insights(df, original_query)
+            return InsightStream(insights=self._get_fallback_insights(df, original_query))
 
     def _prepare_data_summary(self, df):
-        summary = f"Dataset Overview: {df.shape[0]} rows, {df.shape[1]} columns\n\n"
+        profile = profile_result(df, self.profiler)
+        summary = f"Dataset Overview: {profile.rows} rows, {len(profile.columns)} columns\n\n"
+        if profile.sampled:
+            summary += f"(Statistics estimated from a {profile.sample_rows:,}-row random sample)\n\n"
         
-        numeric_cols = df.select_dtypes(include=['number']).columns
-        if len(numeric_cols) > 0:
+        if profile.numeric:
             summary += "NUMERIC METRICS:\n"
-            for col in numeric_cols:
-                stats = df[col].describe()
-                summary += f"• {col}: avg={stats['mean']:.2f}, min={stats['min']:.2f}, max={stats['max']:.2f}\n"
+            for col, stats in profile.numeric.items():
+                avg = f"{stats['mean']:.2f}"
+                if 'mean_error' in stats:
+                    avg += f" (±{stats['mean_error']:.2f})"
+                summary += f"• {col}: avg={avg}, min={stats['min']:.2f}, max={stats['max']:.2f}\n"
         
-        categorical_cols = df.select_dtypes(include=['object']).columns
-        if len(categorical_cols) > 0:
+        if profile.cardinality:
             summary += "\nCATEGORICAL DATA:\n"
-            for col in categorical_cols:
-                unique_count = df[col].nunique()
-                summary += f"• {col}: {unique_count} unique values\n"
+            for col, unique_count in profile.cardinality.items():
+                # Distinct counts from a sample are only a lower bound
+                bound = "at least " if profile.sampled else ""
+                summary += f"• {col}: {bound}{unique_count} unique values\n"
         
         return summary
 
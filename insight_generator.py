@@ -1,6 +1,8 @@
 import pandas as pd
 import logging
 
+from tracing import tracer
+
 class InsightGenerator:
     def __init__(self):
         """Demo version - no OpenAI required"""
@@ -9,6 +11,10 @@ class InsightGenerator:
 
     def generate_insights(self, df, original_query):
         """Generate business insights - Demo version with predefined insights"""
+        with tracer.span('insights.generate', rows=0 if df is None else len(df), demo=True):
+            return self._canned_insights(df, original_query)
+
+    def _canned_insights(self, df, original_query):
         if df is None or df.empty:
             return ["No data available for analysis."]
         
@@ -0,0 +1,224 @@
+import os
+import re
+import queue
+import asyncio
+import hashlib
+import logging
+import threading
+
+from tracing import tracer
+
+
+class InsightTimeout(Exception):
+    pass
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeChatModel:
+    """Local stand-in for ChatOpenAI with configurable latency, for testing and benchmarks.
+
+    Implements the ``astream``/``ainvoke`` subset of the LangChain chat model
+    interface the pipeline uses: waits ``latency`` seconds, then emits the
+    response word by word every ``token_delay`` seconds.
+    """
+
+    DEFAULT_RESPONSE = (
+        "1. Revenue is concentrated in a few segments, so protect those accounts while testing growth offers elsewhere.\n"
+        "2. Underperforming segments trail the average noticeably; review pricing and channel mix there first.\n"
+        "3. Track these metrics weekly so shifts in the distribution are caught before they affect the quarter.\n"
+    )
+
+    def __init__(self, latency=0.5, token_delay=0.01, response=None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.response = response or self.DEFAULT_RESPONSE
+        self.calls = 0
+
+    async def astream(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        for token in re.findall(r"\S+\s*", self.response):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield _Chunk(token)
+
+    async def ainvoke(self, messages):
+        text = ''
+        async for chunk in self.astream(messages):
+            text += chunk.content
+        return _Chunk(text)
+
+
+class _SharedCall:
+    """One in-flight model call; every subscriber queue receives all of its tokens"""
+
+    def __init__(self):
+        self.tokens = []
+        self.subscribers = []
+        self.done = False
+        self.error = None
+
+    def subscribe(self, q):
+        # Late joiners get the tokens produced so far before the live ones
+        for token in self.tokens:
+            q.put(('token', token))
+        if self.done:
+            q.put(('error', self.error) if self.error else ('done', None))
+        else:
+            self.subscribers.append(q)
+
+    def emit(self, token):
+        self.tokens.append(token)
+        for q in self.subscribers:
+            q.put(('token', token))
+
+    def finish(self, error=None):
+        self.done = True
+        self.error = error
+        for q in self.subscribers:
+            q.put(('error', error) if error else ('done', None))
+
+
+class TokenStream:
+    """Blocking iterator over the tokens of one pipeline call.
+
+    Yields text deltas as the model produces them; ``text`` holds the
+    accumulated response and ``error`` is set (instead of raising) when the
+    call failed or timed out.
+    """
+
+    def __init__(self, q, timeout):
+        self._queue = q
+        self._timeout = timeout
+        self.text = ''
+        self.error = None
+        self.finished = False
+
+    def __iter__(self):
+        while not self.finished:
+            try:
+                kind, value = self._queue.get(timeout=self._timeout)
+            except queue.Empty:
+                kind, value = 'error', InsightTimeout("Insight stream stalled")
+            if kind == 'token':
+                self.text += value
+                yield value
+            else:
+                self.error = value
+                self.finished = True
+
+    def read(self):
+        """Consume the whole stream and return the full text"""
+        for _ in self:
+            pass
+        return self.text
+
+
+class InsightPipeline:
+    """Runs chat model calls on a private asyncio loop with a shared concurrency limit.
+
+    At most ``max_concurrency`` calls run against the model at once; each
+    call (queue wait included) is bounded by ``timeout`` seconds. Identical
+    prompts that are already in flight are coalesced into a single model
+    call whose tokens are fanned out to every caller. The loop lives on a
+    daemon thread, so synchronous Streamlit code can consume streams
+    without blocking other sessions.
+    """
+
+    def __init__(self, model, max_concurrency=None, timeout=None):
+        self.model = model
+        self.max_concurrency = max_concurrency or int(os.getenv('INSIGHT_MAX_CONCURRENCY', '4'))
+        self.timeout = timeout or float(os.getenv('INSIGHT_TIMEOUT', '30'))
+        self._loop = None
+        self._semaphore = None
+        self._inflight = {}
+        self._start_lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    @staticmethod
+    def prompt_key(*parts):
+        return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+    def stream(self, key, messages):
+        """Start (or join) the call for ``key`` and return a TokenStream"""
+        loop = self._ensure_loop()
+        q = queue.Queue()
+        asyncio.run_coroutine_threadsafe(self._subscribe(key, messages, q), loop)
+        # Small grace period so the pipeline's own timeout fires first
+        return TokenStream(q, self.timeout + 5)
+
+    def generate(self, key, messages):
+        """Blocking call; returns (text, error)"""
+        stream = self.stream(key, messages)
+        text = stream.read()
+        return text, stream.error
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'timeouts': self.timeouts,
+            'failures': self.failures,
+            'in_flight': len(self._inflight)
+        }
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                thread = threading.Thread(target=loop.run_forever, name='insight-pipeline', daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    async def _subscribe(self, key, messages, q):
+        # Runs on the pipeline loop, so _inflight needs no lock
+        call = self._inflight.get(key)
+        if call is None:
+            call = self._inflight[key] = _SharedCall()
+            asyncio.get_running_loop().create_task(self._run(key, messages, call))
+            tracer.metrics.count('singleflight_executions', 'insights.llm')
+        else:
+            self.coalesced += 1
+            tracer.metrics.count('singleflight_collapsed', 'insights.llm')
+        call.subscribe(q)
+
+    async def _run(self, key, messages, call):
+        self.calls += 1
+        error = None
+        try:
+            await asyncio.wait_for(self._call_model(messages, call), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            error = InsightTimeout(f"Model did not finish within {self.timeout:g}s")
+            logging.warning(f"Insight call timed out after {self.timeout:g}s")
+        except Exception as e:
+            self.failures += 1
+            error = e
+            logging.error(f"Insight call failed: {str(e)}")
+        finally:
+            self._inflight.pop(key, None)
+            call.finish(error)
+
+    async def _call_model(self, messages, call):
+        async with self._semaphore:
+            if hasattr(self.model, 'astream'):
+                async for chunk in self.model.astream(messages):
+                    if chunk.content:
+                        call.emit(chunk.content)
+            else:
+                response = await self.model.ainvoke(messages)
+                call.emit(response.content)
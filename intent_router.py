@@ -0,0 +1,314 @@
+import re
+import json
+import math
+import hashlib
+import calendar
+from datetime import date, timedelta
+import numpy as np
+
+STOPWORDS = {
+    'a', 'an', 'the', 'me', 'my', 'show', 'give', 'list', 'what', 'which', 'are', 'is', 'was', 'were',
+    'of', 'for', 'by', 'in', 'on', 'to', 'and', 'or', 'with', 'please', 'can', 'you', 'i', 'we', 'our',
+    'how', 'do', 'does', 'did', 'all', 'see', 'tell', 'about', 'from', 'over', 'per', 'us', 'get', 'display'
+}
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'twenty': 20, 'fifty': 50, 'hundred': 100
+}
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_NUMBER = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+_LIMIT_PATTERNS = [
+    re.compile(r"\b(?:top|first|best|bottom|worst|highest|lowest|largest|smallest)\s+" + _NUMBER + r"\b"),
+    re.compile(r"\b" + _NUMBER + r"\s+(?:products|regions|categories|items|rows|records|results)\b")
+]
+_ISO_DATE = r"(\d{4}-\d{2}-\d{2})"
+_YEAR = r"((?:19|20)\d{2})"
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed and plurals folded"""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def features(text):
+    """Unigram and bigram features used for both indexing and matching"""
+    tokens = tokenize(text)
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def _to_int(value):
+    return NUMBER_WORDS[value] if value in NUMBER_WORDS else int(value)
+
+
+def _add_months(d, months):
+    month_index = d.month - 1 + months
+    return date(d.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+class Intent:
+    """A named question type with example phrasings and default parameters"""
+
+    def __init__(self, name, phrases, defaults=None):
+        self.name = name
+        self.phrases = list(phrases)
+        self.defaults = dict(defaults or {})
+
+
+class IntentMatch:
+    def __init__(self, intent, score, params):
+        self.intent = intent
+        self.score = score
+        self.params = params
+
+    @property
+    def name(self):
+        return self.intent.name if self.intent else None
+
+
+class IntentRouter:
+    """Registry of intents matched through a precomputed inverted feature index.
+
+    Each example phrase is indexed by its unigram/bigram features with IDF
+    weights into NumPy posting arrays, so scoring a question is a handful of
+    vectorized adds over the phrases sharing its features. Parameters
+    (limit, region, date range) are extracted first and their text removed
+    before scoring. A phrase only counts as a match when it shares a bigram
+    with the question, or at least two of its words in any order covering
+    ``min_coverage`` of its IDF-weighted words (so 'forecast vs actual'
+    still finds 'actual vs forecast revenue'), or is a one-word phrase the
+    question contains. A single common word such as 'sales' or 'revenue'
+    never picks an intent on its own.
+    """
+
+    def __init__(self, min_score=0.5, min_coverage=0.5, regions=None):
+        self.min_score = min_score
+        self.min_coverage = min_coverage
+        self.regions = {}
+        self._region_pattern = None
+        self._intents = {}
+        self._index = {}
+        self._idf = {}
+        self._phrase_owner = []
+        self._phrase_weight = None
+        self._phrase_bigrams = None
+        self._phrase_unigram_weight = None
+        self._dirty = True
+        for region in regions or []:
+            self.add_region(region)
+
+    def add_region(self, region_name):
+        self.regions[region_name.lower()] = region_name
+        # Longest names first so 'north america' wins over a shorter alias
+        names = sorted(self.regions, key=len, reverse=True)
+        self._region_pattern = re.compile(r"\b(" + "|".join(re.escape(name) for name in names) + r")\b")
+
+    def register(self, name, phrases, defaults=None):
+        self._intents[name] = Intent(name, phrases, defaults)
+        self._dirty = True
+        return self._intents[name]
+
+    def intents(self):
+        return list(self._intents.values())
+
+    def build(self):
+        """Recompute IDF weights and posting lists for all registered phrases"""
+        phrase_features = []
+        self._phrase_owner = []
+        for intent in self._intents.values():
+            for phrase in intent.phrases:
+                phrase_features.append(features(phrase))
+                self._phrase_owner.append(intent)
+
+        document_frequency = {}
+        for feats in phrase_features:
+            for feat in feats:
+                document_frequency[feat] = document_frequency.get(feat, 0) + 1
+
+        total = len(phrase_features)
+        self._idf = {feat: math.log(1 + total / df) for feat, df in document_frequency.items()}
+        postings = {}
+        phrase_weight = np.zeros(total)
+        phrase_bigrams = np.zeros(total, dtype=np.int32)
+        phrase_unigram_weight = np.zeros(total)
+        for phrase_id, feats in enumerate(phrase_features):
+            for feat in feats:
+                postings.setdefault(feat, []).append(phrase_id)
+                phrase_weight[phrase_id] += self._idf[feat]
+                if ' ' in feat:
+                    phrase_bigrams[phrase_id] += 1
+                else:
+                    phrase_unigram_weight[phrase_id] += self._idf[feat]
+        self._index = {feat: np.array(ids, dtype=np.int32) for feat, ids in postings.items()}
+        self._phrase_weight = phrase_weight
+        self._phrase_bigrams = phrase_bigrams
+        self._phrase_unigram_weight = phrase_unigram_weight
+        self._dirty = False
+
+    def signature(self):
+        """Hash of the registered intents and their phrases, which is all build() depends on"""
+        phrases = [[intent.name, intent.phrases] for intent in self._intents.values()]
+        return hashlib.sha256(json.dumps(phrases).encode('utf-8')).hexdigest()
+
+    def export_tables(self):
+        """The built IDF weights and posting lists as JSON-serializable data, for load_tables()"""
+        if self._dirty:
+            self.build()
+        return {
+            'signature': self.signature(),
+            'idf': self._idf,
+            'postings': {feat: ids.tolist() for feat, ids in self._index.items()},
+            'owners': [intent.name for intent in self._phrase_owner],
+            'phrase_weight': self._phrase_weight.tolist(),
+            'phrase_bigrams': self._phrase_bigrams.tolist(),
+            'phrase_unigram_weight': self._phrase_unigram_weight.tolist()
+        }
+
+    def load_tables(self, tables):
+        """Use tables from export_tables() instead of build(); returns False if the intents have changed since"""
+        if not tables or tables.get('signature') != self.signature() or 'phrase_unigram_weight' not in tables:
+            return False
+        self._idf = tables['idf']
+        self._index = {feat: np.array(ids, dtype=np.int32) for feat, ids in tables['postings'].items()}
+        self._phrase_owner = [self._intents[name] for name in tables['owners']]
+        self._phrase_weight = np.array(tables['phrase_weight'])
+        self._phrase_bigrams = np.array(tables['phrase_bigrams'], dtype=np.int32)
+        self._phrase_unigram_weight = np.array(tables['phrase_unigram_weight'])
+        self._dirty = False
+        return True
+
+    def match(self, question, today=None):
+        """Return the best IntentMatch, or a match with intent None below min_score"""
+        if self._dirty:
+            self.build()
+
+        params, remainder = self.extract_params(question, today)
+        query_features = [feat for feat in features(remainder) if feat in self._idf]
+
+        best_intent, best_score = None, 0.0
+        if query_features:
+            query_weight = sum(self._idf[feat] for feat in query_features)
+            query_unigram_weight = sum(self._idf[feat] for feat in query_features if ' ' not in feat)
+            overlap = np.zeros(len(self._phrase_weight))
+            unigram_overlap = np.zeros(len(self._phrase_weight))
+            shared_bigrams = np.zeros(len(self._phrase_weight), dtype=np.int32)
+            shared_unigrams = np.zeros(len(self._phrase_weight), dtype=np.int32)
+            for feat in query_features:
+                # Phrase ids are unique within a posting list, so fancy-index add is safe
+                ids = self._index[feat]
+                overlap[ids] += self._idf[feat]
+                if ' ' in feat:
+                    shared_bigrams[ids] += 1
+                else:
+                    unigram_overlap[ids] += self._idf[feat]
+                    shared_unigrams[ids] += 1
+            # Harmonic mean of overlap/query_weight and overlap/phrase_weight
+            scores = 2 * overlap / (query_weight + self._phrase_weight)
+            # One shared word is not enough: require a shared bigram, enough of the phrase's
+            # words in any order, or the whole of a one-word phrase
+            covered = (shared_unigrams >= 2) & (unigram_overlap >= self.min_coverage * self._phrase_unigram_weight)
+            whole_word = (self._phrase_bigrams == 0) & (overlap >= self._phrase_weight)
+            eligible = (shared_bigrams > 0) | covered | whole_word
+            # Covered phrases are also scored on words alone, so word order doesn't cost them the match
+            unordered = 2 * unigram_overlap / (query_unigram_weight + self._phrase_unigram_weight)
+            scores = np.where(covered, np.maximum(scores, unordered), scores)
+            scores[~eligible] = 0.0
+            best = int(scores.argmax())
+            best_intent, best_score = self._phrase_owner[best], float(scores[best])
+
+        if best_intent is None or best_score < self.min_score:
+            return IntentMatch(None, best_score, params)
+
+        merged = dict(best_intent.defaults)
+        merged.update(params)
+        return IntentMatch(best_intent, best_score, merged)
+
+    def extract_params(self, question, today=None):
+        """Pull limit, region and date range out of a question.
+
+        Returns ``(params, remainder)`` where ``remainder`` is the question
+        with the matched spans removed, so e.g. '5' or 'Europe' do not
+        influence intent scoring.
+        """
+        text = question.lower()
+        params = {}
+
+        for pattern in _LIMIT_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                params['limit'] = _to_int(match.group(1))
+                text = text[:match.start(1)] + ' ' + text[match.end(1):]
+                break
+
+        match = self._region_pattern.search(text) if self._region_pattern else None
+        if match:
+            params['region'] = self.regions[match.group(1)]
+            text = text[:match.start()] + ' ' + text[match.end():]
+
+        date_range, text = self._extract_date_range(text, today or date.today())
+        if date_range:
+            params['start_date'], params['end_date'] = date_range
+        return params, text
+
+    def _extract_date_range(self, text, today):
+        """Find a date range; returns ((start, end_exclusive) or None, remaining text)"""
+        for pattern, to_range in _DATE_RANGE_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return to_range(match, today), text[:match.start()] + ' ' + text[match.end():]
+        return None, text
+
+
+_FULL_MONTHS = [name.lower() for name in calendar.month_name if name and name != 'May']
+
+
+def _latest_month(month, today):
+    year = today.year if month <= today.month else today.year - 1
+    return date(year, month, 1), _add_months(date(year, month, 1), 1)
+
+
+def _quarter_start(d):
+    return date(d.year, 3 * ((d.month - 1) // 3) + 1, 1)
+
+
+# Checked in order; the first pattern that matches wins. End dates are exclusive.
+_DATE_RANGE_PATTERNS = [(re.compile(pattern), to_range) for pattern, to_range in [
+    (r"\bbetween\s+" + _ISO_DATE + r"\s+and\s+" + _ISO_DATE + r"\b",
+     lambda m, today: (date.fromisoformat(m.group(1)), date.fromisoformat(m.group(2)) + timedelta(days=1))),
+    (r"\bq([1-4])\s+" + _YEAR + r"\b",
+     lambda m, today: (date(int(m.group(2)), 3 * int(m.group(1)) - 2, 1),
+                       _add_months(date(int(m.group(2)), 3 * int(m.group(1)) - 2, 1), 3))),
+    (r"\b(" + "|".join(MONTHS) + r")\s+" + _YEAR + r"\b",
+     lambda m, today: (date(int(m.group(2)), MONTHS[m.group(1)], 1),
+                       _add_months(date(int(m.group(2)), MONTHS[m.group(1)], 1), 1))),
+    (r"\blast\s+" + _NUMBER + r"\s+days?\b",
+     lambda m, today: (today - timedelta(days=_to_int(m.group(1))), today + timedelta(days=1))),
+    (r"\blast\s+" + _NUMBER + r"\s+months?\b",
+     lambda m, today: (_add_months(today.replace(day=1), -_to_int(m.group(1))), today.replace(day=1))),
+    (r"\blast\s+month\b",
+     lambda m, today: (_add_months(today.replace(day=1), -1), today.replace(day=1))),
+    (r"\bthis\s+month\b",
+     lambda m, today: (today.replace(day=1), _add_months(today.replace(day=1), 1))),
+    (r"\blast\s+quarter\b",
+     lambda m, today: (_add_months(_quarter_start(today), -3), _quarter_start(today))),
+    (r"\blast\s+year\b",
+     lambda m, today: (date(today.year - 1, 1, 1), date(today.year, 1, 1))),
+    (r"\b(?:this\s+year|year\s+to\s+date|ytd)\b",
+     lambda m, today: (date(today.year, 1, 1), today + timedelta(days=1))),
+    (r"\b(?:in|during|for)\s+" + _YEAR + r"\b",
+     lambda m, today: (date(int(m.group(1)), 1, 1), date(int(m.group(1)) + 1, 1, 1))),
+    # A month without a year is its latest occurrence; abbreviations and 'may' need a preposition
+    (r"\b(?:(?:in|during|for)\s+(" + "|".join(MONTHS) + r")|(" + "|".join(_FULL_MONTHS) + r"))\b",
+     lambda m, today: _latest_month(MONTHS[m.group(1) or m.group(2)], today)),
+]]
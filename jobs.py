@@ -0,0 +1,163 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """One unit of background work, registered under a session and a key"""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, session_id, key):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.key = key
+        self.status = Job.PENDING
+        self.result = None
+        self.error = None
+        # Free-form partial state written by the worker (rows loaded, text so far, ...)
+        self.progress = {}
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._future = None
+
+    @property
+    def finished(self):
+        return self.status in (Job.DONE, Job.FAILED, Job.CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        """Called by long-running work at safe points; raises JobCancelled once cancel was requested"""
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.key} cancelled")
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobScheduler:
+    """Worker pool plus a per-session job registry.
+
+    ``submit`` is idempotent per (session, key): if the key is already
+    registered the existing job is returned whatever its state, so a
+    Streamlit rerun re-attaches to in-flight work instead of restarting
+    it. Callers poll ``Job.status``/``Job.progress`` and call ``forget`` to
+    allow a key to run again. Cancellation is cooperative: pending jobs
+    never start, running jobs stop at their next ``check_cancelled``.
+    Finished jobs are dropped after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_workers=None, ttl=None):
+        self.max_workers = max_workers or int(os.getenv('JOB_WORKERS', '8'))
+        self.ttl = ttl or int(os.getenv('JOB_TTL', '3600'))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, key, fn, *args, **kwargs):
+        """Run ``fn(job, *args, **kwargs)`` in the pool unless ``key`` is already registered"""
+        with self._lock:
+            self._prune()
+            session_jobs = self._jobs.setdefault(session_id, {})
+            job = session_jobs.get(key)
+            if job is not None:
+                return job
+            job = session_jobs[key] = Job(session_id, key)
+        job._future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, session_id, key):
+        with self._lock:
+            return self._jobs.get(session_id, {}).get(key)
+
+    def jobs(self, session_id):
+        with self._lock:
+            return list(self._jobs.get(session_id, {}).values())
+
+    def cancel(self, session_id, key=None):
+        """Request cancellation of one job, or of every unfinished job in the session"""
+        targets = [self.get(session_id, key)] if key is not None else self.jobs(session_id)
+        cancelled = 0
+        for job in targets:
+            if job is None or job.finished:
+                continue
+            job._cancel.set()
+            if job._future is not None and job._future.cancel():
+                self._finish(job, Job.CANCELLED)
+            cancelled += 1
+        if cancelled:
+            logging.info(f"Cancelled {cancelled} job(s) for session {session_id}")
+        return cancelled
+
+    def forget(self, session_id, key=None, finished_only=False):
+        """Drop jobs from the registry so their keys can be submitted again"""
+        with self._lock:
+            session_jobs = self._jobs.get(session_id, {})
+            keys = [key] if key is not None else list(session_jobs)
+            for k in keys:
+                job = session_jobs.get(k)
+                if job is not None and (job.finished or not finished_only):
+                    del session_jobs[k]
+
+    def stats(self):
+        with self._lock:
+            all_jobs = [job for session_jobs in self._jobs.values() for job in session_jobs.values()]
+        counts = {}
+        for job in all_jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {'sessions': len(self._jobs), 'jobs': len(all_jobs), 'by_status': counts}
+
+    def shutdown(self, wait=False):
+        for session_id in list(self._jobs):
+            self.cancel(session_id)
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, fn, args, kwargs):
+        if job._cancel.is_set():
+            self._finish(job, Job.CANCELLED)
+            return
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        try:
+            result = fn(job, *args, **kwargs)
+        except JobCancelled:
+            self._finish(job, Job.CANCELLED)
+        except Exception as e:
+            logging.error(f"Job {job.key} failed: {str(e)}")
+            job.error = str(e)
+            self._finish(job, Job.FAILED)
+        else:
+            job.result = result
+            self._finish(job, Job.CANCELLED if job._cancel.is_set() else Job.DONE)
+
+    def _finish(self, job, status):
+        job.finished_at = time.time()
+        job.status = status
+        logging.info(f"Job {job.key} {status} after {job.elapsed():.2f}s")
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for session_id in list(self._jobs):
+            session_jobs = self._jobs[session_id]
+            for key in [k for k, job in session_jobs.items() if job.finished and job.finished_at < cutoff]:
+                del session_jobs[key]
+            if not session_jobs:
+                del self._jobs[session_id]
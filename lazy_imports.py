@@ -0,0 +1,59 @@
+import sys
+import time
+import logging
+import importlib
+import importlib.util
+import threading
+
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access.
+
+    Keeps heavy optional dependencies (plotly, requests, langchain) out of
+    process start-up until a code path actually uses them. Loading is
+    serialized, so worker threads touching it at once import it once.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        # Only reached for names not set in __init__, i.e. the module's own
+        module = self._module if self._module is not None else self._load()
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                t0 = time.perf_counter()
+                self._module = importlib.import_module(self._name)
+                logging.info(f"Imported {self._name} on first use in {(time.perf_counter() - t0) * 1000:.0f}ms")
+            return self._module
+
+
+def lazy_import(name, check=True):
+    """Return module ``name`` if already imported, else a LazyModule for it.
+
+    Raises ImportError right away when the module is not installed, so the
+    repo's ``try: import ... except ImportError`` fallbacks keep working.
+    With ``check=False`` the ImportError is raised on first use instead, for
+    dependencies only some code paths need.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if not check:
+        return LazyModule(name)
+    try:
+        spec = importlib.util.find_spec(name)
+    except ModuleNotFoundError:
+        spec = None
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    return LazyModule(name)
@@ -4,13 +4,29 @@ import os
 from datetime import datetime
 import logging
 
+from dataset_store import DatasetStore
+from powerbi_push import PushClient
+from tracing import tracer, frame_bytes
+
 class PowerBIManager:
-    def __init__(self):
-        self.mock_mode = True
-        self.datasets_created = []
+    def __init__(self, store=None, client=None):
+        self.store = store or DatasetStore()
         self.base_url = "https://app.powerbi.com"
         
-        logging.info("Power BI Manager initialized in mock mode")
+        # Rows are only pushed when an API token (or an explicit client) is configured
+        if client is None and os.getenv('POWERBI_TOKEN'):
+            client = PushClient()
+        self.client = client
+        self.mock_mode = client is None
+        
+        if self.mock_mode:
+            logging.info("Power BI Manager initialized in mock mode (datasets stored locally only)")
+        else:
+            logging.info(f"Power BI Manager pushing datasets to {client.base_url}")
+
+    @property
+    def datasets_created(self):
+        return self.store.list()
 
     def test_connection(self):
         return True
@@ -19,26 +35,60 @@ class PowerBIManager:
         if df is None or df.empty:
             return None
         
-        try:
-            mock_dataset_id = f"mock_dataset_{len(self.datasets_created) + 1}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            
-            dataset_info = {
-                'id': mock_dataset_id,
-                'name': dataset_name,
-                'table_name': table_name,
-                'created_at': datetime.now().isoformat(),
-                'row_count': len(df),
-                'columns': list(df.columns)
-            }
-            
-            self.datasets_created.append(dataset_info)
-            logging.info(f"Mock Power BI dataset created: {mock_dataset_id}")
-            
-            return mock_dataset_id
-            
-        except Exception as e:
-            logging.error(f"Error creating mock dataset: {str(e)}")
-            return None
+        with tracer.span('powerbi.create_dataset', rows=len(df), bytes=frame_bytes(df)) as span:
+            try:
+                dataset_id = self.store.create(df, dataset_name, table_name)
+                logging.info(f"Power BI dataset stored: {dataset_id} ({len(df):,} rows)")
+                
+                if not self.mock_mode:
+                    try:
+                        remote_id = self.client.create_dataset(dataset_name, df, table_name)
+                    except Exception:
+                        # Nothing to resume without a remote dataset, so don't keep the local copy
+                        self.store.delete(dataset_id)
+                        raise
+                    self.store.update(dataset_id, remote_id=remote_id)
+                    self.push_pending(dataset_id)
+                
+                return dataset_id
+                
+            except Exception as e:
+                span.error = str(e)
+                logging.error(f"Error creating dataset: {str(e)}")
+                return None
+
+    def append_rows(self, dataset_id, df):
+        """Add rows to an existing dataset and push only those rows"""
+        if df is None or df.empty:
+            return 0
+        with tracer.span('powerbi.append_rows', rows=len(df), bytes=frame_bytes(df)):
+            self.store.append(dataset_id, df)
+            return self.push_pending(dataset_id)
+
+    def push_pending(self, dataset_id):
+        """Push every stored row the service has not acknowledged yet; safe to call again after a failure"""
+        info = self.store.get(dataset_id)
+        if info is None or self.mock_mode or not info['remote_id']:
+            return 0
+        
+        start = info['pushed_rows']
+        if start >= info['row_count']:
+            return 0
+        
+        def checkpoint(pushed):
+            self.store.update(dataset_id, pushed_rows=start + pushed)
+        
+        with tracer.span('powerbi.push') as span:
+            retries = self.client.retries
+            pushed = self.client.push_rows(
+                info['remote_id'],
+                info['table_name'],
+                self.store.iter_batches(dataset_id, start_row=start, batch_rows=self.client.batch_rows),
+                on_batch=checkpoint
+            )
+            span.set(rows=pushed, retries=self.client.retries - retries)
+        logging.info(f"Pushed {pushed:,} rows to Power BI dataset {info['remote_id']}")
+        return pushed
 
     def get_embed_url(self, dataset_id):
         demo_url = "https://app.powerbi.com/view?r=eyJrIjoiZjE2YjY5ZDQtZTY5NC00ZGI3LWE3ZGQtMzQ4YWY0MjkxZjU5IiwidCI6IjhlOTVhNzlhLWJlNDAtNGRjNi1hYzRhLTZhYzFlODM5YWM4ZSIsImMiOjN9"
@@ -64,7 +114,4 @@ class PowerBIManager:
         return summary.strip()
 
     def get_dataset_info(self, dataset_id):
-        for dataset in self.datasets_created:
-            if dataset['id'] == dataset_id:
-                return dataset.copy()
-        return None
\ No newline at end of file
+        return self.store.get(dataset_id)
\ No newline at end of file
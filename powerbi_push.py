@@ -0,0 +1,190 @@
+import os
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import pandas as pd
+
+from lazy_imports import lazy_import
+
+# Only needed once a dataset is pushed
+requests = lazy_import('requests')
+
+# Limits of the Power BI push-datasets REST API
+MAX_ROWS_PER_REQUEST = 10000
+MAX_REQUESTS_PER_MINUTE = 120
+
+
+def powerbi_type(dtype):
+    """Map a pandas dtype to a push-dataset column type"""
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'Boolean'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'Int64'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'Double'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'DateTime'
+    return 'String'
+
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if it cannot be parsed"""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def table_schema(df, table_name):
+    return {
+        'name': table_name,
+        'columns': [{'name': str(col), 'dataType': powerbi_type(dtype)} for col, dtype in df.dtypes.items()]
+    }
+
+
+class RateLimiter:
+    """Sliding-window limit of ``max_calls`` per ``period`` seconds"""
+
+    def __init__(self, max_calls, period=60.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._calls = [t for t in self._calls if now - t < self.period]
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
+
+class PushClient:
+    """Client for the Power BI push-datasets API with batching, rate limiting and retries.
+
+    Rows are posted in batches of ``batch_rows`` (at most 10,000, the API
+    limit) and row posts are paced by a per-dataset sliding window. 429 and
+    5xx responses are retried with exponential backoff and jitter,
+    honouring ``Retry-After`` when the service sends it. Creating a dataset
+    is not idempotent, so a failed create is only repeated once a lookup
+    by name shows the service did not create it anyway.
+    """
+
+    def __init__(self, base_url=None, token=None, batch_rows=None, requests_per_minute=None,
+                 max_retries=None, backoff=None, timeout=30):
+        self.base_url = (base_url or os.getenv('POWERBI_API_URL', 'https://api.powerbi.com/v1.0/myorg')).rstrip('/')
+        self.token = token or os.getenv('POWERBI_TOKEN')
+        self.batch_rows = min(batch_rows or int(os.getenv('POWERBI_BATCH_ROWS', str(MAX_ROWS_PER_REQUEST))),
+                              MAX_ROWS_PER_REQUEST)
+        self.requests_per_minute = requests_per_minute or int(
+            os.getenv('POWERBI_REQUESTS_PER_MINUTE', str(MAX_REQUESTS_PER_MINUTE)))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('POWERBI_MAX_RETRIES', '5'))
+        self.backoff = backoff if backoff is not None else float(os.getenv('POWERBI_BACKOFF', '0.5'))
+        self.timeout = timeout
+        self.session = requests.Session()
+        if self.token:
+            self.session.headers['Authorization'] = f"Bearer {self.token}"
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
+        self.retries = 0
+
+    def create_dataset(self, name, df, table_name):
+        """Create a push dataset with one table shaped like ``df``; returns the remote id"""
+        body = {'name': name, 'defaultMode': 'Push', 'tables': [table_schema(df, table_name)]}
+        existing = self.dataset_ids(name)
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._request('POST', '/datasets', retry=False, json=body).json()['id']
+            except requests.RequestException as e:
+                response = e.response
+                retryable = response is None or response.status_code == 429 or response.status_code >= 500
+                if not retryable or attempt == self.max_retries:
+                    raise
+                # The service may have created the dataset before the failure reached us
+                created = self.dataset_ids(name) - existing
+                if created:
+                    return created.pop()
+                delay = self._retry_delay(response, attempt)
+                logging.warning(f"Power BI dataset create failed ({e}); retrying in {delay:.2f}s")
+            self.retries += 1
+            time.sleep(delay)
+
+    def dataset_ids(self, name):
+        """Ids of the remote datasets called ``name``"""
+        datasets = self._request('GET', '/datasets').json().get('value', [])
+        return {dataset['id'] for dataset in datasets if dataset.get('name') == name}
+
+    def push_rows(self, dataset_id, table_name, batches, on_batch=None):
+        """Post DataFrame batches as rows, re-chunked to ``batch_rows``; returns rows pushed.
+
+        ``on_batch`` is called with the running total after every
+        acknowledged post so callers can checkpoint progress.
+        """
+        limiter = self._limiter(dataset_id)
+        path = f"/datasets/{dataset_id}/tables/{table_name}/rows"
+        pushed = 0
+        for batch in batches:
+            for start in range(0, len(batch), self.batch_rows):
+                chunk = batch.iloc[start:start + self.batch_rows]
+                # to_json writes the rows array directly, without a list of dicts in between
+                payload = '{"rows":' + chunk.to_json(orient='records', date_format='iso') + '}'
+                limiter.acquire()
+                self._request('POST', path, data=payload.encode('utf-8'),
+                              headers={'Content-Type': 'application/json'})
+                pushed += len(chunk)
+                if on_batch is not None:
+                    on_batch(pushed)
+        return pushed
+
+    def clear_rows(self, dataset_id, table_name):
+        self._request('DELETE', f"/datasets/{dataset_id}/tables/{table_name}/rows")
+
+    def _limiter(self, dataset_id):
+        with self._limiters_lock:
+            if dataset_id not in self._limiters:
+                self._limiters[dataset_id] = RateLimiter(self.requests_per_minute)
+            return self._limiters[dataset_id]
+
+    def _request(self, method, path, retry=True, **kwargs):
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                if not retry or attempt == self.max_retries:
+                    raise
+                delay = self._delay(attempt)
+                logging.warning(f"Power BI {method} {path} failed ({e}); retrying in {delay:.2f}s")
+            else:
+                if response.status_code < 400:
+                    return response
+                retryable = response.status_code == 429 or response.status_code >= 500
+                if not retry or not retryable or attempt == self.max_retries:
+                    response.raise_for_status()
+                delay = self._retry_delay(response, attempt)
+                logging.warning(f"Power BI {method} {path} returned {response.status_code}; retrying in {delay:.2f}s")
+            self.retries += 1
+            time.sleep(delay)
+
+    def _retry_delay(self, response, attempt):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        delay = retry_after_seconds(retry_after) if retry_after else None
+        return self._delay(attempt) if delay is None else delay
+
+    def _delay(self, attempt):
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
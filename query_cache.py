@@ -0,0 +1,212 @@
+import re
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+try:
+    import sqlglot
+    from sqlglot import exp
+    SQLGLOT_AVAILABLE = True
+except ImportError:
+    SQLGLOT_AVAILABLE = False
+
+_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+_TOKEN = re.compile(r'[a-z_][\w.]*|\S', re.IGNORECASE)
+# Words that can follow a table reference but are not aliases
+_CLAUSE_KEYWORDS = {
+    'where', 'join', 'inner', 'left', 'right', 'full', 'cross', 'natural', 'on', 'using', 'group', 'order',
+    'having', 'limit', 'offset', 'union', 'intersect', 'except', 'window', 'fetch', 'for', 'lateral', 'only',
+    'tablesample', 'select', 'with', 'as'
+}
+
+
+def normalize_sql(query):
+    """Normalize SQL text so trivially different spellings share a cache key"""
+    parts = _STRING_LITERAL.split(query.strip().rstrip(';'))
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            # String literals keep their exact contents
+            normalized.append(part)
+        else:
+            normalized.append(re.sub(r'\s+', ' ', part).lower())
+    return ''.join(normalized).strip()
+
+
+def extract_tables(query):
+    """Return the set of table names referenced in FROM / JOIN clauses, including comma-separated lists"""
+    if SQLGLOT_AVAILABLE:
+        try:
+            tree = sqlglot.parse_one(query, read='postgres')
+        except sqlglot.errors.ParseError:
+            tree = None
+        if tree is not None:
+            return {table.name.lower() for table in tree.find_all(exp.Table) if table.name}
+    tables = set()
+    for name in _table_references(_TOKEN.findall(_STRING_LITERAL.sub("''", query))):
+        # Drop schema qualifiers such as public.sales_data
+        tables.add(name.split('.')[-1].lower())
+    return tables
+
+
+def _is_name(token):
+    return (token[0].isalpha() or token[0] == '_') and token.lower() not in _CLAUSE_KEYWORDS
+
+
+def _table_references(tokens):
+    """Names after FROM or JOIN, and after each comma of a FROM list (``FROM a x, b AS y, (...) z``)"""
+    for i, token in enumerate(tokens):
+        if token.lower() not in ('from', 'join'):
+            continue
+        j = i + 1
+        while j < len(tokens):
+            if tokens[j] == '(':
+                # A subquery or function; the FROM inside it is found on its own
+                depth = 0
+                while j < len(tokens):
+                    depth += {'(': 1, ')': -1}.get(tokens[j], 0)
+                    j += 1
+                    if depth == 0:
+                        break
+            elif _is_name(tokens[j]):
+                yield tokens[j]
+                j += 1
+            else:
+                break
+            if j < len(tokens) and tokens[j].lower() == 'as':
+                j += 1
+            if j < len(tokens) and _is_name(tokens[j]):
+                j += 1
+            if j < len(tokens) and tokens[j] == ',' and token.lower() == 'from':
+                j += 1
+                continue
+            break
+
+
+def estimate_size(df):
+    """Approximate in-memory size of a DataFrame in bytes"""
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+class _CacheEntry:
+    __slots__ = ('key', 'value', 'size', 'tables', 'expires_at')
+
+    def __init__(self, key, value, size, tables, expires_at):
+        self.key = key
+        self.value = value
+        self.size = size
+        self.tables = tables
+        self.expires_at = expires_at
+
+
+class QueryResultCache:
+    """Thread-safe LRU cache for query results, bounded by total memory size.
+
+    Entries expire after ``ttl`` seconds and are also indexed by the tables
+    they read, so ``invalidate_table`` only drops results that depend on it.
+    Cached DataFrames are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=300):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._table_index = {}
+        self._current_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, query):
+        key = normalize_sql(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(entry)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, query, df):
+        key = normalize_sql(query)
+        size = estimate_size(df)
+        if size > self.max_bytes:
+            # A single oversized result would flush the whole cache
+            logging.info(f"Query result of {size} bytes exceeds cache capacity, not cached")
+            return False
+
+        tables = extract_tables(query)
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._remove(existing)
+
+            entry = _CacheEntry(key, df, size, tables, time.monotonic() + self.ttl)
+            self._entries[key] = entry
+            self._current_bytes += size
+            for table in tables:
+                self._table_index.setdefault(table, set()).add(key)
+
+            while self._current_bytes > self.max_bytes and self._entries:
+                _, oldest = next(iter(self._entries.items()))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def invalidate_table(self, table):
+        """Drop every cached result that reads from ``table``"""
+        table = table.split('.')[-1].lower()
+        with self._lock:
+            keys = self._table_index.get(table, set()).copy()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._remove(entry)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._table_index.clear()
+            self._current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+    def _remove(self, entry):
+        self._entries.pop(entry.key, None)
+        self._current_bytes -= entry.size
+        for table in entry.tables:
+            keys = self._table_index.get(table)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del self._table_index[table]
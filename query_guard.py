@@ -0,0 +1,217 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from query_cache import normalize_sql
+from tracing import tracer
+
+try:
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.optimizer.pushdown_projections import pushdown_projections
+    SQLGLOT_AVAILABLE = True
+except ImportError:
+    SQLGLOT_AVAILABLE = False
+
+# Keywords that make a statement write or change state, matched as whole
+# tokens outside string literals and quoted identifiers. INTO catches
+# SELECT ... INTO, UPDATE also FOR UPDATE row locks.
+WRITE_KEYWORDS = [
+    'DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'TRUNCATE', 'CREATE', 'GRANT', 'REVOKE',
+    'MERGE', 'COPY', 'CALL', 'VACUUM', 'INTO'
+]
+READ_STATEMENTS = {'SELECT', 'WITH', 'VALUES', 'TABLE'}
+
+_TOKEN = re.compile(
+    r"'(?:[^']|'')*'"          # string literal
+    r'|"(?:[^"]|"")*"'         # quoted identifier
+    r"|--[^\n]*"               # line comment
+    r"|/\*.*?\*/"              # block comment
+    r"|\w+"
+    r"|\S",
+    re.DOTALL
+)
+
+
+def scan_sql(sql):
+    """(token, start offset) pairs with comments dropped; literals and quoted identifiers are single tokens"""
+    return [(m.group(), m.start()) for m in _TOKEN.finditer(sql) if not m.group().startswith(('--', '/*'))]
+
+
+def _top_level_limit(tokens):
+    """Index of the number after a LIMIT outside parentheses, or None"""
+    depth = 0
+    for i, (tok, _) in enumerate(tokens):
+        if tok == '(':
+            depth += 1
+        elif tok == ')':
+            depth -= 1
+        elif depth == 0 and tok.upper() == 'LIMIT' and i + 1 < len(tokens) and tokens[i + 1][0].isdigit():
+            return i + 1
+    return None
+
+
+class QueryAnalysis:
+    """Statement kind, write keywords, statement count and top-level LIMIT of ``sql``"""
+
+    def __init__(self, sql):
+        self.sql = sql.strip().rstrip(';').rstrip()
+        self.tokens = scan_sql(self.sql)
+        words = [tok.upper() for tok, _ in self.tokens if tok[0] not in '\'"']
+        self.kind = words[0] if words else None
+        self.write_keywords = [word for word in WRITE_KEYWORDS if word in words]
+        self.statements = 0
+        in_statement = False
+        for tok, _ in self.tokens:
+            if tok == ';':
+                in_statement = False
+            elif not in_statement:
+                self.statements += 1
+                in_statement = True
+        limit_index = _top_level_limit(self.tokens)
+        self.limit = int(self.tokens[limit_index][0]) if limit_index is not None else None
+        self.read_only = self.kind in READ_STATEMENTS and not self.write_keywords and self.statements == 1
+        # sqlglot syntax tree, filled in by QueryGuard.analyze when sqlglot is installed
+        self.tree = None
+
+
+class GuardDecision:
+    ALLOW = 'allow'
+    REWRITE = 'rewrite'
+    REJECT = 'reject'
+
+    def __init__(self, action, sql, reason=None, cost=None, rows=None):
+        self.action = action
+        self.sql = sql
+        self.reason = reason
+        self.cost = cost
+        self.rows = rows
+
+
+class QueryGuard:
+    """Pre-execution check of generated SQL against planner cost and row budgets.
+
+    Each statement is analyzed once (cached by SQL hash): it must be a
+    single read-only statement. On PostgreSQL the planner's estimate from
+    ``EXPLAIN (FORMAT JSON)`` is then compared with the budgets. A query
+    expected to return more than ``row_budget`` rows gets a LIMIT (or a
+    lower one), and with sqlglot available unused columns are pruned from
+    subqueries and CTEs; the rewritten query is re-planned and rejected
+    only if it still costs more than ``max_cost``. Other engines have no
+    comparable cost model, so only the LIMIT rewrite applies there, based
+    on the absence of a LIMIT.
+    """
+
+    def __init__(self, db, max_cost=None, row_budget=None, cache_size=1024, estimate_ttl=300):
+        self.db = db
+        self.enabled = os.getenv('QUERY_GUARD', 'true').lower() == 'true'
+        self.max_cost = max_cost or float(os.getenv('QUERY_MAX_COST', '10000000'))
+        self.row_budget = row_budget or int(os.getenv('QUERY_ROW_BUDGET', '100000'))
+        self.cache_size = cache_size
+        self.estimate_ttl = estimate_ttl
+        self._analyses = OrderedDict()
+        self._estimates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze(self, sql):
+        key = hashlib.sha256(normalize_sql(sql).encode('utf-8')).hexdigest()
+        with self._lock:
+            analysis = self._analyses.get(key)
+            if analysis is not None:
+                self._analyses.move_to_end(key)
+                return analysis
+        analysis = QueryAnalysis(sql)
+        if SQLGLOT_AVAILABLE and analysis.read_only:
+            try:
+                analysis.tree = sqlglot.parse_one(analysis.sql, read='postgres')
+            except sqlglot.errors.ParseError as e:
+                logging.info(f"sqlglot could not parse query, using the token scanner: {e}")
+        with self._lock:
+            self._analyses[key] = analysis
+            while len(self._analyses) > self.cache_size:
+                self._analyses.popitem(last=False)
+        return analysis
+
+    def estimate(self, sql):
+        """(total cost, estimated rows) from EXPLAIN, or None where the engine has no cost model"""
+        if self.db.mock_mode or self.db.engine.dialect.name != 'postgresql':
+            return None
+        key = normalize_sql(sql)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._estimates.get(key)
+            if cached is not None and now - cached[0] < self.estimate_ttl:
+                return cached[1]
+        df, error = self.db.execute_query(f"EXPLAIN (FORMAT JSON) {sql}", use_cache=False)
+        if error:
+            raise ValueError(f"Could not plan query: {error}")
+        plan = df.iloc[0, 0]
+        plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+        estimate = (float(plan['Total Cost']), int(plan['Plan Rows']))
+        with self._lock:
+            self._estimates[key] = (now, estimate)
+            while len(self._estimates) > self.cache_size:
+                self._estimates.popitem(last=False)
+        return estimate
+
+    def check(self, sql, limit_rows=True):
+        """Return a GuardDecision: run ``sql`` as is, run the rewritten ``decision.sql``, or reject.
+
+        ``limit_rows=False`` skips the row-budget LIMIT (for exports, which
+        stream past the interactive caps) but keeps every other check.
+        """
+        with tracer.span('query_guard.check') as span:
+            analysis = self.analyze(sql)
+            if not analysis.read_only:
+                reason = "Only single read-only SELECT statements are allowed"
+                if analysis.write_keywords:
+                    reason += f" (found {', '.join(analysis.write_keywords)})"
+                span.set(action=GuardDecision.REJECT)
+                return GuardDecision(GuardDecision.REJECT, sql, reason)
+            if not self.enabled:
+                return GuardDecision(GuardDecision.ALLOW, sql)
+
+            estimate = self.estimate(analysis.sql)
+            cost, rows = estimate if estimate else (None, None)
+            over_budget = rows > self.row_budget if estimate else True
+            decision = GuardDecision(GuardDecision.ALLOW, sql, cost=cost, rows=rows)
+            if limit_rows and over_budget and (analysis.limit is None or analysis.limit > self.row_budget):
+                rewritten = self.rewrite(analysis, self.row_budget)
+                if rewritten != analysis.sql:
+                    reason = f"Limited to {self.row_budget:,} rows"
+                    if not estimate:
+                        reason += " because this database gives no row estimate"
+                    estimate = self.estimate(rewritten)
+                    cost, rows = estimate if estimate else (None, None)
+                    decision = GuardDecision(GuardDecision.REWRITE, rewritten, reason, cost=cost, rows=rows)
+
+            if cost is not None and cost > self.max_cost:
+                decision = GuardDecision(
+                    GuardDecision.REJECT, sql,
+                    f"Estimated cost {cost:,.0f} exceeds the budget of {self.max_cost:,.0f}; narrow the question",
+                    cost=cost, rows=rows
+                )
+            span.set(action=decision.action, cost=cost, estimated_rows=rows)
+            if decision.action != GuardDecision.ALLOW:
+                logging.info(f"Query guard {decision.action}: {decision.reason}")
+            return decision
+
+    def rewrite(self, analysis, limit):
+        """Cap the result at ``limit`` rows (and prune unused subquery columns with sqlglot)"""
+        if analysis.tree is not None and isinstance(analysis.tree, exp.Query):
+            tree = analysis.tree.copy()
+            if isinstance(tree, exp.Select) and (tree.args.get('with') or tree.find(exp.Subquery)):
+                tree = pushdown_projections(tree)
+            return tree.limit(limit).sql(dialect='postgres')
+
+        sql = analysis.sql
+        limit_index = _top_level_limit(analysis.tokens)
+        if limit_index is None:
+            return f"{sql} LIMIT {limit}"
+        tok, start = analysis.tokens[limit_index]
+        return sql[:start] + str(min(int(tok), limit)) + sql[start + len(tok):]
@@ -0,0 +1,99 @@
+import logging
+import pandas as pd
+
+from query_cache import estimate_size
+
+
+class StreamedResult:
+    """Iterator over DataFrame chunks of a query result with hard row and byte caps.
+
+    Iteration stops once ``max_rows`` rows or ``max_bytes`` bytes have been
+    yielded; ``truncated`` is set when rows were left unread. Chunks are
+    only held by the caller, so memory stays bounded by what it keeps.
+    ``on_close`` is called exactly once when the stream ends: with the
+    complete frame from ``to_frame``, or None when the result was
+    truncated, failed, abandoned or iterated chunk by chunk.
+    """
+
+    def __init__(self, chunks, max_rows=None, max_bytes=None, on_complete=None, on_close=None):
+        self._chunks = iter(chunks)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._on_complete = on_complete
+        self._on_close = on_close
+        self._collecting = False
+        self._started = False
+        self.truncated = False
+        self.finished = False
+        self.row_count = 0
+        self.byte_count = 0
+
+    def __iter__(self):
+        if self._started:
+            raise RuntimeError("StreamedResult can only be iterated once")
+        self._started = True
+        try:
+            for chunk in self._chunks:
+                if chunk.empty:
+                    continue
+
+                if self.max_rows is not None and self.row_count + len(chunk) > self.max_rows:
+                    chunk = chunk.iloc[:self.max_rows - self.row_count]
+                    self.truncated = True
+
+                size = estimate_size(chunk)
+                if self.max_bytes is not None and self.byte_count + size > self.max_bytes:
+                    remaining = self.max_bytes - self.byte_count
+                    keep = int(len(chunk) * remaining / size) if size else 0
+                    chunk = chunk.iloc[:max(keep, 0)]
+                    size = estimate_size(chunk)
+                    self.truncated = True
+
+                if not chunk.empty:
+                    self.row_count += len(chunk)
+                    self.byte_count += size
+                    yield chunk
+
+                if self.truncated:
+                    break
+
+                if self.max_rows is not None and self.row_count >= self.max_rows:
+                    # Exactly at the cap: only truncated if another row exists
+                    self.truncated = any(not extra.empty for extra in self._chunks)
+                    break
+            self.finished = True
+        finally:
+            close = getattr(self._chunks, 'close', None)
+            if close is not None:
+                close()
+            if not self._collecting:
+                self._close(None)
+
+        if self.truncated:
+            logging.info(f"Query result truncated at {self.row_count} rows / {self.byte_count} bytes")
+
+    def to_frame(self, on_chunk=None):
+        """Consume the stream and concatenate the chunks into one DataFrame.
+
+        ``on_chunk`` is called with each chunk as it arrives so callers can
+        render partial results while the rest is still loading.
+        """
+        self._collecting = True
+        try:
+            chunks = []
+            for chunk in self:
+                chunks.append(chunk)
+                if on_chunk is not None:
+                    on_chunk(chunk)
+            df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else (chunks[0] if chunks else pd.DataFrame())
+            if self._on_complete is not None and not self.truncated:
+                self._on_complete(df)
+            self._close(None if self.truncated else df)
+            return df
+        finally:
+            self._close(None)
+
+    def _close(self, df):
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close(df)
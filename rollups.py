@@ -0,0 +1,278 @@
+import os
+import sys
+import time
+import logging
+import threading
+from sqlalchemy import text
+
+ROLLUP_TABLES = ['sales_daily_rollup', 'sales_monthly_rollup']
+
+ROLLUP_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+        sale_date DATE NOT NULL,
+        region_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        total_revenue NUMERIC(18,2) NOT NULL,
+        total_forecast NUMERIC(18,2) NOT NULL,
+        units_sold BIGINT NOT NULL,
+        sale_count BIGINT NOT NULL,
+        PRIMARY KEY (sale_date, region_id, product_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sales_monthly_rollup (
+        month DATE NOT NULL,
+        region_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        total_revenue NUMERIC(18,2) NOT NULL,
+        total_forecast NUMERIC(18,2) NOT NULL,
+        units_sold BIGINT NOT NULL,
+        sale_count BIGINT NOT NULL,
+        PRIMARY KEY (month, region_id, product_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        rollup_name VARCHAR(64) PRIMARY KEY,
+        refreshed_at TIMESTAMP
+    )
+    """,
+    # Changes to sales_data not yet merged, as signed per-group deltas
+    """
+    CREATE TABLE IF NOT EXISTS rollup_pending (
+        sale_date DATE NOT NULL,
+        region_id INTEGER,
+        product_id INTEGER,
+        revenue NUMERIC(18,2) NOT NULL,
+        forecast NUMERIC(18,2) NOT NULL,
+        units_sold BIGINT NOT NULL,
+        sale_count BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sales_rollup_capture() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO rollup_pending (sale_date, region_id, product_id, revenue, forecast, units_sold, sale_count)
+            SELECT sale_date, region_id, product_id, SUM(revenue), SUM(forecast), SUM(units_sold), COUNT(*)
+            FROM new_rows GROUP BY sale_date, region_id, product_id;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            INSERT INTO rollup_pending (sale_date, region_id, product_id, revenue, forecast, units_sold, sale_count)
+            SELECT sale_date, region_id, product_id, -SUM(revenue), -SUM(forecast), -SUM(units_sold), -COUNT(*)
+            FROM old_rows GROUP BY sale_date, region_id, product_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """
+]
+
+# One statement-level trigger per event; transition tables allow only one event per trigger
+CAPTURE_TRIGGERS = {
+    'sales_rollup_insert': "AFTER INSERT ON sales_data REFERENCING NEW TABLE AS new_rows",
+    'sales_rollup_update': "AFTER UPDATE ON sales_data REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    'sales_rollup_delete': "AFTER DELETE ON sales_data REFERENCING OLD TABLE AS old_rows"
+}
+
+# Serializes refreshes across processes so a delta is never merged twice
+REFRESH_LOCK_ID = 740051
+
+# Takes the pending deltas committed so far; later commits stay for the next refresh
+TAKE_PENDING = """
+WITH taken AS (DELETE FROM rollup_pending RETURNING *)
+INSERT INTO rollup_delta
+SELECT sale_date, region_id, product_id, SUM(revenue), SUM(forecast), SUM(units_sold), SUM(sale_count)
+FROM taken
+GROUP BY sale_date, region_id, product_id
+"""
+
+MERGE_DAILY = """
+INSERT INTO sales_daily_rollup (sale_date, region_id, product_id, total_revenue, total_forecast, units_sold, sale_count)
+SELECT sale_date, region_id, product_id, revenue, forecast, units_sold, sale_count
+FROM rollup_delta
+ON CONFLICT (sale_date, region_id, product_id) DO UPDATE SET
+    total_revenue = sales_daily_rollup.total_revenue + EXCLUDED.total_revenue,
+    total_forecast = sales_daily_rollup.total_forecast + EXCLUDED.total_forecast,
+    units_sold = sales_daily_rollup.units_sold + EXCLUDED.units_sold,
+    sale_count = sales_daily_rollup.sale_count + EXCLUDED.sale_count
+"""
+
+FULL_DAILY = """
+INSERT INTO sales_daily_rollup (sale_date, region_id, product_id, total_revenue, total_forecast, units_sold, sale_count)
+SELECT sale_date, region_id, product_id, SUM(revenue), SUM(forecast), SUM(units_sold), COUNT(*)
+FROM sales_data
+GROUP BY sale_date, region_id, product_id
+"""
+
+# Months touched by the delta are rebuilt from the (already merged) daily rollup
+REBUILD_MONTHS = """
+INSERT INTO sales_monthly_rollup (month, region_id, product_id, total_revenue, total_forecast, units_sold, sale_count)
+SELECT DATE_TRUNC('month', sale_date)::date, region_id, product_id,
+       SUM(total_revenue), SUM(total_forecast), SUM(units_sold), SUM(sale_count)
+FROM sales_daily_rollup
+WHERE DATE_TRUNC('month', sale_date) IN (SELECT DISTINCT DATE_TRUNC('month', sale_date) FROM rollup_delta)
+GROUP BY DATE_TRUNC('month', sale_date), region_id, product_id
+"""
+
+FRESHNESS_QUERY = """
+SELECT NOT EXISTS (SELECT 1 FROM rollup_pending) AS caught_up,
+       EXTRACT(EPOCH FROM LOCALTIMESTAMP - refreshed_at) AS age
+FROM rollup_state WHERE rollup_name = 'sales_daily_rollup'
+"""
+
+
+class RollupManager:
+    """Maintains pre-aggregated sales rollups that SQLAgent can route to.
+
+    ``sales_daily_rollup`` holds one row per day x region x product and
+    ``sales_monthly_rollup`` is derived from it. Statement-level triggers
+    on ``sales_data`` record every insert, update and delete as signed
+    per-group deltas in ``rollup_pending``; a delta only becomes visible
+    when its transaction commits, so refreshes see every change whatever
+    order transactions commit in, and their cost scales with the changes.
+
+    SQLAgent asks ``is_current()`` before routing a question to the
+    rollups: they are used while nothing is pending or the last refresh is
+    at most ``max_staleness`` seconds old, and with ``refresh_on_demand``
+    a stale rollup is refreshed first (this needs write access).
+    """
+
+    def __init__(self, db, max_staleness=None, refresh_on_demand=None, check_interval=None):
+        self.db = db
+        self.max_staleness = max_staleness if max_staleness is not None else float(os.getenv('ROLLUP_MAX_STALENESS', '60'))
+        if refresh_on_demand is None:
+            refresh_on_demand = os.getenv('ROLLUP_REFRESH_ON_DEMAND', 'false').lower() == 'true'
+        self.refresh_on_demand = refresh_on_demand
+        self.check_interval = check_interval if check_interval is not None else float(os.getenv('ROLLUP_CHECK_INTERVAL', '5'))
+        self._checked_at = None
+        self._current = False
+        self._lock = threading.Lock()
+
+    def create_tables(self):
+        with self.db.engine.begin() as conn:
+            for ddl in ROLLUP_DDL:
+                conn.execute(text(ddl))
+            for name, timing in CAPTURE_TRIGGERS.items():
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {name} ON sales_data"))
+                conn.execute(text(
+                    f"CREATE TRIGGER {name} {timing} FOR EACH STATEMENT EXECUTE FUNCTION sales_rollup_capture()"
+                ))
+            conn.execute(text(
+                "INSERT INTO rollup_state (rollup_name) VALUES ('sales_daily_rollup') ON CONFLICT DO NOTHING"
+            ))
+        logging.info("Rollup tables and change capture created")
+
+    def refresh(self):
+        """Merge the changes captured since the last refresh into the rollups"""
+        with self.db.engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {'id': REFRESH_LOCK_ID})
+            conn.execute(text("CREATE TEMP TABLE rollup_delta (LIKE rollup_pending) ON COMMIT DROP"))
+            groups = conn.execute(text(TAKE_PENDING)).rowcount
+            if groups:
+                conn.execute(text(MERGE_DAILY))
+                self._rebuild_months(conn)
+            conn.execute(text(
+                "UPDATE rollup_state SET refreshed_at = LOCALTIMESTAMP WHERE rollup_name = 'sales_daily_rollup'"
+            ))
+
+        with self._lock:
+            self._checked_at = None
+        if groups:
+            for table in ROLLUP_TABLES:
+                self.db.invalidate_table(table)
+        logging.info(f"Rollups refreshed: {groups} changed daily groups merged")
+        return groups
+
+    def rebuild(self):
+        """Recompute the rollups from scratch"""
+        with self.db.engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {'id': REFRESH_LOCK_ID})
+            # Truncating rollup_pending waits for writers holding uncommitted deltas; once it
+            # has, the full aggregate below sees their rows and later deltas start from empty
+            conn.execute(text("TRUNCATE sales_daily_rollup, sales_monthly_rollup, rollup_pending"))
+            groups = conn.execute(text(FULL_DAILY)).rowcount
+            conn.execute(text("CREATE TEMP TABLE rollup_delta ON COMMIT DROP AS "
+                              "SELECT DISTINCT DATE_TRUNC('month', sale_date)::date AS sale_date FROM sales_daily_rollup"))
+            self._rebuild_months(conn)
+            conn.execute(text(
+                "UPDATE rollup_state SET refreshed_at = LOCALTIMESTAMP WHERE rollup_name = 'sales_daily_rollup'"
+            ))
+
+        with self._lock:
+            self._checked_at = None
+        for table in ROLLUP_TABLES:
+            self.db.invalidate_table(table)
+        logging.info(f"Rollups rebuilt: {groups} daily groups")
+        return groups
+
+    def _rebuild_months(self, conn):
+        # Deleted first so groups whose daily rows all cancelled out disappear too
+        conn.execute(text("DELETE FROM sales_daily_rollup WHERE sale_count = 0"))
+        conn.execute(text(
+            "DELETE FROM sales_monthly_rollup WHERE month IN "
+            "(SELECT DISTINCT DATE_TRUNC('month', sale_date)::date FROM rollup_delta)"
+        ))
+        conn.execute(text(REBUILD_MONTHS))
+
+    def is_current(self):
+        """Whether the rollups may answer queries now; re-checked every ``check_interval`` seconds"""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return self._current
+            self._checked_at = now
+            try:
+                with self.db.engine.connect() as conn:
+                    row = conn.execute(text(FRESHNESS_QUERY)).one_or_none()
+            except Exception as e:
+                logging.warning(f"Could not read rollup freshness, querying sales_data instead: {e}")
+                self._current = False
+                return False
+            caught_up = row is not None and row.caught_up
+            fresh = row is not None and row.age is not None and float(row.age) <= self.max_staleness
+            self._current = bool(caught_up or fresh)
+        if not self._current and self.refresh_on_demand:
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f"On-demand rollup refresh failed, querying sales_data instead: {e}")
+                return False
+            with self._lock:
+                self._current, self._checked_at = True, time.monotonic()
+        return self._current
+
+    def get_state(self):
+        df, error = self.db.execute_query(
+            "SELECT rollup_name, refreshed_at, (SELECT COUNT(*) FROM rollup_pending) AS pending_groups "
+            "FROM rollup_state", use_cache=False
+        )
+        if error:
+            return None
+        return df.to_dict('records')
+
+
+def main(argv):
+    from database import DatabaseManager
+
+    command = argv[1] if len(argv) > 1 else 'refresh'
+    db = DatabaseManager(backend='postgres')
+    if db.mock_mode:
+        sys.exit("DATABASE_URL is required to maintain rollups")
+
+    manager = RollupManager(db)
+    if command == 'create':
+        manager.create_tables()
+        manager.rebuild()
+    elif command == 'refresh':
+        manager.refresh()
+    elif command == 'rebuild':
+        manager.rebuild()
+    else:
+        sys.exit(f"Unknown command: {command} (expected create, refresh or rebuild)")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv)
@@ -0,0 +1,163 @@
+import re
+import math
+import time
+import zlib
+import logging
+import numpy as np
+
+from intent_router import tokenize
+
+
+def identifier_tokens(name):
+    """Split snake_case / camelCase identifiers into the same tokens questions use"""
+    spaced = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', name).replace('_', ' ')
+    return tokenize(spaced)
+
+
+class HashingEmbedder:
+    """Local, dependency-free text embedding from hashed character trigrams"""
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+
+    def __call__(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions))
+        for row, text in enumerate(texts):
+            padded = f"  {text.lower()} "
+            for i in range(len(padded) - 2):
+                vectors[row, zlib.crc32(padded[i:i + 3].encode()) % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class SchemaIndex:
+    """Picks the tables relevant to a question so prompts stay small on wide schemas.
+
+    Tables are scored by IDF-weighted overlap between question tokens and
+    their table/column name tokens (table names count double), optionally
+    blended with cosine similarity from a local ``embedder``. The best
+    tables are then expanded along foreign keys so join partners are
+    included.
+    """
+
+    TABLE_NAME_WEIGHT = 2.0
+
+    def __init__(self, schema_info, foreign_keys=None, embedder=None, embedding_weight=0.5, min_relative_score=0.35):
+        self.schema_info = schema_info
+        self.min_relative_score = min_relative_score
+        self.foreign_keys = foreign_keys or []
+        self.embedder = embedder
+        self.embedding_weight = embedding_weight
+
+        t0 = time.perf_counter()
+        self.tables = list(schema_info)
+        self._neighbors = {table: set() for table in self.tables}
+        for fk in self.foreign_keys:
+            if fk['table'] in self._neighbors and fk['ref_table'] in self._neighbors:
+                self._neighbors[fk['table']].add(fk['ref_table'])
+                self._neighbors[fk['ref_table']].add(fk['table'])
+
+        self._table_tokens = {}
+        document_frequency = {}
+        for table, columns in schema_info.items():
+            weights = {}
+            for token in identifier_tokens(table):
+                weights[token] = max(weights.get(token, 0), self.TABLE_NAME_WEIGHT)
+            for col in columns:
+                for token in identifier_tokens(col['column']):
+                    weights.setdefault(token, 1.0)
+            self._table_tokens[table] = weights
+            for token in weights:
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+
+        table_count = max(len(self.tables), 1)
+        self._idf = {token: math.log(1 + table_count / df) for token, df in document_frequency.items()}
+
+        self._embeddings = None
+        if self.embedder is not None and self.tables:
+            self._embeddings = self.embedder([self._describe(table) for table in self.tables])
+        self.build_seconds = time.perf_counter() - t0
+        self.full_context_chars = sum(
+            len(f"Table: {table}\n\n") + sum(len(f" - {col['column']} ({col['type']})\n") for col in columns)
+            for table, columns in schema_info.items()
+        )
+
+    def _describe(self, table):
+        columns = ' '.join(col['column'] for col in self.schema_info[table])
+        return f"{table.replace('_', ' ')} {columns.replace('_', ' ')}"
+
+    def rank_tables(self, question):
+        """Return (table, score) pairs for tables with a positive relevance score"""
+        # Bare numbers ('top 5') say nothing about which tables are relevant
+        question_tokens = {token for token in tokenize(question.replace('_', ' ')) if not token.isdigit()}
+        scores = {}
+        for table, weights in self._table_tokens.items():
+            score = sum(weights[token] * self._idf[token] for token in question_tokens if token in weights)
+            if score:
+                scores[table] = score
+
+        if self._embeddings is not None:
+            similarity = self._embeddings @ self.embedder([question])[0]
+            top_lexical = max(scores.values()) if scores else 1.0
+            for table, sim in zip(self.tables, similarity):
+                if sim > 0:
+                    scores[table] = scores.get(table, 0.0) + self.embedding_weight * top_lexical * float(sim)
+
+        if not scores:
+            return []
+        # Drop weak matches relative to the best table
+        cutoff = self.min_relative_score * max(scores.values())
+        ranked = [(table, score) for table, score in scores.items() if score >= cutoff]
+        return sorted(ranked, key=lambda item: item[1], reverse=True)
+
+    def select_tables(self, question, max_tables=8):
+        if len(self.tables) <= max_tables:
+            return list(self.tables)
+
+        ranked = [table for table, _ in self.rank_tables(question)]
+        if not ranked:
+            # Nothing matched: fall back to the best-connected tables
+            ranked = sorted(self.tables, key=lambda table: len(self._neighbors[table]), reverse=True)
+
+        selected = []
+        for table in ranked:
+            if len(selected) >= max_tables:
+                break
+            if table not in selected:
+                selected.append(table)
+            # Pull in join partners so the model can write the joins
+            for neighbor in sorted(self._neighbors[table]):
+                if len(selected) < max_tables and neighbor not in selected:
+                    selected.append(neighbor)
+        return selected
+
+    def build_context(self, question, max_tables=8):
+        """Return (schema context string, stats) limited to the relevant tables"""
+        t0 = time.perf_counter()
+        tables = self.select_tables(question, max_tables)
+        context = "Database Schema:\n\n"
+        for table in tables:
+            context += f"Table: {table}\n"
+            for col in self.schema_info[table]:
+                context += f" - {col['column']} ({col['type']})\n"
+            context += "\n"
+
+        relationships = [fk for fk in self.foreign_keys if fk['table'] in tables and fk['ref_table'] in tables]
+        if relationships:
+            context += "Relationships:\n"
+            for fk in relationships:
+                context += f" - {fk['table']}.{fk['column']} -> {fk['ref_table']}.{fk['ref_column']}\n"
+            context += "\n"
+
+        stats = {
+            'tables': len(tables),
+            'total_tables': len(self.tables),
+            'chars': len(context),
+            'full_chars': self.full_context_chars,
+            'build_ms': (time.perf_counter() - t0) * 1000
+        }
+        logging.info(
+            f"Schema context: {stats['tables']}/{stats['total_tables']} tables, "
+            f"{stats['chars']}/{stats['full_chars']} chars, built in {stats['build_ms']:.2f}ms"
+        )
+        return context, stats
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import hashlib
+import logging
+
+COLUMNS_QUERY = """
+SELECT
+    table_name,
+    column_name,
+    data_type,
+    is_nullable
+FROM information_schema.columns
+WHERE table_schema = 'public'{table_filter}
+ORDER BY table_name, ordinal_position;
+"""
+
+# One row per table from pg_catalog; far cheaper than reading every column
+# through information_schema and enough to detect added/altered tables.
+# Partitions are left out: queries go through the partitioned parent.
+FINGERPRINT_QUERY = """
+SELECT
+    c.relname AS table_name,
+    md5(string_agg(a.attname || ':' || format_type(a.atttypid, a.atttypmod), ',' ORDER BY a.attnum)) AS fingerprint
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p', 'v', 'm', 'f') AND NOT c.relispartition
+GROUP BY c.relname;
+"""
+
+
+def build_schema_mapping(df):
+    """Turn an information_schema.columns frame into {table: [{'column', 'type'}, ...]}"""
+    columns = df.rename(columns={'column_name': 'column', 'data_type': 'type'})
+    grouped = columns.groupby('table_name', sort=False)[['column', 'type']]
+    return {table: group.to_dict('records') for table, group in grouped}
+
+
+def connection_target(engine):
+    """Hash of the database URL without its password, so a snapshot is only reused for the same database"""
+    url = engine.url.render_as_string(hide_password=True)
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+
+
+def combine_fingerprints(table_fingerprints):
+    joined = ','.join(f"{table}={table_fingerprints[table]}" for table in sorted(table_fingerprints))
+    return hashlib.sha256(joined.encode('utf-8')).hexdigest()
+
+
+class SchemaSnapshot:
+    """Disk-persisted schema mapping that is refreshed incrementally.
+
+    The snapshot stores the mapping plus a per-table catalog fingerprint.
+    Within ``max_age`` seconds the file is trusted as-is; after that one
+    fingerprint query decides which tables changed, and only those are
+    re-read from information_schema. A snapshot file written for another
+    database (``connection_target``) is ignored.
+    """
+
+    def __init__(self, db, path, max_age=300):
+        self.db = db
+        self.path = path
+        self.max_age = max_age
+        self.target = connection_target(db.engine)
+        self.schema = None
+        self.table_fingerprints = {}
+        self.fingerprint = None
+        self.saved_at = 0.0
+
+    def load(self):
+        """Load the snapshot file; returns False when missing or unreadable"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('target') != self.target:
+                logging.info(f"Ignoring schema snapshot {self.path}: it was taken from another database")
+                return False
+            self.schema = data['schema']
+            self.table_fingerprints = data['table_fingerprints']
+            self.fingerprint = data['fingerprint']
+            self.saved_at = data['saved_at']
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable schema snapshot {self.path}: {e}")
+            return False
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'target': self.target,
+                'fingerprint': self.fingerprint,
+                'table_fingerprints': self.table_fingerprints,
+                'schema': self.schema,
+                'saved_at': self.saved_at
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self):
+        """Return the schema mapping, refreshing from the catalog only when needed"""
+        loaded = self.schema is not None or self.load()
+        if loaded and time.time() - self.saved_at <= self.max_age:
+            return self.schema
+        return self.refresh()
+
+    def refresh(self):
+        """Compare catalog fingerprints and re-read only tables that changed"""
+        t0 = time.perf_counter()
+        df, error = self.db.execute_query(FINGERPRINT_QUERY, use_cache=False)
+        if error:
+            raise RuntimeError(error)
+        current = dict(zip(df['table_name'], df['fingerprint']))
+
+        if self.schema is None:
+            changed = set(current)
+            schema = {}
+        else:
+            changed = {table for table, fp in current.items() if self.table_fingerprints.get(table) != fp}
+            schema = {table: cols for table, cols in self.schema.items() if table in current}
+
+        if changed:
+            table_list = ', '.join("'" + table.replace("'", "''") + "'" for table in sorted(changed))
+            table_filter = '' if self.schema is None else f" AND table_name IN ({table_list})"
+            columns_df, error = self.db.execute_query(COLUMNS_QUERY.format(table_filter=table_filter), use_cache=False)
+            if error:
+                raise RuntimeError(error)
+            schema.update(build_schema_mapping(columns_df[columns_df['table_name'].isin(current)]))
+
+        removed = set(self.schema or {}) - set(current)
+        self.schema = schema
+        self.table_fingerprints = current
+        self.fingerprint = combine_fingerprints(current)
+        self.saved_at = time.time()
+        try:
+            self.save()
+        except OSError as e:
+            logging.warning(f"Could not persist schema snapshot to {self.path}: {e}")
+
+        logging.info(
+            f"Schema snapshot refreshed in {(time.perf_counter() - t0) * 1000:.1f}ms: "
+            f"{len(changed)} tables re-read, {len(removed)} removed, {len(schema)} total"
+        )
+        return self.schema
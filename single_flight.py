@@ -0,0 +1,103 @@
+import threading
+
+from tracing import tracer
+
+
+class Flight:
+    """One in-flight computation that concurrent callers of the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapses concurrent identical calls into one execution.
+
+    The first caller of a key becomes the leader and runs the work; callers
+    arriving while it is in flight wait for it and share its result (or its
+    error) instead of repeating it. Nothing is kept after the flight lands,
+    so this complements rather than replaces a result cache. Executions and
+    collapsed duplicates are counted per ``name`` in the tracer metrics as
+    ``chatbot_singleflight_executions_total`` and
+    ``chatbot_singleflight_collapsed_total``.
+    """
+
+    def __init__(self, name, metrics=None):
+        self.name = name
+        self.metrics = metrics or tracer.metrics
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.collapsed = 0
+
+    def join(self, key):
+        """Return (flight, leader); the leader must call finish() exactly once"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight()
+                self.executions += 1
+                leader = True
+            else:
+                flight.waiters += 1
+                self.collapsed += 1
+                leader = False
+        self.metrics.count('singleflight_executions' if leader else 'singleflight_collapsed', self.name)
+        return flight, leader
+
+    def finish(self, key, flight, result=None, error=None):
+        """Publish the leader's outcome; result and error both None tell waiters to run the work themselves"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = result
+        flight.error = error
+        flight.done.set()
+
+    def wait(self, key, flight, timeout=None):
+        """Wait for the leader; returns (result, error), both None if there is nothing to share.
+
+        A flight still running after ``timeout`` seconds is detached from its
+        key, so a leader that never finishes cannot stall later callers; the
+        other waiters keep waiting on it until their own timeouts.
+        """
+        if not flight.done.wait(timeout):
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            return None, None
+        return flight.result, flight.error
+
+    def do(self, key, fn, *args, wait_timeout=None, **kwargs):
+        """Run ``fn`` once per concurrent ``key``; returns (result, shared).
+
+        Waiters re-raise the leader's exception; a None result, or no result
+        within ``wait_timeout`` seconds, is not shared, so waiters then run
+        ``fn`` themselves.
+        """
+        flight, leader = self.join(key)
+        if not leader:
+            result, error = self.wait(key, flight, wait_timeout)
+            if error is not None:
+                raise error
+            if result is not None:
+                return result, True
+            return fn(*args, **kwargs), False
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        except BaseException:
+            self.finish(key, flight)
+            raise
+        self.finish(key, flight, result=result)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._flights)
+        return {'executions': self.executions, 'collapsed': self.collapsed, 'in_flight': in_flight}
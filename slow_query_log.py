@@ -0,0 +1,72 @@
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from query_cache import normalize_sql
+from query_guard import QueryAnalysis
+
+
+class SlowQueryLog:
+    """JSONL log of queries slower than ``threshold_ms``, with their plans.
+
+    On PostgreSQL the plan comes from ``EXPLAIN (ANALYZE, BUFFERS)``, which
+    runs the query a second time, so plans are captured on a background
+    thread, only for read-only statements, and at most once per normalized
+    query every ``cooldown`` seconds.
+    """
+
+    def __init__(self, db, path=None, threshold_ms=None, cooldown=None):
+        self.db = db
+        self.path = path if path is not None else os.getenv('SLOW_QUERY_LOG', 'slow_queries.jsonl')
+        self.threshold_ms = threshold_ms if threshold_ms is not None else float(os.getenv('SLOW_QUERY_MS', '1000'))
+        self.cooldown = cooldown if cooldown is not None else float(os.getenv('SLOW_QUERY_COOLDOWN', '600'))
+        self._last_logged = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def record(self, query, seconds, rows=None):
+        """Queue a slow query for logging; returns True when it was queued"""
+        if not self.path or seconds * 1000 < self.threshold_ms:
+            return False
+        key = normalize_sql(query)
+        if key.startswith('explain'):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_logged.get(key, -self.cooldown) < self.cooldown:
+                return False
+            self._last_logged[key] = now
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query')
+        self._executor.submit(self._write, query, seconds, rows)
+        return True
+
+    def _write(self, query, seconds, rows):
+        plan = None
+        # EXPLAIN ANALYZE executes the statement, so only single read-only ones are replayed
+        if self.db.engine.dialect.name == 'postgresql' and QueryAnalysis(query).read_only:
+            df, error = self.db.execute_query(f"EXPLAIN (ANALYZE, BUFFERS) {query.strip().rstrip(';')}", use_cache=False)
+            plan = '\n'.join(df.iloc[:, 0].astype(str)) if error is None else f"EXPLAIN failed: {error}"
+        entry = {
+            'timestamp': time.time(),
+            'duration_ms': round(seconds * 1000, 1),
+            'rows': rows,
+            'sql': query,
+            'plan': plan
+        }
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        except OSError as e:
+            logging.error(f"Could not write slow query log {self.path}: {e}")
+            return
+        logging.warning(f"Slow query ({entry['duration_ms']:.0f}ms) logged to {self.path}")
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -1,12 +1,120 @@
 import os
 from dotenv import load_dotenv
 
+from rollups import ROLLUP_TABLES
+from intent_router import IntentRouter
+from translation_cache import TranslationCache, schema_fingerprint
+from schema_index import SchemaIndex, HashingEmbedder
+from tracing import tracer
+from query_guard import QueryAnalysis
+
 load_dotenv()
 
+# Fact sources a query template can read from. Rollups (see rollups.py)
+# store pre-summed measures under different column names.
+SOURCES = {
+    'sales_data': {'fact': 'sales_data', 'date': 'sale_date', 'month': "DATE_TRUNC('month', s.sale_date)",
+                   'revenue': 'revenue', 'forecast': 'forecast', 'units': 'units_sold'},
+    'sales_daily_rollup': {'fact': 'sales_daily_rollup', 'date': 'sale_date', 'month': "DATE_TRUNC('month', s.sale_date)",
+                           'revenue': 'total_revenue', 'forecast': 'total_forecast', 'units': 'units_sold'},
+    'sales_monthly_rollup': {'fact': 'sales_monthly_rollup', 'date': 'month', 'month': 's.month',
+                             'revenue': 'total_revenue', 'forecast': 'total_forecast', 'units': 'units_sold'}
+}
+
+# name: (example phrasings, default parameters, SQL template, can use rollups)
+INTENTS = {
+    'revenue_by_region': (
+        ["revenue by region", "sales by region", "regional revenue", "which region has the best performance",
+         "compare regions", "region breakdown", "top regions"],
+        {},
+        "SELECT region_name, SUM(s.{revenue}) as total_revenue FROM {fact} s JOIN regions r ON s.region_id = r.region_id{where} GROUP BY region_name ORDER BY total_revenue DESC{limit};",
+        True
+    ),
+    'top_products': (
+        ["top products by sales", "best selling products", "top products by revenue", "product ranking",
+         "revenue by product", "highest revenue products", "products by total revenue"],
+        {'limit': 5},
+        "SELECT product_name, SUM(s.{revenue}) as total_revenue FROM {fact} s JOIN products p ON s.product_id = p.product_id{where} GROUP BY product_name ORDER BY total_revenue DESC{limit};",
+        True
+    ),
+    'products_above_average': (
+        ["products with revenue above average", "products above average revenue", "above average products",
+         "products performing above average", "products with above average sales"],
+        {},
+        "SELECT product_name, SUM(s.{revenue}) as total_revenue FROM {fact} s JOIN products p ON s.product_id = p.product_id{where} GROUP BY product_name HAVING SUM(s.{revenue}) > (SELECT AVG(product_revenue) FROM (SELECT SUM(s.{revenue}) as product_revenue FROM {fact} s{where} GROUP BY s.product_id) product_totals) ORDER BY total_revenue DESC{limit};",
+        True
+    ),
+    'monthly_trends': (
+        ["monthly sales trends", "monthly revenue", "sales trend over time", "revenue per month",
+         "month by month sales", "sales trends", "revenue trends"],
+        {},
+        "SELECT {month} as month, SUM(s.{revenue}) as monthly_revenue FROM {fact} s{where} GROUP BY {month} ORDER BY month{limit};",
+        True
+    ),
+    'actual_vs_forecast': (
+        ["actual vs forecast revenue", "compare actual and forecast", "forecast accuracy",
+         "revenue against forecast", "forecast variance", "total sales", "total revenue"],
+        {},
+        "SELECT SUM(s.{revenue}) as actual_revenue, SUM(s.{forecast}) as forecast_revenue, SUM(s.{revenue}) - SUM(s.{forecast}) as variance FROM {fact} s{where}{limit};",
+        True
+    ),
+    'category_revenue': (
+        ["revenue by category", "sales by category", "product category performance", "category breakdown",
+         "revenue by product category", "sales by product category", "category revenue"],
+        {},
+        "SELECT category, SUM(s.{revenue}) as category_revenue FROM {fact} s JOIN products p ON s.product_id = p.product_id{where} GROUP BY category ORDER BY category_revenue DESC{limit};",
+        True
+    )
+}
+
+# Row-level fallback for questions no intent matches; always reads sales_data
+DEFAULT_QUERY = "SELECT region_name, s.revenue as total_revenue, units_sold FROM sales_data s JOIN regions r ON s.region_id = r.region_id{where}{limit};"
+DEFAULT_LIMIT = 10
+
+# Regions seeded by database_setup.sql; more can be passed to SQLAgent
+DEFAULT_REGIONS = ['North America', 'Europe', 'Asia Pacific', 'Latin America']
+
+
+def reads_rollups(sql):
+    return any(f"FROM {table} " in sql for table in ROLLUP_TABLES)
+
 class SQLAgent:
-    def __init__(self, schema_info):
+    def __init__(self, schema_info, use_rollups=None, regions=None, translator=None, translation_cache=None,
+                 foreign_keys=None, intent_tables=None, rollups=None):
         self.schema_info = schema_info
         self.schema_context = self._build_schema_context()
+        self.schema_hash = schema_fingerprint(self.schema_context)
+        
+        # Per-question schema pruning for translator prompts on wide schemas
+        embedder = HashingEmbedder() if os.getenv('SCHEMA_EMBEDDINGS', 'false').lower() == 'true' else None
+        self.schema_index = SchemaIndex(schema_info, foreign_keys, embedder=embedder)
+        self.max_context_tables = int(os.getenv('SCHEMA_CONTEXT_MAX_TABLES', '8'))
+        self.last_context_stats = None
+        
+        # Optional model-backed translator: callable(question, schema_context) -> SQL.
+        # Without one, questions are answered by the intent router below.
+        self.translator = translator
+        if translation_cache is None and os.getenv('TRANSLATION_CACHE_PATH'):
+            translation_cache = TranslationCache(
+                os.getenv('TRANSLATION_CACHE_PATH'),
+                protected_terms=regions or DEFAULT_REGIONS
+            )
+        self.translation_cache = translation_cache
+        
+        # Route to rollups only when they have been created in this database, and
+        # per question only while ``rollups`` (a RollupManager) reports them current
+        rollups_present = all(table in schema_info for table in ROLLUP_TABLES)
+        if use_rollups is None:
+            use_rollups = os.getenv('USE_ROLLUPS', 'true').lower() == 'true'
+        self.use_rollups = use_rollups and rollups_present and rollups is not None
+        self.rollups = rollups
+        
+        self.router = IntentRouter(regions=regions or DEFAULT_REGIONS)
+        for name, (phrases, defaults, _, _) in INTENTS.items():
+            self.router.register(name, phrases, defaults)
+        # Prebuilt tables from the warm-up artifact (see warmup.py) skip the index build
+        if not self.router.load_tables(intent_tables):
+            self.router.build()
 
     def _build_schema_context(self):
         context = "Database Schema:\n\n"
@@ -18,37 +126,80 @@ class SQLAgent:
         return context
 
     def natural_language_to_sql(self, user_query):
-        """Convert natural language to SQL query - Demo version with predefined queries"""
-        query_lower = user_query.lower()
-        
-        # Predefined SQL queries for common questions
-        if "revenue by region" in query_lower:
-            return "SELECT region_name, SUM(total_revenue) as total_revenue FROM sales_data s JOIN regions r ON s.region_id = r.region_id GROUP BY region_name ORDER BY total_revenue DESC;"
-        
-        elif "top" in query_lower and ("product" in query_lower or "5" in query_lower):
-            return "SELECT product_name, SUM(total_revenue) as total_revenue FROM sales_data s JOIN products p ON s.product_id = p.product_id GROUP BY product_name ORDER BY total_revenue DESC LIMIT 5;"
-        
-        elif "monthly" in query_lower and ("trend" in query_lower or "sales" in query_lower):
-            return "SELECT DATE_TRUNC('month', sale_date) as month, SUM(total_revenue) as monthly_revenue FROM sales_data GROUP BY DATE_TRUNC('month', sale_date) ORDER BY month;"
+        """Convert natural language to SQL query, consulting the translation cache first"""
+        with tracer.span('sql_agent.translate') as span:
+            cache = self.translation_cache
+            if cache is not None and cache.is_cacheable(user_query):
+                cached_sql = cache.get(user_query, self.schema_hash)
+                if cached_sql is not None and not reads_rollups(cached_sql):
+                    span.set(cache_hit=True)
+                    return cached_sql
+                sql = self._translate(user_query)
+                # Whether a rollup may answer is decided per question, so those translations are not kept
+                if not reads_rollups(sql):
+                    cache.put(user_query, self.schema_hash, sql)
+                return sql
+            return self._translate(user_query)
+
+    def build_schema_context(self, user_query):
+        """Schema context limited to the tables relevant to the question"""
+        context, stats = self.schema_index.build_context(user_query, self.max_context_tables)
+        self.last_context_stats = stats
+        return context
+
+    def _translate(self, user_query):
+        if self.translator is not None:
+            return self.translator(user_query, self.build_schema_context(user_query))
+        return self._route_to_sql(user_query)
+
+    def _route_to_sql(self, user_query):
+        """Demo translation: match a predefined intent and render its SQL template"""
+        match = self.router.match(user_query)
+        params = match.params
+        span = tracer.current()
+        if span is not None:
+            span.set(intent=match.name, score=round(float(match.score), 3))
         
-        elif "actual" in query_lower and "forecast" in query_lower:
-            return "SELECT SUM(total_revenue) as actual_revenue, SUM(forecast) as forecast_revenue, SUM(total_revenue) - SUM(forecast) as variance FROM sales_data;"
+        if match.intent is None:
+            params.setdefault('limit', DEFAULT_LIMIT)
+            return self._render(DEFAULT_QUERY, SOURCES['sales_data'], params)
         
-        elif "category" in query_lower:
-            return "SELECT category, SUM(total_revenue) as category_revenue FROM sales_data s JOIN products p ON s.product_id = p.product_id GROUP BY category ORDER BY category_revenue DESC;"
+        _, _, template, rollup_capable = INTENTS[match.name]
+        return self._render(template, self._choose_source(rollup_capable, params), params)
+
+    def match_intent(self, user_query):
+        """Return the IntentMatch (intent, score, extracted parameters) for a question"""
+        return self.router.match(user_query)
+
+    def _choose_source(self, rollup_capable, params):
+        """Pick the smallest fact source that can answer at the requested date grain"""
+        if not (self.use_rollups and rollup_capable and self.rollups.is_current()):
+            return SOURCES['sales_data']
+        start, end = params.get('start_date'), params.get('end_date')
+        if start is None or (start.day == 1 and end.day == 1):
+            return SOURCES['sales_monthly_rollup']
+        return SOURCES['sales_daily_rollup']
+
+    def _render(self, template, source, params):
+        conditions = []
+        if 'region' in params:
+            region = params['region'].replace("'", "''")
+            conditions.append(f"s.region_id IN (SELECT region_id FROM regions WHERE region_name = '{region}')")
+        if 'start_date' in params:
+            conditions.append(f"s.{source['date']} >= '{params['start_date'].isoformat()}'")
+            conditions.append(f"s.{source['date']} < '{params['end_date'].isoformat()}'")
         
-        else:
-            # Default query for any other question
-            return "SELECT region_name, total_revenue, units_sold FROM sales_data s JOIN regions r ON s.region_id = r.region_id LIMIT 10;"
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+        limit = f" LIMIT {int(params['limit'])}" if 'limit' in params else ""
+        return template.format(where=where, limit=limit, **source)
 
     def validate_sql_safety(self, sql_query):
-        """Validate SQL for safety"""
-        dangerous_ops = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER']
-        sql_upper = sql_query.upper()
-        
-        for op in dangerous_ops:
-            if op in sql_upper:
-                return False, f"Dangerous operation: {op}"
+        """Validate SQL for safety; keywords count only as whole words outside literals and quoted names"""
+        analysis = QueryAnalysis(sql_query)
+        if analysis.write_keywords:
+            return False, f"Dangerous operation: {analysis.write_keywords[0]}"
+        if analysis.statements > 1:
+            return False, "Multiple statements are not allowed"
         
         return True, "Safe query"
 
@@ -0,0 +1,99 @@
+import pandas as pd
+import pytest
+
+from drilldown import DrillDown
+
+REGIONS = ['North America', 'Europe', 'Asia Pacific', 'Latin America', 'Middle East']
+REGION_SQL = ("SELECT region_name, SUM(s.revenue) as total_revenue FROM sales_data s "
+              "JOIN regions r ON s.region_id = r.region_id GROUP BY region_name ORDER BY total_revenue DESC;")
+PRODUCT_SQL = ("SELECT product_name, category, SUM(s.revenue) as total_revenue FROM sales_data s "
+               "JOIN products p ON s.product_id = p.product_id GROUP BY product_name, category;")
+
+
+def region_frame():
+    return pd.DataFrame({
+        'region_name': ['North America', 'Europe', 'Asia Pacific', 'Latin America'],
+        'total_revenue': [400000.0, 250000.0, 150000.0, 50000.0]
+    })
+
+
+@pytest.fixture
+def drilldown():
+    drilldown = DrillDown()
+    drilldown.remember('s1', "Show me revenue by region", REGION_SQL, region_frame())
+    return drilldown
+
+
+def answer(drilldown, follow_up):
+    return drilldown.answer('s1', follow_up, REGIONS)
+
+
+def test_include_region(drilldown):
+    result = answer(drilldown, "only Europe")
+    assert result.df['region_name'].tolist() == ['Europe']
+    assert result.steps == ['region_name = Europe']
+    assert result.question == "Show me revenue by region only Europe"
+
+
+def test_exclude_region_list(drilldown):
+    result = answer(drilldown, "excluding Asia Pacific and Latin America")
+    assert result.df['region_name'].tolist() == ['North America', 'Europe']
+    assert result.steps == ['region_name not in (Asia Pacific, Latin America)']
+
+
+def test_top_n_of_those(drilldown):
+    result = answer(drilldown, "top 3 of those")
+    assert result.df['region_name'].tolist() == ['North America', 'Europe', 'Asia Pacific']
+    assert result.limited
+
+
+@pytest.mark.parametrize('follow_up, regions', [
+    ("above 100k", ['North America', 'Europe', 'Asia Pacific']),
+    ("revenue below 50,001", ['Latin America']),
+    ("at least 0.25m", ['North America', 'Europe']),
+])
+def test_threshold(drilldown, follow_up, regions):
+    assert answer(drilldown, follow_up).df['region_name'].tolist() == regions
+
+
+@pytest.mark.parametrize('follow_up, first', [("sort ascending", 'Latin America'), ("highest first", 'North America')])
+def test_sort_direction(drilldown, follow_up, first):
+    assert answer(drilldown, follow_up).df['region_name'].iloc[0] == first
+
+
+def test_region_outside_the_result_goes_to_the_database(drilldown):
+    result = answer(drilldown, "only Middle East")
+    assert result.df is None
+    assert 'Middle East' in result.reason
+    assert result.question == "Show me revenue by region only Middle East"
+
+
+def test_missing_column_goes_to_the_database(drilldown):
+    result = answer(drilldown, "by category")
+    assert result.df is None
+    assert 'category' in result.reason
+
+
+def test_regroup_by_a_column_of_the_result():
+    drilldown = DrillDown()
+    df = pd.DataFrame({'product_name': ['Laptop', 'Phone', 'Desk'], 'category': ['Electronics', 'Electronics', 'Furniture'],
+                       'total_revenue': [300.0, 200.0, 100.0]})
+    drilldown.remember('s1', "revenue by product", PRODUCT_SQL, df)
+    result = drilldown.answer('s1', "by category")
+    assert dict(zip(result.df['category'], result.df['total_revenue'])) == {'Electronics': 500.0, 'Furniture': 100.0}
+
+
+def test_filtering_a_top_n_result_goes_to_the_database():
+    drilldown = DrillDown()
+    drilldown.remember('s1', "top 2 regions", REGION_SQL.replace(';', ' LIMIT 2;'), region_frame().head(2))
+    assert answer(drilldown, "only Europe").df is None
+
+
+def test_undo_returns_the_previous_result(drilldown):
+    refined = answer(drilldown, "only Europe")
+    drilldown.remember('s1', refined.question, REGION_SQL, refined.df, steps=refined.steps)
+    assert len(answer(drilldown, "undo").df) == 4
+
+
+def test_new_question_is_not_a_refinement(drilldown):
+    assert answer(drilldown, "What are the top 5 products by sales?") is None
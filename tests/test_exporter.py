@@ -0,0 +1,41 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from exporter import ResultExporter
+
+
+def test_concurrent_requests_encode_once():
+    exporter = ResultExporter()
+    df = pd.DataFrame({'region_name': ['Europe', 'Asia Pacific'], 'revenue': [1.0, 2.0]})
+    calls = []
+    gate = threading.Event()
+
+    def source():
+        calls.append(1)
+        gate.wait(5)
+        return [df]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(exporter.export('r1', 'csv', source))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(set(results)) == 1
+    assert exporter._key_locks == {}
+
+
+def test_failed_encode_releases_its_lock():
+    exporter = ResultExporter()
+
+    def failing():
+        raise RuntimeError("stream failed")
+
+    with pytest.raises(RuntimeError):
+        exporter.export('r1', 'csv', failing)
+    assert exporter._key_locks == {}
+    assert exporter.export('r1', 'csv', pd.DataFrame({'a': [1]})) == b"a\n1\n"
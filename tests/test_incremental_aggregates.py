@@ -0,0 +1,55 @@
+import pandas as pd
+
+from incremental_aggregates import IncrementalAggregates
+
+
+class StubDatabase:
+    """Answers the three queries IncrementalAggregates runs, from fixed frames"""
+
+    def __init__(self, sales, regions):
+        self.sales = sales
+        self.regions = regions
+
+    def execute_query(self, query, use_cache=True):
+        if 'MAX(sale_id)' in query:
+            return pd.DataFrame({'high': [len(self.sales) or None]}), None
+        if 'FROM regions' in query:
+            return self.regions, None
+        buckets = self.sales.groupby(['sale_date', 'region_id'], as_index=False).agg(
+            revenue=('revenue', 'sum'), forecast=('forecast', 'sum'),
+            units_sold=('units_sold', 'sum'), sale_count=('revenue', 'size'))
+        return buckets, None
+
+
+def make_aggregates():
+    sales = pd.DataFrame({
+        'sale_date': ['2026-01-05', '2026-01-20', '2026-02-03'],
+        'region_id': [1, 2, 1],
+        'revenue': [100.0, 50.0, 25.0],
+        'forecast': [90.0, 60.0, 30.0],
+        'units_sold': [1, 2, 3]
+    })
+    regions = pd.DataFrame({'region_id': [1, 2, 5], 'region_name': ['Europe', 'Asia Pacific', 'Middle East']})
+    return IncrementalAggregates(StubDatabase(sales, regions), refresh_interval=60)
+
+
+def test_monthly_trends_for_one_region():
+    df = make_aggregates().monthly_trends(region='Europe')
+    assert df['monthly_revenue'].tolist() == [100.0, 25.0]
+
+
+def test_region_without_sales_is_empty():
+    df = make_aggregates().monthly_trends(region='Middle East')
+    assert df.empty
+    assert list(df.columns) == ['month', 'monthly_revenue']
+
+
+def test_empty_sales_table_is_empty():
+    aggregates = make_aggregates()
+    aggregates.db.sales = aggregates.db.sales.iloc[0:0]
+    assert aggregates.monthly_trends().empty
+    assert aggregates.monthly_trends(region='Europe').empty
+
+
+def test_unknown_region_is_not_answered():
+    assert make_aggregates().monthly_trends(region='Antarctica') is None
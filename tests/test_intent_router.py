@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+from sql_agent import SQLAgent
+
+SCHEMA = {
+    'sales_data': [{'column': 'sale_id', 'type': 'integer'}, {'column': 'revenue', 'type': 'numeric'}],
+    'regions': [{'column': 'region_id', 'type': 'integer'}, {'column': 'region_name', 'type': 'text'}]
+}
+TODAY = datetime.date(2026, 10, 17)
+
+
+@pytest.fixture(scope='module')
+def agent():
+    return SQLAgent(SCHEMA, use_rollups=False, translation_cache=None)
+
+
+@pytest.mark.parametrize('question, intent', [
+    ("Show me revenue by region", 'revenue_by_region'),
+    ("What are the top 5 products by sales?", 'top_products'),
+    ("Show monthly sales trends", 'monthly_trends'),
+    ("Compare actual vs forecast revenue", 'actual_vs_forecast'),
+    ("Which region has the best performance this year?", 'revenue_by_region'),
+    ("revenue by product category", 'category_revenue'),
+    ("Products with revenue above average", 'products_above_average'),
+])
+def test_routes_to_intent(agent, question, intent):
+    assert agent.router.match(question, today=TODAY).name == intent
+
+
+@pytest.mark.parametrize('question, intent', [
+    ("forecast vs actual", 'actual_vs_forecast'),
+    ("monthly trend", 'monthly_trends'),
+    ("show revenue trend", 'monthly_trends'),
+    ("Which category has the most revenue?", 'category_revenue'),
+    ("What are the best products?", 'top_products'),
+    ("revenue for each region", 'revenue_by_region'),
+    ("region revenue", 'revenue_by_region'),
+    ("What were total sales?", 'actual_vs_forecast'),
+    ("products by total revenue and units sold across online and retail channels", 'top_products'),
+])
+def test_paraphrases_route_to_intent(agent, question, intent):
+    assert agent.router.match(question, today=TODAY).name == intent
+
+
+@pytest.mark.parametrize('question', ["Show sales records", "show me sales", "revenue"])
+def test_vague_questions_fall_back_to_row_query(agent, question):
+    assert agent.router.match(question, today=TODAY).intent is None
+
+
+@pytest.mark.parametrize('question, start, end', [
+    ("sales in march", datetime.date(2026, 3, 1), datetime.date(2026, 4, 1)),
+    ("revenue by region in may", datetime.date(2026, 5, 1), datetime.date(2026, 6, 1)),
+    ("monthly revenue for december", datetime.date(2025, 12, 1), datetime.date(2026, 1, 1)),
+])
+def test_month_without_year_is_the_latest_one(agent, question, start, end):
+    params = agent.router.match(question, today=TODAY).params
+    assert (params['start_date'], params['end_date']) == (start, end)
+
+
+def test_may_as_a_verb_is_not_a_date(agent):
+    assert 'start_date' not in agent.router.match("may I see revenue by region", today=TODAY).params
+
+
+def test_exported_tables_round_trip(agent):
+    other = SQLAgent(SCHEMA, use_rollups=False, translation_cache=None, intent_tables=agent.router.export_tables())
+    for question in agent.get_sample_queries():
+        assert other.router.match(question, today=TODAY).name == agent.router.match(question, today=TODAY).name
@@ -0,0 +1,128 @@
+import os
+import sys
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from dataset_store import DatasetStore
+from powerbi_manager import PowerBIManager
+from powerbi_push import PushClient, retry_after_seconds
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from powerbi_stub_server import start_stub  # noqa: E402
+
+
+def make_frame(rows, start=0):
+    return pd.DataFrame({
+        'region_name': ['Europe', 'Asia Pacific'] * (rows // 2),
+        'units_sold': range(start, start + rows),
+        'revenue': [float(i) for i in range(start, start + rows)]
+    })
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server, state, url = start_stub(**kwargs)
+        servers.append(server)
+        return state, url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def remote_rows(state, manager, dataset_id):
+    return state.datasets[manager.get_dataset_info(dataset_id)['remote_id']]['tables']['QueryResults']
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds('2.5') == 2.5
+    assert retry_after_seconds('-1') == 0.0
+    soon = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 28 <= retry_after_seconds(soon) <= 30
+    assert retry_after_seconds('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert retry_after_seconds('soon') is None
+
+
+def test_create_and_append_push_only_new_rows(stub, tmp_path):
+    state, url = stub(requests_per_minute=10000)
+    client = PushClient(base_url=url, token='test', batch_rows=100, requests_per_minute=10000, backoff=0.01)
+    manager = PowerBIManager(store=DatasetStore(str(tmp_path)), client=client)
+
+    dataset_id = manager.create_dataset_from_dataframe(make_frame(1000), 'sales', 'QueryResults')
+    assert dataset_id is not None
+    assert remote_rows(state, manager, dataset_id) == 1000
+    # One dataset lookup, the create, then ten row posts
+    assert state.requests == 2 + 10
+
+    assert manager.append_rows(dataset_id, make_frame(250, start=1000)) == 250
+    info = manager.get_dataset_info(dataset_id)
+    assert info['row_count'] == info['pushed_rows'] == 1250
+    assert remote_rows(state, manager, dataset_id) == 1250
+
+
+def test_throttled_posts_wait_for_an_http_date_retry_after(stub, tmp_path):
+    state, url = stub(requests_per_minute=2, window=1.0, retry_after_date=True)
+    client = PushClient(base_url=url, token='test', batch_rows=100, requests_per_minute=10000, backoff=0.01)
+    manager = PowerBIManager(store=DatasetStore(str(tmp_path)), client=client)
+
+    dataset_id = manager.create_dataset_from_dataframe(make_frame(300), 'sales', 'QueryResults')
+    assert dataset_id is not None
+    assert state.throttled >= 1
+    assert client.retries == state.throttled
+    assert remote_rows(state, manager, dataset_id) == 300
+
+
+def test_transient_failures_are_retried(stub, tmp_path):
+    random.seed(0)
+    state, url = stub(requests_per_minute=10000, fail_rate=0.3)
+    client = PushClient(base_url=url, token='test', batch_rows=50, requests_per_minute=10000,
+                        max_retries=20, backoff=0.001)
+    manager = PowerBIManager(store=DatasetStore(str(tmp_path)), client=client)
+
+    dataset_id = manager.create_dataset_from_dataframe(make_frame(1000), 'sales', 'QueryResults')
+    assert dataset_id is not None
+    assert state.failed > 0
+    assert client.retries == state.failed
+    assert remote_rows(state, manager, dataset_id) == 1000
+
+
+def test_create_lost_in_transit_is_not_repeated(stub, tmp_path):
+    state, url = stub(requests_per_minute=10000, lose_creates=1)
+    client = PushClient(base_url=url, token='test', batch_rows=100, requests_per_minute=10000, backoff=0.001)
+    manager = PowerBIManager(store=DatasetStore(str(tmp_path)), client=client)
+
+    dataset_id = manager.create_dataset_from_dataframe(make_frame(200), 'sales', 'QueryResults')
+    assert dataset_id is not None
+    assert len(state.datasets) == 1
+    assert remote_rows(state, manager, dataset_id) == 200
+
+
+def test_failed_remote_create_removes_the_local_dataset(stub, tmp_path):
+    state, url = stub(requests_per_minute=10000, fail_rate=1.0)
+    client = PushClient(base_url=url, token='test', requests_per_minute=10000, max_retries=1, backoff=0.001)
+    store = DatasetStore(str(tmp_path))
+    manager = PowerBIManager(store=store, client=client)
+
+    assert manager.create_dataset_from_dataframe(make_frame(10), 'sales', 'QueryResults') is None
+    assert store.list() == []
+    assert DatasetStore(str(tmp_path)).list() == []
+
+
+def test_failed_create_leaves_no_dataset(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    df = pd.DataFrame({'mixed': [1, 'two', 3.0]})
+    with pytest.raises(Exception):
+        store.create(df, 'broken')
+    assert store.list() == []
+    assert os.listdir(tmp_path) == []
+    assert DatasetStore(str(tmp_path)).list() == []
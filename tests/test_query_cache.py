@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from query_cache import QueryResultCache, extract_tables
+
+
+@pytest.mark.parametrize('sql, tables', [
+    ("SELECT * FROM sales_data s JOIN regions r ON s.region_id = r.region_id", {'sales_data', 'regions'}),
+    ("SELECT * FROM sales_data, regions WHERE sales_data.region_id = regions.region_id", {'sales_data', 'regions'}),
+    ("SELECT * FROM public.sales_data s, regions AS r, products p", {'sales_data', 'regions', 'products'}),
+    ("SELECT * FROM (SELECT product_id FROM products) p, sales_data s", {'products', 'sales_data'}),
+    ("SELECT * FROM sales_data WHERE region_id IN (SELECT region_id FROM regions, products)",
+     {'sales_data', 'regions', 'products'}),
+    ("SELECT * FROM sales_data ORDER BY revenue, units_sold", {'sales_data'}),
+    ("SELECT 'from regions, products' AS label FROM sales_data", {'sales_data'}),
+])
+def test_extract_tables(sql, tables):
+    assert extract_tables(sql) == tables
+
+
+def test_comma_joined_table_invalidates_result():
+    cache = QueryResultCache()
+    sql = "SELECT region_name, revenue FROM sales_data s, regions r WHERE s.region_id = r.region_id"
+    cache.put(sql, pd.DataFrame({'region_name': ['Europe'], 'revenue': [1.0]}))
+    assert cache.get(sql) is not None
+    cache.invalidate_table('regions')
+    assert cache.get(sql) is None
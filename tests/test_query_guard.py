@@ -0,0 +1,35 @@
+from query_guard import GuardDecision, QueryGuard
+
+
+class StubEngine:
+    class dialect:
+        name = 'sqlite'
+
+
+class StubDatabase:
+    """A non-PostgreSQL database: the guard gets no planner estimate from it"""
+    mock_mode = False
+    engine = StubEngine()
+
+
+def make_guard():
+    return QueryGuard(StubDatabase(), row_budget=1000)
+
+
+def test_blind_limit_says_why():
+    decision = make_guard().check("SELECT region_name, revenue FROM sales_data")
+    assert decision.action == GuardDecision.REWRITE
+    assert decision.sql.rstrip(';').endswith("LIMIT 1000")
+    assert "no row estimate" in decision.reason
+
+
+def test_export_check_keeps_the_query_unlimited():
+    sql = "SELECT region_name, revenue FROM sales_data"
+    decision = make_guard().check(sql, limit_rows=False)
+    assert decision.action == GuardDecision.ALLOW
+    assert decision.sql == sql
+
+
+def test_export_check_still_rejects_writes():
+    decision = make_guard().check("DELETE FROM sales_data", limit_rows=False)
+    assert decision.action == GuardDecision.REJECT
@@ -0,0 +1,56 @@
+import pytest
+
+from rollups import RollupManager
+from sql_agent import SQLAgent
+
+COLUMNS = [{'column': 'sale_date', 'type': 'date'}, {'column': 'revenue', 'type': 'numeric'}]
+SCHEMA = {table: COLUMNS for table in ['sales_data', 'regions', 'sales_daily_rollup', 'sales_monthly_rollup']}
+
+
+class StubRollups:
+    def __init__(self, current):
+        self.current = current
+        self.checks = 0
+
+    def is_current(self):
+        self.checks += 1
+        return self.current
+
+
+class BrokenEngine:
+    def connect(self):
+        raise RuntimeError("connection refused")
+
+
+class BrokenDatabase:
+    engine = BrokenEngine()
+
+
+@pytest.mark.parametrize('current, fact', [(True, 'sales_monthly_rollup'), (False, 'sales_data')])
+def test_routes_to_rollups_only_while_current(current, fact):
+    rollups = StubRollups(current)
+    agent = SQLAgent(SCHEMA, use_rollups=True, translation_cache=None, rollups=rollups)
+    sql = agent.natural_language_to_sql("Show me revenue by region")
+    assert f"FROM {fact} s" in sql
+    assert rollups.checks == 1
+
+
+def test_without_a_rollup_manager_reads_sales_data():
+    agent = SQLAgent(SCHEMA, use_rollups=True, translation_cache=None)
+    assert "FROM sales_data s" in agent.natural_language_to_sql("Show me revenue by region")
+
+
+def test_unreadable_freshness_is_not_current():
+    rollups = RollupManager(BrokenDatabase(), refresh_on_demand=False, check_interval=60)
+    assert rollups.is_current() is False
+
+
+def test_rollup_translations_are_not_cached(tmp_path):
+    from translation_cache import TranslationCache
+
+    rollups = StubRollups(True)
+    agent = SQLAgent(SCHEMA, use_rollups=True, rollups=rollups,
+                     translation_cache=TranslationCache(str(tmp_path / 'cache.jsonl')))
+    assert "FROM sales_monthly_rollup s" in agent.natural_language_to_sql("Show me revenue by region")
+    rollups.current = False
+    assert "FROM sales_data s" in agent.natural_language_to_sql("Show me revenue by region")
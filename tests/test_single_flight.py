@@ -0,0 +1,56 @@
+import time
+import threading
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight('test')
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'rows'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do('q', work)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do('q', work, wait_timeout=5)))
+    follower.start()
+    while flights.collapsed == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert len(calls) == 1
+    assert sorted(results) == [('rows', False), ('rows', True)]
+
+
+def test_follower_timeout_only_affects_that_follower():
+    flights = SingleFlight('test')
+    flight, leader = flights.join('q')
+    assert leader
+    patient, _ = flights.join('q')
+    impatient, _ = flights.join('q')
+
+    assert flights.wait('q', impatient, timeout=0.01) == (None, None)
+    # The stuck flight is detached so a new caller leads a fresh one...
+    fresh, leader = flights.join('q')
+    assert leader and fresh is not flight
+    # ...while the other waiter still gets the original leader's result
+    assert not patient.done.is_set()
+    flights.finish('q', flight, result='rows')
+    assert flights.wait('q', patient, timeout=1) == ('rows', None)
+    # Finishing the old flight leaves the fresh one in place
+    assert flights.stats()['in_flight'] == 1
+
+
+def test_waiter_reruns_the_work_after_its_timeout():
+    flights = SingleFlight('test')
+    flights.join('q')
+    result, shared = flights.do('q', lambda: 'own rows', wait_timeout=0.01)
+    assert (result, shared) == ('own rows', False)
@@ -0,0 +1,37 @@
+import json
+
+import pandas as pd
+import pytest
+
+from slow_query_log import SlowQueryLog
+
+
+class StubEngine:
+    class dialect:
+        name = 'postgresql'
+
+
+class StubDatabase:
+    """Records the statements the log replays instead of running them"""
+    engine = StubEngine()
+
+    def __init__(self):
+        self.executed = []
+
+    def execute_query(self, query, use_cache=True):
+        self.executed.append(query)
+        return pd.DataFrame({'QUERY PLAN': ['Seq Scan on sales_data']}), None
+
+
+@pytest.mark.parametrize('sql, explained', [
+    ("SELECT region_id, SUM(revenue) FROM sales_data GROUP BY region_id", True),
+    ("WITH gone AS (DELETE FROM sales_data RETURNING *) SELECT COUNT(*) FROM gone", False),
+    ("WITH changed AS (UPDATE sales_data SET revenue = 0 RETURNING *) SELECT * FROM changed", False),
+])
+def test_only_read_only_queries_are_explained(tmp_path, sql, explained):
+    db = StubDatabase()
+    log = SlowQueryLog(db, path=str(tmp_path / 'slow.jsonl'), threshold_ms=0)
+    log._write(sql, 2.0, 10)
+    entry = json.loads((tmp_path / 'slow.jsonl').read_text().splitlines()[0])
+    assert bool(db.executed) == explained
+    assert (entry['plan'] is not None) == explained
@@ -0,0 +1,111 @@
+import pytest
+
+from sql_agent import SQLAgent
+from translation_cache import TranslationCache, normalize_question
+
+SCHEMA = {
+    'sales_data': [{'column': 'sale_id', 'type': 'integer'}, {'column': 'revenue', 'type': 'numeric'}],
+    'regions': [{'column': 'region_id', 'type': 'integer'}, {'column': 'region_name', 'type': 'text'}]
+}
+OTHER_SCHEMA = dict(SCHEMA, products=[{'column': 'product_id', 'type': 'integer'}])
+
+# Long enough that each pair clears the similarity threshold on token overlap
+# alone, so only the protected words keep them apart
+BASE = "products by total revenue and units sold across online and retail channels"
+OPPOSITES = [
+    (f"top five {BASE}", f"top three {BASE}"),
+    (f"highest {BASE}", f"lowest {BASE}"),
+    (f"{BASE} for europe", f"{BASE} excluding europe"),
+    (f"{BASE} sorted ascending", f"{BASE} sorted descending"),
+    (f"top {BASE}", f"bottom {BASE}"),
+    (f"{BASE} with returns", f"{BASE} without returns"),
+]
+
+
+class StubModel:
+    """Local stand-in for an LLM translator: deterministic SQL, counted calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, question, schema_context):
+        self.calls.append(question)
+        return f"SELECT '{question}' AS answer"
+
+
+def jaccard(a, b):
+    a, b = set(normalize_question(a)), set(normalize_question(b))
+    return len(a & b) / len(a | b)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'translations.sqlite')
+
+
+def make_agent(cache_path, model, schema=SCHEMA):
+    cache = TranslationCache(cache_path, protected_terms=['Europe', 'Asia Pacific'])
+    return SQLAgent(schema, translator=model, translation_cache=cache, use_rollups=False)
+
+
+def test_repeated_question_skips_the_model(cache_path):
+    model = StubModel()
+    agent = make_agent(cache_path, model)
+    first = agent.natural_language_to_sql("Show me total revenue by region")
+    second = agent.natural_language_to_sql("show total revenue by region please")
+    assert first == second
+    assert len(model.calls) == 1
+
+
+def test_entries_survive_a_restart(cache_path):
+    model = StubModel()
+    sql = make_agent(cache_path, model).natural_language_to_sql("total revenue by region")
+    restarted = StubModel()
+    assert make_agent(cache_path, restarted).natural_language_to_sql("total revenue by region") == sql
+    assert restarted.calls == []
+
+
+def test_paraphrase_is_a_near_hit(cache_path):
+    model = StubModel()
+    agent = make_agent(cache_path, model)
+    sql = agent.natural_language_to_sql(f"top 5 {BASE}")
+    assert agent.natural_language_to_sql(f"top 5 {BASE} overall") == sql
+    assert len(model.calls) == 1
+    assert agent.translation_cache.near_hits == 1
+
+
+@pytest.mark.parametrize('cached, asked', OPPOSITES + [(b, a) for a, b in OPPOSITES])
+def test_opposite_meaning_is_not_reused(cache_path, cached, asked):
+    assert jaccard(cached, asked) >= 0.75
+    model = StubModel()
+    agent = make_agent(cache_path, model)
+    cached_sql = agent.natural_language_to_sql(cached)
+    assert agent.natural_language_to_sql(asked) != cached_sql
+    assert model.calls == [cached, asked]
+
+
+def test_schema_change_misses(cache_path):
+    model = StubModel()
+    make_agent(cache_path, model).natural_language_to_sql("total revenue by region")
+    make_agent(cache_path, model, OTHER_SCHEMA).natural_language_to_sql("total revenue by region")
+    assert len(model.calls) == 2
+
+
+def test_relative_dates_are_not_cached(cache_path):
+    model = StubModel()
+    agent = make_agent(cache_path, model)
+    agent.natural_language_to_sql("revenue by region last month")
+    agent.natural_language_to_sql("revenue by region last month")
+    assert len(model.calls) == 2
+
+
+@pytest.mark.parametrize('question, cacheable', [
+    ("revenue by region in march", False),
+    ("Revenue by region for Dec", False),
+    ("sales in may", False),
+    ("revenue by region in march 2025", True),
+    ("revenue by region for December, 2025", True),
+    ("may I see revenue by region", True),
+])
+def test_month_without_a_year_is_not_cached(cache_path, question, cacheable):
+    assert TranslationCache(cache_path).is_cacheable(question) == cacheable
@@ -0,0 +1,57 @@
+import importlib.util
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from lazy_imports import LazyModule, lazy_import
+
+LANGCHAIN_INSTALLED = importlib.util.find_spec('langchain_openai') is not None
+
+
+def test_unchecked_lazy_import_fails_on_first_use():
+    module = lazy_import('no_such_module_for_tests', check=False)
+    assert isinstance(module, LazyModule)
+    with pytest.raises(ImportError):
+        module.anything
+    with pytest.raises(ImportError):
+        lazy_import('no_such_module_for_tests')
+
+
+@pytest.mark.skipif(LANGCHAIN_INSTALLED, reason="checks behaviour without LangChain")
+def test_fake_insight_model_works_without_langchain(monkeypatch):
+    monkeypatch.setenv('INSIGHT_MODEL', 'fake')
+    monkeypatch.setenv('FAKE_LLM_LATENCY', '0')
+    from insight_Generator import InsightGenerator
+
+    df = pd.DataFrame({'region_name': ['Europe', 'Asia Pacific'], 'total_revenue': [120.0, 98.0]})
+    insights = InsightGenerator().generate_insights(df, "Show me revenue by region")
+    assert len(insights) == 3
+    assert insights[0].startswith("Revenue is concentrated")
+
+
+def test_warmup_builds_the_sidebar_sample_questions(tmp_path, monkeypatch):
+    monkeypatch.setenv('TRACING', 'false')
+    from database import DatabaseManager
+    from embedded_engine import attach_sqlite_dialect
+    from sql_agent import SQLAgent
+    import warmup
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'sales.sqlite'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE regions (region_id INTEGER PRIMARY KEY, region_name TEXT)"))
+        conn.execute(text("CREATE TABLE products (product_id INTEGER PRIMARY KEY, product_name TEXT, category TEXT)"))
+        conn.execute(text("CREATE TABLE sales_data (sale_id INTEGER PRIMARY KEY, sale_date DATE, region_id INTEGER, "
+                          "product_id INTEGER, units_sold INTEGER, revenue REAL, forecast REAL)"))
+        conn.execute(text("INSERT INTO regions VALUES (1, 'Europe'), (2, 'Asia Pacific')"))
+        conn.execute(text("INSERT INTO products VALUES (1, 'Widget', 'Tools'), (2, 'Gadget', 'Toys')"))
+        conn.execute(text("INSERT INTO sales_data VALUES (1, '2026-01-05', 1, 1, 3, 30.0, 25.0), "
+                          "(2, '2026-02-10', 2, 2, 1, 12.5, 15.0)"))
+
+    db = DatabaseManager(engine=attach_sqlite_dialect(engine))
+    try:
+        manifest = warmup.build(db, str(tmp_path / 'warmup'))
+    finally:
+        db.close()
+    questions = SQLAgent({}, use_rollups=False, translation_cache=None).get_sample_queries()
+    assert [entry['question'] for entry in manifest['results']] == questions
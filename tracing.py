@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from query_cache import estimate_size
+
+# Histogram buckets (seconds) for stage durations, from cache hits to LLM calls
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_SAMPLE_ROWS = 10000
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def frame_bytes(df):
+    """Approximate in-memory size of a frame; large frames are extrapolated from a sample"""
+    if df is None:
+        return 0
+    if len(df) <= SIZE_SAMPLE_ROWS:
+        return estimate_size(df)
+    return int(estimate_size(df.iloc[:SIZE_SAMPLE_ROWS]) * len(df) / SIZE_SAMPLE_ROWS)
+
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start', 'duration', 'attrs', 'error')
+
+    def __init__(self, name, trace_id, parent_id, attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.duration = None
+        self.attrs = attrs
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': self.start,
+            'duration_ms': round(self.duration * 1000, 3),
+            'error': self.error,
+            **self.attrs
+        }
+
+
+class Metrics:
+    """Per-span counters and duration histograms, rendered in the Prometheus text format"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._counters = {}
+
+    def observe(self, span):
+        with self._lock:
+            histogram = self._durations.setdefault(span.name, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += span.duration
+            histogram[2] += 1
+            if span.error is not None:
+                self._inc('errors', span.name, 1)
+            for attr in ('rows', 'bytes'):
+                value = span.attrs.get(attr)
+                if isinstance(value, (int, float)):
+                    self._inc(attr, span.name, value)
+
+    def count(self, counter, name, value=1):
+        """Increment a counter that is not derived from spans, e.g. single-flight collapses"""
+        with self._lock:
+            self._inc(counter, name, value)
+
+    def _inc(self, counter, name, value):
+        key = (counter, name)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self):
+        lines = [
+            "# HELP chatbot_span_duration_seconds Duration of pipeline stages",
+            "# TYPE chatbot_span_duration_seconds histogram"
+        ]
+        with self._lock:
+            for name, (counts, total, count) in sorted(self._durations.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'chatbot_span_duration_seconds_bucket{{span="{name}",le="{bound:g}"}} {bucket_count}')
+                lines.append(f'chatbot_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+                lines.append(f'chatbot_span_duration_seconds_sum{{span="{name}"}} {total:.6f}')
+                lines.append(f'chatbot_span_duration_seconds_count{{span="{name}"}} {count}')
+            for counter in ('errors', 'rows', 'bytes'):
+                entries = sorted((name, value) for (kind, name), value in self._counters.items() if kind == counter)
+                if not entries:
+                    continue
+                lines.append(f"# TYPE chatbot_span_{counter}_total counter")
+                for name, value in entries:
+                    lines.append(f'chatbot_span_{counter}_total{{span="{name}"}} {value}')
+            for counter in sorted({kind for kind, _ in self._counters} - {'errors', 'rows', 'bytes'}):
+                lines.append(f"# TYPE chatbot_{counter}_total counter")
+                for name, value in sorted((name, value) for (kind, name), value in self._counters.items() if kind == counter):
+                    lines.append(f'chatbot_{counter}_total{{name="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class Tracer:
+    """Records timed spans for each pipeline stage.
+
+    Spans nest through a context variable, so a database span opened inside
+    a job's span becomes its child on the same trace. Finished spans feed
+    the in-process Metrics and, when ``path`` is set (``TRACE_FILE``), are
+    appended to a JSONL file. Set ``TRACING=false`` to turn spans into
+    no-ops apart from the timing callers read back.
+    """
+
+    def __init__(self, path=None, enabled=None):
+        self.path = path if path is not None else os.getenv('TRACE_FILE', 'traces.jsonl')
+        self.enabled = enabled if enabled is not None else os.getenv('TRACING', 'true').lower() == 'true'
+        self.metrics = Metrics()
+        self._file = None
+        self._file_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = self._new_span(name, attrs)
+        token = _current_span.set(span)
+        t0 = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - t0
+            _current_span.reset(token)
+            if self.enabled:
+                self._finish(span)
+
+    def record(self, name, duration, error=None, **attrs):
+        """Record a span timed by the caller, e.g. around a generator that cannot hold a context"""
+        span = self._new_span(name, attrs)
+        span.start -= duration
+        span.duration = duration
+        span.error = error
+        if self.enabled:
+            self._finish(span)
+        return span
+
+    def current(self):
+        return _current_span.get()
+
+    def _new_span(self, name, attrs):
+        parent = _current_span.get()
+        if parent is None:
+            return Span(name, uuid.uuid4().hex, None, attrs)
+        return Span(name, parent.trace_id, parent.span_id, attrs)
+
+    def _finish(self, span):
+        self.metrics.observe(span)
+        if not self.path:
+            return
+        line = json.dumps(span.to_dict(), default=str)
+        with self._file_lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8', buffering=1)
+                self._file.write(line + '\n')
+            except OSError as e:
+                logging.warning(f"Disabling trace file {self.path}: {e}")
+                self.path = None
+
+    def close(self):
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def start_metrics_server(port=None, host=None, metrics=None):
+    """Serve ``/metrics`` in the Prometheus text format on a daemon thread; returns the server or None"""
+    port = port if port is not None else int(os.getenv('METRICS_PORT', '0'))
+    if not port:
+        return None
+    metrics = metrics or tracer.metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    try:
+        server = ThreadingHTTPServer((host or os.getenv('METRICS_HOST', '127.0.0.1'), port), Handler)
+    except OSError as e:
+        logging.error(f"Could not start metrics endpoint on port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics').start()
+    logging.info(f"Serving metrics on http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+    return server
+
+
+# Process-wide tracer shared by the app and the library modules
+tracer = Tracer()
@@ -0,0 +1,199 @@
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from intent_router import tokenize, MONTHS, NUMBER_WORDS
+
+# Questions whose meaning depends on the current date are never cached
+RELATIVE_TIME = re.compile(
+    r"\b(today|yesterday|tomorrow|now|current|recent|latest|ytd|"
+    r"(this|last|past|previous|next)\s+(\d+\s+)?(day|week|month|quarter|year)s?)\b",
+    re.IGNORECASE
+)
+# So is a month without a year, which means its latest occurrence (see IntentRouter);
+# abbreviations and 'may' only count after a preposition, as in the router
+_FULL_MONTHS = [name for name in MONTHS if len(name) > 3]
+MONTH_WITHOUT_YEAR = re.compile(
+    r"\b(?:(?:in|during|for)\s+(?:" + "|".join(MONTHS) + r")|(?:" + "|".join(_FULL_MONTHS) + r"))\b"
+    r"(?!,?\s+(?:19|20)\d{2}\b)",
+    re.IGNORECASE
+)
+
+# Words that flip or narrow a question's meaning: two questions differing in
+# one of these are never near-duplicates, however similar the rest is
+ORDER_WORDS = {
+    'top', 'bottom', 'first', 'last', 'highest', 'lowest', 'high', 'low', 'best', 'worst', 'most', 'least',
+    'largest', 'smallest', 'biggest', 'max', 'maximum', 'min', 'minimum', 'asc', 'ascending', 'desc',
+    'descending', 'increasing', 'decreasing', 'above', 'below', 'under', 'more', 'less', 'fewer', 'greater'
+}
+NEGATION_WORDS = {'not', 'no', 'excluding', 'exclude', 'except', 'without', 'other', 'besides', 'non'}
+
+
+def normalize_question(question):
+    """Token form of a question; paraphrases that only differ in filler words collapse"""
+    return tokenize(question)
+
+
+def schema_fingerprint(schema_context):
+    return hashlib.sha256(schema_context.encode('utf-8')).hexdigest()[:16]
+
+
+class TranslationCache:
+    """Persistent NL->SQL cache keyed by normalized question and schema fingerprint.
+
+    Entries live in SQLite so they survive restarts. Lookups try the exact
+    normalized question first, then a near-duplicate search: the cached
+    question with the highest token Jaccard similarity wins if it reaches
+    ``similarity_threshold`` and does not differ in any protected token
+    (numbers and number words, month names, order and polarity words such
+    as top/bottom or ascending/descending, negations such as excluding,
+    and caller-supplied terms such as region names), so 'top 5' never
+    reuses the SQL for 'top 3' nor 'excluding europe' the one for 'europe'.
+    """
+
+    def __init__(self, path, similarity_threshold=0.75, max_age=7 * 24 * 3600, max_entries=10000,
+                 protected_terms=None):
+        self.path = path
+        self.similarity_threshold = similarity_threshold
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.protected_tokens = set(MONTHS) | set(NUMBER_WORDS)
+        # Folded the way tokenize() folds question words
+        for word in ORDER_WORDS | NEGATION_WORDS:
+            self.protected_tokens.update(tokenize(word) or [word])
+        for term in protected_terms or []:
+            self.protected_tokens.update(tokenize(term))
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                schema_hash TEXT NOT NULL,
+                question_key TEXT NOT NULL,
+                question TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (schema_hash, question_key)
+            )
+        """)
+        self._conn.commit()
+        # schema_hash -> {'entries': {key: (tokens, sql, created_at)}, 'index': {token: set(keys)}}
+        self._memory = {}
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def is_cacheable(self, question):
+        return not RELATIVE_TIME.search(question) and not MONTH_WITHOUT_YEAR.search(question)
+
+    def get(self, question, schema_hash):
+        """Return cached SQL for the question (or a close paraphrase), else None"""
+        tokens = normalize_question(question)
+        key = ' '.join(tokens)
+        with self._lock:
+            entries, index = self._load(schema_hash)
+            now = time.time()
+
+            entry = entries.get(key)
+            if entry is not None and now - entry[2] <= self.max_age:
+                self.hits += 1
+                self._touch(schema_hash, key, now)
+                return entry[1]
+
+            best_key = self._nearest(set(tokens), entries, index, now)
+            if best_key is not None:
+                self.near_hits += 1
+                self._touch(schema_hash, best_key, now)
+                return entries[best_key][1]
+
+            self.misses += 1
+            return None
+
+    def put(self, question, schema_hash, sql):
+        tokens = normalize_question(question)
+        key = ' '.join(tokens)
+        now = time.time()
+        with self._lock:
+            entries, index = self._load(schema_hash)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (schema_hash, question_key, question, sql, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (schema_hash, key, question, sql, now, now)
+            )
+            self._conn.commit()
+            entries[key] = (frozenset(tokens), sql, now)
+            for token in tokens:
+                index.setdefault(token, set()).add(key)
+            if len(entries) > self.max_entries:
+                self._prune(schema_hash)
+
+    def stats(self):
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            'entries': sum(len(cached['entries']) for cached in self._memory.values())
+        }
+
+    def _load(self, schema_hash):
+        cached = self._memory.get(schema_hash)
+        if cached is None:
+            entries, index = {}, {}
+            rows = self._conn.execute(
+                "SELECT question_key, sql, created_at FROM translations WHERE schema_hash = ?", (schema_hash,)
+            ).fetchall()
+            for key, sql, created_at in rows:
+                tokens = frozenset(key.split())
+                entries[key] = (tokens, sql, created_at)
+                for token in tokens:
+                    index.setdefault(token, set()).add(key)
+            cached = self._memory[schema_hash] = {'entries': entries, 'index': index}
+        return cached['entries'], cached['index']
+
+    def _nearest(self, tokens, entries, index, now):
+        if not tokens:
+            return None
+        candidates = set()
+        for token in tokens:
+            candidates |= index.get(token, set())
+
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            cached_tokens, _, created_at = entries[key]
+            if now - created_at > self.max_age:
+                continue
+            difference = tokens ^ cached_tokens
+            if any(token.isdigit() or token in self.protected_tokens for token in difference):
+                continue
+            score = len(tokens & cached_tokens) / len(tokens | cached_tokens)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key if best_score >= self.similarity_threshold else None
+
+    def _touch(self, schema_hash, key, now):
+        self._conn.execute(
+            "UPDATE translations SET hits = hits + 1, last_used = ? WHERE schema_hash = ? AND question_key = ?",
+            (now, schema_hash, key)
+        )
+        self._conn.commit()
+
+    def _prune(self, schema_hash):
+        """Drop the least recently used entries beyond max_entries"""
+        stale = self._conn.execute(
+            "SELECT question_key FROM translations WHERE schema_hash = ? ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+            (schema_hash, self.max_entries)
+        ).fetchall()
+        self._conn.executemany(
+            "DELETE FROM translations WHERE schema_hash = ? AND question_key = ?",
+            [(schema_hash, key) for (key,) in stale]
+        )
+        self._conn.commit()
+        self._memory.pop(schema_hash, None)
+        logging.info(f"Pruned {len(stale)} translation cache entries")
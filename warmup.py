@@ -0,0 +1,221 @@
+"""Build-time warm-up artifact for fast start-up.
+
+    python warmup.py build [path]
+
+Run once when the image or deployment is built, against the same database
+the app will use. The artifact holds the schema (with the catalog
+fingerprints SchemaSnapshot checks against), foreign keys, the intent
+router's index tables, the results of the dashboard's sample questions and
+the incremental aggregates' partials. At start-up WarmStart applies it so
+the first sessions skip schema introspection, index building and the first
+round of queries.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import pandas as pd
+
+from sql_agent import SQLAgent
+from rollups import RollupManager
+from query_cache import normalize_sql
+from query_guard import GuardDecision
+from incremental_aggregates import BUCKET_KEYS
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def sales_high_water_mark(db):
+    """MAX(sale_id) of sales_data, or None when it cannot be read"""
+    df, error = db.execute_query("SELECT MAX(sale_id) AS high FROM sales_data", use_cache=False)
+    if error:
+        logging.warning(f"Could not read the sales high-water mark: {error}")
+        return None
+    high = df['high'].iloc[0]
+    return 0 if pd.isna(high) else int(high)
+
+
+def database_id(db):
+    """Identifies the data source an artifact was built from, without credentials"""
+    if db.embedded is not None:
+        return f"embedded:{os.path.abspath(db.embedded.path)}"
+    return db.engine.url.render_as_string(hide_password=True)
+
+
+def build(db, path=None, questions=None):
+    """Write the warm-up artifact for ``db`` to ``path``; returns the manifest.
+
+    ``questions`` defaults to the sample queries the sidebar offers, which
+    are the ones asked most right after a deploy.
+    """
+    path = path or os.getenv('WARMUP_PATH', 'warmup')
+    os.makedirs(os.path.join(path, 'results'), exist_ok=True)
+
+    t0 = time.perf_counter()
+    schema = db.get_schema_info(force_refresh=True)
+    foreign_keys = db.get_foreign_keys()
+    agent = SQLAgent(schema, foreign_keys=foreign_keys, translation_cache=None, rollups=RollupManager(db))
+    questions = agent.get_sample_queries() if questions is None else questions
+    high_water_mark = sales_high_water_mark(db)
+
+    results = []
+    for question in questions:
+        decision = db.guard.check(agent.natural_language_to_sql(question))
+        if decision.action == GuardDecision.REJECT:
+            logging.warning(f"Skipping {question!r}: {decision.reason}")
+            continue
+        # Stored under the SQL the app will run, i.e. after any guard rewrite
+        df, error = db.execute_query(decision.sql, use_cache=False)
+        if error:
+            logging.warning(f"Skipping {question!r}: {error}")
+            continue
+        name = hashlib.sha256(normalize_sql(decision.sql).encode('utf-8')).hexdigest()[:16] + '.parquet'
+        df.to_parquet(os.path.join(path, 'results', name), index=False)
+        results.append({'question': question, 'sql': decision.sql, 'file': f"results/{name}", 'rows': len(df)})
+
+    aggregates = None
+    if db.aggregates is not None:
+        db.aggregates.refresh(force=True)
+        db.aggregates.partials.reset_index().to_parquet(os.path.join(path, 'aggregates.parquet'), index=False)
+        aggregates = {
+            'file': 'aggregates.parquet',
+            'high_water_mark': db.aggregates.high_water_mark,
+            'regions': {name: int(region_id) for name, region_id in db.aggregates.regions.items()}
+        }
+
+    snapshot = db.schema_snapshot
+    manifest = {
+        'built_at': time.time(),
+        'database': database_id(db),
+        'schema': schema,
+        'table_fingerprints': snapshot.table_fingerprints if snapshot is not None else None,
+        'schema_fingerprint': snapshot.fingerprint if snapshot is not None else None,
+        'foreign_keys': foreign_keys,
+        'intent_tables': agent.router.export_tables(),
+        'high_water_mark': high_water_mark,
+        'results': results,
+        'aggregates': aggregates
+    }
+    tmp_path = os.path.join(path, f"{MANIFEST_FILE}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, default=str)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+    logging.info(f"Warm-up artifact written to {path} in {time.perf_counter() - t0:.1f}s: "
+                 f"{len(results)} results, {len(schema)} tables")
+    return manifest
+
+
+class WarmStart:
+    """Applies a warm-up artifact from build() at start-up.
+
+    Nothing in the artifact is trusted blindly. It is ignored when older
+    than ``max_age`` seconds or built from another database. The schema
+    only seeds SchemaSnapshot, which still checks its catalog fingerprints
+    once the snapshot is older than its own max age. Foreign keys are used
+    only while that fingerprint matches the one built against. Sample
+    results are preloaded into the result cache only when MAX(sale_id)
+    still equals the mark recorded at build time, and the aggregates'
+    partials are merged forward from their own mark.
+    """
+
+    def __init__(self, path=None, max_age=None):
+        self.path = path or os.getenv('WARMUP_PATH', 'warmup')
+        self.max_age = max_age if max_age is not None else float(os.getenv('WARMUP_MAX_AGE', '86400'))
+        self.manifest = None
+        self.preloaded = 0
+
+    @property
+    def intent_tables(self):
+        return self.manifest['intent_tables'] if self.manifest else None
+
+    def load(self, db):
+        """Read the manifest for ``db``; returns False when missing, unreadable, stale or foreign"""
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        if db.mock_mode or os.getenv('WARMUP', 'true').lower() != 'true' or not os.path.exists(manifest_path):
+            return False
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            built_at = manifest['built_at']
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable warm-up artifact {manifest_path}: {e}")
+            return False
+        if time.time() - built_at > self.max_age:
+            logging.info(f"Warm-up artifact {self.path} is older than {self.max_age:.0f}s, ignoring it")
+            return False
+        if manifest.get('database') != database_id(db):
+            logging.info(f"Warm-up artifact {self.path} was built from another database, ignoring it")
+            return False
+        self.manifest = manifest
+        return True
+
+    def schema_info(self, db):
+        """db.get_schema_info(), with its schema snapshot seeded from the artifact if it has none"""
+        snapshot = db.schema_snapshot
+        if self.manifest and self.manifest.get('table_fingerprints') and snapshot is not None:
+            if snapshot.schema is None and not snapshot.load():
+                snapshot.schema = self.manifest['schema']
+                snapshot.table_fingerprints = self.manifest['table_fingerprints']
+                snapshot.fingerprint = self.manifest['schema_fingerprint']
+                snapshot.saved_at = self.manifest['built_at']
+        return db.get_schema_info()
+
+    def foreign_keys(self, db):
+        snapshot = db.schema_snapshot
+        if self.manifest and snapshot is not None and snapshot.fingerprint == self.manifest.get('schema_fingerprint'):
+            return self.manifest['foreign_keys']
+        return db.get_foreign_keys()
+
+    def apply(self, db):
+        """Seed db's incremental aggregates and result cache; returns the number of results preloaded"""
+        if not self.manifest:
+            return 0
+        t0 = time.perf_counter()
+        aggregates = self.manifest.get('aggregates')
+        if aggregates and db.aggregates is not None:
+            try:
+                partials = pd.read_parquet(os.path.join(self.path, aggregates['file'])).set_index(BUCKET_KEYS)
+                db.aggregates.restore(partials, aggregates['high_water_mark'], aggregates['regions'],
+                                      age=time.time() - self.manifest['built_at'])
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Could not restore incremental aggregates from {self.path}: {e}")
+
+        if sales_high_water_mark(db) != self.manifest['high_water_mark']:
+            logging.info("Sales data changed since the warm-up artifact was built, not preloading results")
+            return 0
+        kwargs = {'dtype_backend': 'pyarrow'} if db.dtype_backend == 'pyarrow' else {}
+        for entry in self.manifest['results']:
+            try:
+                df = pd.read_parquet(os.path.join(self.path, entry['file']), **kwargs)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not preload {entry['question']!r}: {e}")
+                continue
+            if db.cache.put(entry['sql'], df):
+                self.preloaded += 1
+        logging.info(f"Warm start from {self.path}: {self.preloaded} results preloaded in "
+                     f"{(time.perf_counter() - t0) * 1000:.0f}ms")
+        return self.preloaded
+
+
+def main(argv):
+    from database import DatabaseManager
+
+    command = argv[1] if len(argv) > 1 else 'build'
+    if command != 'build':
+        sys.exit(f"Unknown command: {command} (expected build)")
+    db = DatabaseManager()
+    if db.mock_mode:
+        sys.exit("DATABASE_URL or embedded extracts are required to build the warm-up artifact")
+    try:
+        manifest = build(db, argv[2] if len(argv) > 2 else None)
+    finally:
+        db.close()
+    for entry in manifest['results']:
+        print(f"{entry['rows']:>8} rows  {entry['question']}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv)